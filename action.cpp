@@ -1349,7 +1349,7 @@ namespace virtualdesktop_openxr {
                                     sendto(sock, msg.c_str(), (int)msg.length(), 0, (sockaddr*)&dest, sizeof(dest));
                                     closesocket(sock);
                                 }
-                            } else if (tapCount >= 3) {
+                            } else if (tapCount == 3) {
                                 SOCKET sock = socket(AF_INET, SOCK_DGRAM, IPPROTO_UDP);
                                 if (sock != INVALID_SOCKET) {
                                     sockaddr_in dest = {};
@@ -1361,6 +1361,19 @@ namespace virtualdesktop_openxr {
                                     sendto(sock, msg.c_str(), (int)msg.length(), 0, (sockaddr*)&dest, sizeof(dest));
                                     closesocket(sock);
                                 }
+                            } else if (tapCount >= 4) {
+                                // Step to the bridge's next config profile
+                                SOCKET sock = socket(AF_INET, SOCK_DGRAM, IPPROTO_UDP);
+                                if (sock != INVALID_SOCKET) {
+                                    sockaddr_in dest = {};
+                                    dest.sin_family = AF_INET;
+                                    dest.sin_port = htons(5015);
+                                    inet_pton(AF_INET, "127.0.0.1", &dest.sin_addr);
+                                    
+                                    std::string msg = "profile:next";
+                                    sendto(sock, msg.c_str(), (int)msg.length(), 0, (sockaddr*)&dest, sizeof(dest));
+                                    closesocket(sock);
+                                }
                             }
                             
                             tapCount = 0;  // Reset
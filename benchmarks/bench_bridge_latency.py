@@ -0,0 +1,125 @@
+"""Receive->Shot latency and throughput of the whole bridge on the simulated backend.
+
+Runs the real bridge in-process with SimulatedBackend, sends driver
+datagrams over loopback UDP and matches every send timestamp to the
+Shot the simulator recorded for it. No hardware needed:
+
+    python benchmarks/bench_bridge_latency.py [--shots 2000]
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import protube_bridge_with_gui_control as bridge
+from protube_backend import SimulatedBackend
+
+RIGHT_CHANNEL = 4  # "shot_left" from the driver is the right controller
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    index = min(len(sorted_values) - 1, int(len(sorted_values) * pct / 100))
+    return sorted_values[index]
+
+
+def wait_for_shots(backend, count, timeout=10.0):
+    """Wait until the simulator has recorded count shots on the right channel"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if len(backend.shots_on(RIGHT_CHANNEL)) >= count:
+            return True
+        time.sleep(0.005)
+    return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--shots", type=int, default=2000, help="datagrams per phase")
+    parser.add_argument("--spacing-us", type=int, default=500, help="gap between latency probes")
+    parser.add_argument("--port", type=int, default=5115, help="UDP port for the bridge under test")
+    parser.add_argument("--coalesce", default="off",
+                        help="bridge coalesce policy (off measures every datagram becoming a Shot)")
+    parser.add_argument("--overlap", default="preempt",
+                        help="bridge overlap policy (preempt issues every Shot, however close together)")
+    parser.add_argument("--no-latency-trace", dest="latency_trace", action="store_false",
+                        help="run the bridge without its latency histograms")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="protube_bench_")
+    settings = dict(bridge.config, mode_select="Trigger", latency=0, feedback=False,
+                    ignore_left_hand=False, ignore_right_hand=False)
+    with open(os.path.join(workdir, "config.json"), "w") as f:
+        json.dump(settings, f)
+
+    # Keep the bridge under test away from the real config, driver file and port
+    bridge.CONFIG_FILE = os.path.join(workdir, "config.json")
+    bridge.STATUS_FILE = os.path.join(workdir, "status.bin")
+    bridge.DOCUMENTS_PATH = workdir
+    bridge.DRIVER_CONFIG_FILE = os.path.join(workdir, "protube_config.txt")
+    bridge.UDP_PORT = args.port
+
+    backend = SimulatedBackend()
+    console = io.StringIO()
+
+    def serve():
+        with contextlib.redirect_stdout(console):
+            bridge.run_bridge(backend, args.coalesce, args.latency_trace, overlap=args.overlap)
+
+    server = threading.Thread(target=serve, daemon=True)
+    server.start()
+    time.sleep(0.5)  # let the bridge bind its socket
+
+    sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    target = ("127.0.0.1", args.port)
+
+    # Phase 1: paced probes, one Shot per datagram, measure receive->Shot latency
+    sent_ns = []
+    for _ in range(args.shots):
+        sent_ns.append(time.monotonic_ns())
+        sender.sendto(b"shot_left", target)
+        spin_until = time.perf_counter() + args.spacing_us / 1e6
+        while time.perf_counter() < spin_until:
+            pass
+    wait_for_shots(backend, args.shots)
+    shots = backend.shots_on(RIGHT_CHANNEL)
+    latencies_us = sorted((r.t_ns - t) / 1000 for r, t in zip(shots, sent_ns))
+
+    # Phase 2: flood, measure sustained shots/sec through the bridge
+    backend.reset()
+    start = time.perf_counter()
+    for _ in range(args.shots):
+        sender.sendto(b"shot_left", target)
+    complete = wait_for_shots(backend, args.shots, timeout=3.0)
+    elapsed = time.perf_counter() - start
+    delivered = len(backend.shots_on(RIGHT_CHANNEL))
+
+    bridge.stop_bridge()
+    server.join(timeout=3.0)
+    sender.close()
+
+    print(f"Receive->Shot latency over {len(latencies_us)} shots (us):")
+    print(f"  p50 {percentile(latencies_us, 50):8.1f}")
+    print(f"  p95 {percentile(latencies_us, 95):8.1f}")
+    print(f"  p99 {percentile(latencies_us, 99):8.1f}")
+    print(f"  max {latencies_us[-1]:8.1f}")
+    print(f"Throughput: {delivered}/{args.shots} shots in {elapsed * 1000:.1f}ms "
+          f"= {delivered / elapsed:,.0f} shots/sec" + ("" if complete else " (datagrams dropped or coalesced)"))
+    print(f"Coalescing ({args.coalesce}): {bridge.coalescer.stats.summary()}")
+    print(f"Overlap: {bridge.scheduler.occupancy.summary()}")
+    if bridge.latency_recorder is not None:
+        print("Bridge latency histograms:")
+        for line in bridge.latency_recorder.summary_lines():
+            print(f"  {line}")
+
+
+if __name__ == "__main__":
+    main()
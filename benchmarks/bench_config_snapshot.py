@@ -0,0 +1,83 @@
+"""Per-shot config overhead: locked dict lookups vs a compiled ConfigSnapshot.
+
+"Before" reproduces the config reads one burst shot used to make: the
+ignore-hand check, latency, get_mode_config() with percent_to_raw, and
+burst_count/auto_rate, each under config_lock, then the burst's pulses
+built from them. "After" is what the shot path reads now: the compiled
+burst pattern for the hand's route, from one snapshot reference.
+
+    python benchmarks/bench_config_snapshot.py [--shots 1000000]
+"""
+import argparse
+import os
+import sys
+import threading
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from protube_config import BURST_FIRE, DEFAULT_CONFIG, compile_config
+from protube_pattern import percent_to_raw
+from protube_routing import ROUTE_RIGHT
+
+RIGHT_CHANNEL = 4  # the old shot path's hardcoded right hand channel
+
+config = dict(DEFAULT_CONFIG)
+config_lock = threading.Lock()
+active_config = compile_config(config)
+
+
+def get_mode_config(mode):
+    """The old per-shot lookup (burst branch)"""
+    with config_lock:
+        if mode == BURST_FIRE:
+            kick = percent_to_raw(config["burst_kick"])
+            rumble = percent_to_raw(config["burst_rumble"])
+            duration = config["burst_duration"]
+        else:
+            kick, rumble, duration = 255, 120, 100
+    return kick, rumble, duration
+
+
+def shot_before():
+    with config_lock:
+        ignore_right = config.get("ignore_right_hand", False)
+    if ignore_right:
+        return None
+    with config_lock:
+        latency_ms = config["latency"]
+    kick, rumble, duration = get_mode_config(BURST_FIRE)
+    with config_lock:
+        burst_count = config["burst_count"]
+        burst_rate = config["auto_rate"]
+    return tuple(((latency_ms + i * burst_rate) * 1_000_000, kick, rumble, duration, RIGHT_CHANNEL)
+                 for i in range(burst_count))
+
+
+def shot_after():
+    cfg = active_config
+    if cfg.ignore_route[ROUTE_RIGHT]:
+        return None
+    return cfg.patterns[BURST_FIRE][ROUTE_RIGHT]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--shots", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    assert shot_before() == shot_after(), "snapshot must match the old lookups"
+
+    results = {}
+    for name, func in (("locked dict (before)", shot_before), ("snapshot (after)", shot_after)):
+        best = min(timeit.repeat(func, number=args.shots, repeat=args.repeat))
+        results[name] = best / args.shots * 1e9
+        print(f"{name:22s} {results[name]:7.1f} ns/shot")
+
+    before, after = results.values()
+    print(f"Speedup: {before / after:.1f}x ({before - after:.1f} ns saved per shot)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Events/sec through the bridge's driver message dispatcher.
+
+Compares the old per-datagram path (decode -> strip -> startswith/split
+chain) with the precompiled dispatch tables keyed by raw datagram bytes.
+Handlers are stubbed out so only dispatch cost is measured.
+
+    python benchmarks/bench_dispatch.py [--events 500000]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import protube_bridge_with_gui_control as bridge
+from protube_protocol import EVENT_SHOT, HAND_LEFT, encode_event
+from protube_routing import ROUTE_RIGHT, ROUTE_LEFT
+
+handled = [0]
+
+
+def stub(*args):
+    handled[0] += 1
+
+
+def legacy_dispatch(data):
+    """The receive loop body before table dispatch (handlers stubbed)"""
+    message = data.decode('utf-8').strip()
+    if message.startswith("mode:"):
+        stub(message.split(":")[1])
+    elif message.startswith("trigger_"):
+        parts = message.split(":")
+        hand = "left" if "right" in parts[0] else "right"
+        if not bridge.active_config.ignore_hand[hand]:
+            stub(hand, parts[1])
+    elif message == "shot_right":
+        if not bridge.active_config.ignore_route[ROUTE_LEFT]:
+            stub('left', ROUTE_LEFT)
+    elif message == "shot_left":
+        if not bridge.active_config.ignore_route[ROUTE_RIGHT]:
+            stub('right', ROUTE_RIGHT)
+    elif message.startswith("duration:"):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=500_000)
+    args = parser.parse_args()
+
+    # Stub the fire-mode handlers and rebuild the tables around them
+    bridge.handle_shot = stub
+    bridge.handle_trigger_state = stub
+    bridge.handle_mode_change = stub
+    bridge.text_dispatch, bridge.binary_dispatch, bridge.event_kinds = bridge.build_dispatch_tables()
+
+    # A typical full-auto stream from the driver
+    stream = [b"trigger_left:1", b"shot_left", b"shot_left", b"shot_right",
+              b"trigger_left:0", b"duration:48"]
+    rounds = args.events // len(stream)
+    total = rounds * len(stream)
+
+    handled[0] = 0
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for data in stream:
+            legacy_dispatch(data)
+    legacy = total / (time.perf_counter() - start)
+    legacy_handled = handled[0]
+
+    addr = ("127.0.0.1", 50000)
+
+    def run_tables(datagrams):
+        resolve = bridge.resolve_datagram
+        for _ in range(rounds):
+            for data in datagrams:
+                handler = resolve(data, addr)
+                if handler is not None:
+                    handler()
+
+    handled[0] = 0
+    start = time.perf_counter()
+    run_tables(stream)
+    tables = total / (time.perf_counter() - start)
+    assert handled[0] == legacy_handled, "table dispatch must route the same events"
+
+    binary_stream = [encode_event(EVENT_SHOT, HAND_LEFT, seq, time.monotonic_ns())
+                     for seq in range(len(stream))]
+    start = time.perf_counter()
+    run_tables(binary_stream)
+    binary = total / (time.perf_counter() - start)
+
+    print(f"legacy decode/startswith chain  {legacy:12,.0f} events/sec")
+    print(f"precompiled tables (text)       {tables:12,.0f} events/sec ({tables / legacy:.1f}x)")
+    print(f"precompiled tables (binary)     {binary:12,.0f} events/sec")
+
+
+if __name__ == "__main__":
+    main()
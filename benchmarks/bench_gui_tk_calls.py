@@ -0,0 +1,223 @@
+"""Tcl/Tk commands and CPU spent by the GUI's widgets and update paths.
+
+Counts every Tcl command the interpreter runs (info cmdcount) along with
+process CPU time for:
+- the old delete-and-redraw IndicatorLight/ToggleSwitch against the
+  current ones that mutate their canvas items, for no-op and real
+  state changes
+- the whole ProTubeGUI sitting idle (status polling, no bridge), before
+  (the baseline protube_gui.py, from the repository's first commit or
+  --baseline) and after, and while a slider is dragged
+
+Needs a display; on a headless machine run it under Xvfb:
+
+    xvfb-run -a python benchmarks/bench_gui_tk_calls.py [--updates 2000]
+"""
+import argparse
+import contextlib
+import io
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tkinter as tk
+import types
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import protube_gui as gui
+
+
+class LegacyIndicatorLight(tk.Canvas):
+    """IndicatorLight before diffing: every set_state redraws the canvas"""
+    def __init__(self, parent, width=12, height=20, **kwargs):
+        super().__init__(parent, width=width, height=height, highlightthickness=0, **kwargs)
+        self.state = "on"
+        self.draw()
+
+    def draw(self):
+        self.delete("all")
+        fill = "#90EE90" if self.state == "on" else "#404040"
+        self.create_rectangle(0, 0, self.winfo_reqwidth(), self.winfo_reqheight(), fill=fill, outline="")
+
+    def set_state(self, state):
+        self.state = state
+        self.draw()
+
+
+class LegacyToggleSwitch(tk.Canvas):
+    """ToggleSwitch before diffing: every set recreates all four items"""
+    def __init__(self, parent, width=50, height=24, **kwargs):
+        super().__init__(parent, width=width, height=height, highlightthickness=0, **kwargs)
+        self.width = width
+        self.height = height
+        self.is_on = True
+        self.draw()
+
+    def draw(self):
+        self.delete("all")
+        bg = "#90EE90" if self.is_on else "#404040"
+        self.create_oval(0, 0, self.height, self.height, fill=bg, outline="")
+        self.create_oval(self.width-self.height, 0, self.width, self.height, fill=bg, outline="")
+        self.create_rectangle(self.height/2, 0, self.width-self.height/2, self.height, fill=bg, outline="")
+        circle_x = self.width - self.height/2 - 4 if self.is_on else self.height/2
+        self.create_oval(circle_x-8, 4, circle_x+8, self.height-4, fill="white", outline="")
+
+    def set(self, value):
+        self.is_on = value
+        self.draw()
+
+
+class Meter:
+    """Tcl commands and CPU time used by a block"""
+
+    def __init__(self, root):
+        self.root = root
+        self.commands = 0
+        self.cpu = 0.0
+
+    @contextlib.contextmanager
+    def measure(self):
+        self.root.update()  # settle anything pending first
+        commands = int(self.root.tk.call("info", "cmdcount"))
+        cpu = time.process_time()
+        yield self
+        self.root.update()  # include the redraws the block caused
+        self.cpu = time.process_time() - cpu
+        self.commands = int(self.root.tk.call("info", "cmdcount")) - commands
+
+
+def bench_widget(root, make, update, values, updates):
+    """(Tcl commands, CPU us) per update of a widget"""
+    widget = make(root)
+    widget.pack()
+    meter = Meter(root)
+    with meter.measure():
+        for i in range(updates):
+            update(widget, values[i % len(values)])
+    widget.destroy()
+    return meter.commands / updates, meter.cpu / updates * 1e6
+
+
+def load_baseline_gui(path=None):
+    """The baseline protube_gui module: from path, or the repository's first commit"""
+    if path is None:
+        repo = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        git = ["git", "-C", repo]
+        root_commit = subprocess.check_output(git + ["rev-list", "--max-parents=0", "HEAD"], text=True).split()[-1]
+        source = subprocess.check_output(git + ["show", f"{root_commit}:protube_gui.py"], text=True)
+        path = f"{root_commit[:7]}:protube_gui.py"
+    else:
+        with open(path) as f:
+            source = f.read()
+    module = types.ModuleType("baseline_protube_gui")
+    exec(compile(source, path, "exec"), module.__dict__)
+    return module
+
+
+def bench_idle(gui_class, status_method, seconds):
+    """(Tcl commands/sec, CPU %, status checks/sec) of a whole GUI sitting idle
+
+    status_method is the method every status wakeup runs (timer or socket)
+    """
+    root = tk.Tk()
+    app = gui_class(root)
+    checks = [0]
+    check = getattr(app, status_method)
+
+    def counted():
+        checks[0] += 1
+        return check()
+    setattr(app, status_method, counted)
+
+    meter = Meter(root)
+    with meter.measure():
+        root.after(int(seconds * 1000), root.quit)
+        root.mainloop()
+    if hasattr(app, "status_events"):
+        close_gui(app, root)
+    else:
+        root.destroy()
+    return meter.commands / seconds, meter.cpu / seconds * 100, checks[0] / seconds
+
+
+def close_gui(app, root):
+    app.autosaver.flush()
+    app.control.close()
+    app.close_status_events()
+    app.status_reader.close()
+    root.destroy()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--updates", type=int, default=2000, help="widget updates per case")
+    parser.add_argument("--idle-seconds", type=float, default=5.0)
+    parser.add_argument("--drag-steps", type=int, default=400, help="slider positions in the drag")
+    parser.add_argument("--baseline", help="baseline protube_gui.py (default: from the first commit)")
+    args = parser.parse_args()
+
+    try:
+        root = tk.Tk()
+    except tk.TclError as e:
+        sys.exit(f"No display ({e}); run under Xvfb: xvfb-run -a python {sys.argv[0]}")
+
+    print(f"Widget updates ({args.updates:,} each): Tcl commands and CPU per update")
+    cases = [
+        ("IndicatorLight, same state", LegacyIndicatorLight, gui.IndicatorLight,
+         lambda w, v: w.set_state(v), ["off"]),
+        ("IndicatorLight, alternating", LegacyIndicatorLight, gui.IndicatorLight,
+         lambda w, v: w.set_state(v), ["on", "off"]),
+        ("ToggleSwitch, same value", LegacyToggleSwitch, gui.ToggleSwitch,
+         lambda w, v: w.set(v), [True]),
+        ("ToggleSwitch, alternating", LegacyToggleSwitch, gui.ToggleSwitch,
+         lambda w, v: w.set(v), [True, False]),
+    ]
+    for name, legacy, current, update, values in cases:
+        old_cmds, old_us = bench_widget(root, legacy, update, values, args.updates)
+        new_cmds, new_us = bench_widget(root, current, update, values, args.updates)
+        print(f"  {name:30s} {old_cmds:6.1f} -> {new_cmds:5.1f} commands, "
+              f"{old_us:7.1f} -> {new_us:6.1f} us")
+    root.destroy()
+
+    # The whole GUI, in a scratch directory so it never touches the real config
+    workdir = tempfile.mkdtemp(prefix="protube_gui_bench_")
+    os.chdir(workdir)
+    console = io.StringIO()
+    with contextlib.redirect_stdout(console):
+        baseline = load_baseline_gui(args.baseline)
+        idle = [bench_idle(baseline.ProTubeGUI, "check_bridge_status", args.idle_seconds),
+                bench_idle(gui.ProTubeGUI, "update_bridge_status", args.idle_seconds)]
+
+        root = tk.Tk()
+        app = gui.ProTubeGUI(root)
+        meter = Meter(root)
+
+        slider = app.sliders["single_kick"]
+        sweep = list(range(0, 101)) + list(range(99, 0, -1))
+        with meter.measure():
+            for i in range(args.drag_steps):
+                slider.set(sweep[i % len(sweep)])
+                root.update()
+        drag_cmds = meter.commands / args.drag_steps
+        drag_us = meter.cpu / args.drag_steps * 1e6
+
+        with meter.measure():
+            for _ in range(args.updates):
+                app.set_bridge_state("running")
+                app.show_battery(80)
+        status_cmds = meter.commands / args.updates
+
+        close_gui(app, root)
+
+    print(f"\nProTubeGUI ({'socket watched' if app.status_watched else 'polled'})")
+    for label, (rate, cpu, checks) in zip(("before", "after"), idle):
+        print(f"  Idle, no bridge, {label:6s}:    {rate:8.1f} commands/sec, CPU {cpu:.2f}%, "
+              f"{checks:.1f} status checks/sec")
+    print(f"  Slider drag:                {drag_cmds:8.1f} commands/step, {drag_us:.0f} us/step")
+    print(f"  Unchanged status refresh:   {status_cmds:8.1f} commands/update")
+
+
+if __name__ == "__main__":
+    main()
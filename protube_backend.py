@@ -0,0 +1,192 @@
+"""Haptic device backends for the ProTube bridge.
+
+The bridge talks to the device only through a HapticBackend:
+- ForceTubeBackend drives real hardware through ForceTubeVR_API_x64.dll
+- SimulatedBackend records every command with nanosecond timestamps so
+  the whole bridge can run (and be benchmarked) without hardware
+"""
+import ctypes
+import logging
+import threading
+import time
+
+log = logging.getLogger("protube.backend")
+
+FORCETUBE_DLL = "./ForceTubeVR_API_x64.dll"
+
+# ProVolver takes about this long to connect after InitAsync
+FORCETUBE_INIT_SECONDS = 3.0
+
+READY_POLL_SECONDS = 0.05
+
+
+class HapticBackend:
+    """Interface every haptic device backend implements"""
+    name = "none"
+    battery_available = False
+    blocking = False  # True if device calls may block and must be kept off the event loop
+    ready_timeout = 10.0  # give up waiting for is_ready() after this long and go ahead
+
+    def init(self):
+        """Load the device driver and start connecting (must not wait for the connection)"""
+
+    def is_ready(self, channels):
+        """True once the device on the given channels accepts shots (polled after init)"""
+        return True
+
+    def shot(self, kick, rumble, duration, channel):
+        """Fire one kick/rumble pulse (raw 0-255 values, duration in ms)"""
+        raise NotImplementedError
+
+    def get_battery_level(self, channel):
+        """Battery percentage of the device on a channel"""
+        raise NotImplementedError
+
+    def close(self):
+        """Release the device"""
+
+
+class ForceTubeBackend(HapticBackend):
+    """ForceTube hardware through the vendor ctypes DLL"""
+    name = "forcetube"
+    blocking = True  # DLL calls go over the Bluetooth link and can stall
+
+    def __init__(self, dll_path=FORCETUBE_DLL):
+        self.dll_path = dll_path
+        self.dll = None
+        self.init_time = None
+
+    def init(self):
+        log.info("Loading ForceTube DLL...")
+        self.dll = ctypes.CDLL(self.dll_path)
+        log.info("DLL loaded!")
+
+        # Define function signatures for battery access (if available)
+        try:
+            # Try to access battery function - signature may vary
+            self.dll.GetBatteryLevel.argtypes = [ctypes.c_int]
+            self.dll.GetBatteryLevel.restype = ctypes.c_int
+            self.battery_available = True
+            log.info("Battery monitoring available")
+        except AttributeError:
+            self.battery_available = False
+            log.info("Battery monitoring not available in this API version")
+
+        # Bind the DLL entry points directly so a Shot costs one ctypes call
+        self.shot = self.dll.Shot
+        if self.battery_available:
+            self.get_battery_level = self.dll.GetBatteryLevel
+
+        log.info("Initializing ProVolver...")
+        self.init_time = time.monotonic()
+        self.dll.InitAsync()
+
+    def is_ready(self, channels):
+        # The API has no readiness call or callback. A connected ProVolver
+        # reports its battery, so poll that where the DLL has it; otherwise
+        # (or if it never answers) wait out the usual connect time
+        if self.battery_available:
+            try:
+                if any(self.get_battery_level(channel) > 0 for channel in channels):
+                    return True
+            except OSError:
+                pass
+        return time.monotonic() - self.init_time >= FORCETUBE_INIT_SECONDS
+
+
+class ShotRecord:
+    """One command received by the simulated device"""
+    __slots__ = ("t_ns", "channel", "kick", "rumble", "duration", "overlap")
+
+    def __init__(self, t_ns, channel, kick, rumble, duration, overlap):
+        self.t_ns = t_ns
+        self.channel = channel
+        self.kick = kick
+        self.rumble = rumble
+        self.duration = duration
+        self.overlap = overlap  # True if the channel was still busy with the previous pulse
+
+
+class SimulatedBackend(HapticBackend):
+    """Records every command instead of driving hardware"""
+    name = "sim"
+    battery_available = True
+
+    def __init__(self, battery_level=100, clock=time.monotonic_ns, ready_delay=0.0):
+        self.battery_level = battery_level
+        self.clock = clock
+        self.ready_delay = ready_delay  # simulated connect time after init()
+        self.init_ns = None
+        self.records = []
+        self.busy_until_ns = {}  # channel -> time the current pulse finishes
+        self.busy_ns = {}        # channel -> total time the channel was rendering
+        self.overlaps = {}       # channel -> pulses that arrived while busy
+        self._lock = threading.Lock()
+
+    def init(self):
+        log.info("[SIM] Simulated haptic device - no hardware will be driven")
+        self.init_ns = self.clock()
+
+    def is_ready(self, channels):
+        return self.clock() - self.init_ns >= self.ready_delay * 1e9
+
+    def shot(self, kick, rumble, duration, channel):
+        t_ns = self.clock()
+        end_ns = t_ns + int(duration * 1_000_000)
+        with self._lock:
+            busy_until = self.busy_until_ns.get(channel, 0)
+            overlap = t_ns < busy_until
+            if overlap:
+                self.overlaps[channel] = self.overlaps.get(channel, 0) + 1
+            # Only count time the channel was not already rendering
+            if end_ns > busy_until:
+                self.busy_ns[channel] = self.busy_ns.get(channel, 0) + end_ns - max(t_ns, busy_until)
+                self.busy_until_ns[channel] = end_ns
+            self.records.append(ShotRecord(t_ns, channel, kick, rumble, duration, overlap))
+
+    def get_battery_level(self, channel):
+        return self.battery_level
+
+    def reset(self):
+        """Forget everything recorded so far"""
+        with self._lock:
+            self.records = []
+            self.busy_until_ns.clear()
+            self.busy_ns.clear()
+            self.overlaps.clear()
+
+    def shots_on(self, channel):
+        """Recorded commands for one channel"""
+        with self._lock:
+            return [r for r in self.records if r.channel == channel]
+
+    def occupancy(self, channel):
+        """Fraction of time between the first and last pulse the channel was busy"""
+        records = self.shots_on(channel)
+        if not records:
+            return 0.0
+        span = max(self.busy_until_ns[channel] - records[0].t_ns, 1)
+        return self.busy_ns[channel] / span
+
+    def summary(self):
+        """Per-channel report of shots, overlaps and occupancy"""
+        lines = []
+        for channel in sorted({r.channel for r in self.records}):
+            lines.append(f"  Channel {channel}: {len(self.shots_on(channel))} shots, "
+                         f"{self.overlaps.get(channel, 0)} overlapping, "
+                         f"occupancy {self.occupancy(channel) * 100:.1f}%")
+        return "\n".join(lines)
+
+
+BACKENDS = {
+    ForceTubeBackend.name: ForceTubeBackend,
+    SimulatedBackend.name: SimulatedBackend,
+}
+
+
+def create_backend(name):
+    """Create a backend by name ('forcetube' or 'sim')"""
+    try:
+        return BACKENDS[name]()
+    except KeyError:
+        raise ValueError(f"Unknown haptic backend '{name}' (choose from {', '.join(BACKENDS)})")
@@ -1,151 +1,236 @@
-import ctypes
-import socket
+import argparse
+import asyncio
+import collections
 import time
-import threading
 import json
+import logging
 import os
-from datetime import datetime
-
-print("Starting ProTube Bridge with 3-Mode Fire Selector...")
-
-# Load the ForceTube DLL
-print("Loading ForceTube DLL...")
-forcetube = ctypes.CDLL("./ForceTubeVR_API_x64.dll")
-print("DLL loaded!")
-
-# Define function signatures for battery access (if available)
-try:
-    # Try to access battery function - signature may vary
-    forcetube.GetBatteryLevel.argtypes = [ctypes.c_int]
-    forcetube.GetBatteryLevel.restype = ctypes.c_int
-    battery_available = True
-    print("Battery monitoring available")
-except:
-    battery_available = False
-    print("Battery monitoring not available in this API version")
-
-# Initialize ProVolver
-print("Initializing ProVolver...")
-forcetube.InitAsync()
-time.sleep(3)
-print("ProVolver initialized!")
+import socket
+from functools import partial
+from protube_backend import BACKENDS, READY_POLL_SECONDS, create_backend
+from protube_coalesce import (COALESCE_POLICIES, DEFAULT_POLICY, MAX_BATCH, KIND_SHOT,
+                              KIND_TRIGGER, KIND_MODE, EventCoalescer)
+from protube_config import (SINGLE_SHOT, BURST_FIRE, FULL_AUTO, HAPTIC_EXPERIMENTAL,
+                            MODE_NAMES, DEFAULT_CONFIG, compile_config)
+from protube_control import (CONTROL_IP, CONTROL_PORT, SUBSCRIPTION_TTL, FIRE_MODES,
+                             REPLY_CACHE_SIZE, NOTIFY_STARTED, NOTIFY_READY, NOTIFY_MODE,
+                             NOTIFY_PROFILE, NOTIFY_BATTERY, NOTIFY_STOPPING, NOTIFY_HEARTBEAT, parse_request,
+                             decode_set, encode_ack, encode_nak, encode_event)
+from protube_protocol import (EVENT_SHOT, EVENT_TRIGGER, EVENT_MODE,
+                              HAND_RIGHT, HAND_LEFT, MODE_IDS, ProtocolError, SourceStats,
+                              binary_key, decode_event, event_to_message, is_binary)
+from protube_filewatch import FileWatcher, file_signature
+from protube_lanes import DeviceLanes
+from protube_latency import LatencyRecorder, LatencyTrace
+from protube_scheduler import HapticScheduler, CadenceStats, ms_to_ns, now_ns
+from protube_routing import (ROUTE_LEFT, ROUTE_RIGHT, ROUTE_FEEDBACK, HAND_ROUTES, DEFAULT_ROUTES,
+                             describe_routes)
+from protube_profiles import (PROFILES_DIR, PROFILE_SCAN_INTERVAL, ProcessScanner, ProfileBank, load_profiles,
+                              save_profile)
+from protube_overlap import OVERLAP_POLICIES, DEFAULT_OVERLAP, MAX_QUEUE, OVERLAP_COUNTERS, DeviceOccupancy
+from protube_stats import STATS_PORT, MetricsPage, RateMeter, StatsServer
+from protube_status import (STATUS_FILE, STATE_STARTING, STATE_RUNNING, STATE_STOPPING,
+                            BATTERY_UNKNOWN, StatusWriter)
+from protube_log import LOG_LEVELS, DEFAULT_LEVEL, setup_logging, shutdown_logging, recent_lines
+
+log = logging.getLogger("protube.bridge")
 
 # === CONFIGURATION ===
 UDP_IP = "127.0.0.1"
 UDP_PORT = 5015  # Receive from C++ driver only
+SOCKET_RCVBUF = 1 << 20  # kernel buffer for driver bursts while the loop is busy
 
 CONFIG_FILE = "protube_gui_config.json"
-BATTERY_FILE = "protube_battery.txt"
+STATUS_INTERVAL = 0.25  # heartbeat/latency refresh of the shared status block
+BATTERY_INTERVAL = 10.0
+
+# Driver events arriving while the device connects are held and replayed once it is ready
+PRE_READY_QUEUE = 64        # most recent events kept
+PRE_READY_SHOT_AGE_MS = 250  # older held shots are stale and skipped (triggers/mode changes never are)
 
 # Driver config file - must match path in C++ DLL
 DOCUMENTS_PATH = os.path.join(os.path.expanduser("~"), "Documents", "ProTube OpenXR Companion")
 DRIVER_CONFIG_FILE = os.path.join(DOCUMENTS_PATH, "protube_config.txt")
 
-# Fire mode constants
-SINGLE_SHOT = 0
-BURST_FIRE = 1
-FULL_AUTO = 2
-HAPTIC_EXPERIMENTAL = 3
-
-MODE_NAMES = {
-    SINGLE_SHOT: "SINGLE SHOT",
-    BURST_FIRE: "BURST FIRE",
-    FULL_AUTO: "FULL AUTO",
-    HAPTIC_EXPERIMENTAL: "HAPTIC EXPERIMENTAL"
-}
-
-# Default settings
-config = {
-    "mode_select": "Haptic Filtered",
-    "feedback": True,
-    "ignore_left_hand": False,
-    "ignore_right_hand": False,
-    "latency": 0,
-    "filter_window_ms": 60,
-    "single_kick": 100,
-    "single_rumble": 47,
-    "single_duration": 100,
-    "burst_kick": 100,
-    "burst_rumble": 47,
-    "burst_duration": 100,
-    "burst_count": 3,
-    "auto_kick": 100,
-    "auto_rumble": 47,
-    "auto_duration": 100,
-    "auto_rate": 60
-}
-
-# Config lock for thread safety
-config_lock = threading.Lock()
-last_config_mtime = 0
+# All bridge state below is owned by the event loop: protocols, timers and
+# watchers run on its thread, so nothing here needs a lock.
+
+# Current settings (GUI JSON merged over defaults); only the config loader touches this
+config = dict(DEFAULT_CONFIG)
+
+# Compiled snapshot read by the shot path. load_config() swaps the reference
+# in one assignment, so readers take one local reference.
+active_config = compile_config(config)
+
+last_config_signature = None  # (mtime_ns, size) of the last config file applied
+rejected_config_signature = None  # ... of the last one rejected, warned about once
+
+# Preloaded profiles (protube_profiles), each compiled over the base config
+# above so switching is the same one-reference swap. None: the base config.
+profile_bank = ProfileBank()
+profile_bank.compile(config, active_config)
+active_profile = None
+profile_switches = {"gui": 0, "driver": 0, "auto": 0}  # by where the switch came from
+last_profile_swap_ns = None  # lookup + swap time of the last switch
+
+# GUI changes to a profile's fields are written back to its file this long after the last one
+PROFILE_SAVE_DELAY = 0.5
+profile_saves = {}  # profile name -> pending save timer
+
+# Auto-selection of the running game's profile (None unless enabled)
+process_scanner = None
+last_process_scan_ms = None
+
+# Settings the C++ driver reads from its own config file
+DRIVER_FIELDS = ("mode_select", "filter_window_ms")
+
+# Reload statistics
+config_reload_count = 0
+last_config_apply_ms = None  # time from the file write to the new snapshot being live
 
 # === STATE TRACKING ===
 current_mode = SINGLE_SHOT
 trigger_held = {'right': False, 'left': False}
 
-# Auto-fire threading
+# Auto-fire sessions (repeating pulses on the scheduler's deadline grid)
 auto_fire_active = {'right': False, 'left': False}
-auto_fire_threads = {'right': None, 'left': None}
-stop_auto_fire = {'right': threading.Event(), 'left': threading.Event()}
+auto_fire_cadence = {'right': None, 'left': None}  # CadenceStats of the current/last session
 
-# Burst fire cooldown tracking
+# Burst fire cooldown tracking (scheduler clock time of each hand's last burst)
+BURST_COOLDOWN_MS = 200
 last_burst_time = {'right': None, 'left': None}
 
 # Bridge status
 bridge_running = True
+bridge_loop = None     # event loop serving the bridge, set up by serve_bridge()
+shutdown_event = None  # set to stop serve_bridge()
+
+# Startup timing: monotonic start, and seconds from it to each milestone
+# ("listening", "device_ready", "first_shot")
+bridge_start_ns = None
+startup_times = {}
+
+# Haptic device backend (ForceTube hardware or simulator), set up by serve_bridge()
+device = None
+device_lanes = None  # per-channel worker threads for blocking device calls (None: call inline)
+
+# Every device Shot goes through the scheduler so the receive loop never sleeps
+scheduler = None
+
+# Binary protocol loss/reorder/latency counters per sender address
+source_stats = {}
 
+# Collapses redundant shot/trigger events within each batch, set up by serve_bridge()
+coalescer = None
 
-def percent_to_raw(percent):
-    """Convert percentage (0-100) to raw value (0-255)"""
-    return int(percent * 2.55)
+# Receive -> Shot latency histograms (None when tracing is switched off)
+latency_recorder = None
+
+# Event counters for the stats endpoint
+event_counts = {"received": 0, "bad": 0, "mode_changes": 0, "auto_fire_sessions": 0}
+held_events = {"replayed": 0, "stale": 0, "overflowed": 0}  # held while the device connected
+ignored_events = {'right': 0, 'left': 0}  # dropped because the hand is ignored
+shot_rates = RateMeter()  # Shots/sec per channel, sampled once a second
+driver_protocol = None
+
+# Shared-memory status block read by the GUI, and the control listener
+# that pushes change events for it to subscribed GUIs
+status_block = None
+control_protocol = None
+
+# Scheduler tags
+FEEDBACK_TAG = "feedback"
 
 
 def load_config():
-    """Load configuration from JSON file"""
-    global last_config_mtime
+    """Load configuration from JSON file, returns False if the file couldn't be used (yet)"""
+    global last_config_signature, rejected_config_signature, active_config, config_reload_count, last_config_apply_ms
     
-    if not os.path.exists(CONFIG_FILE):
-        print(f"[CONFIG] No config file found, using defaults")
-        return
+    signature = file_signature(CONFIG_FILE)
+    if signature is None:
+        log.info("[CONFIG] No config file found, using defaults")
+        return True
+    
+    if signature == last_config_signature:
+        return True  # No changes
     
     try:
-        # Check if file has been modified
-        mtime = os.path.getmtime(CONFIG_FILE)
-        if mtime == last_config_mtime:
-            return  # No changes
-        
         with open(CONFIG_FILE, 'r') as f:
             new_config = json.load(f)
+        if not isinstance(new_config, dict):
+            raise ValueError("config must be a JSON object")
         
-        with config_lock:
-            config.update(new_config)
-        
-        last_config_mtime = mtime
-        
+        # Validate by compiling before touching the live config
+        merged = dict(config)
+        merged.update(new_config)
+        if last_config_signature is not None and merged == config:
+            # Just the GUI persisting values it already pushed over the control channel
+            last_config_signature = signature
+            return True
+        snapshot = compile_config(merged)
+        config.update(merged)
+    except (ValueError, KeyError, TypeError) as e:
+        # Most likely caught the GUI mid-write: keep the previous snapshot.
+        # Retries and repeated change events re-read the same file: warn once.
+        if signature != rejected_config_signature:
+            rejected_config_signature = signature
+            log.warning("[CONFIG] Ignoring incomplete/invalid config (%s), keeping previous settings", e)
+        return False
+    except OSError as e:
+        log.error("[CONFIG] Error loading config: %s", e)
+        return False
+    
+    # Publish the new snapshot (or the active profile's over it) in one reference swap
+    active_config = rebase_profiles(snapshot)
+    if device_lanes is not None:
+        # Start lanes for newly routed channels now rather than on their first Shot
+        for channel in profile_bank.channels:
+            device_lanes.lane(channel)
+    if last_config_signature is not None:
+        # Write-to-applied time only means something for changes made while running
+        config_reload_count += 1
+        last_config_apply_ms = max(0.0, (time.time_ns() - signature[0]) / 1e6)
+    last_config_signature = signature
+    
+    try:
         # Write driver config file for C++ driver
         write_driver_config()
         
-        print(f"\n{'='*50}")
-        print(f"CONFIG LOADED")
-        print(f"{'='*50}")
-        print(f"  Mode: {config['mode_select']}")
-        print(f"  Feedback: {config['feedback']}")
-        print(f"  Latency: {config['latency']}ms")
-        print(f"  Single: Kick={config['single_kick']}% Rumble={config['single_rumble']}% Dur={config['single_duration']}ms")
-        print(f"  Burst: Kick={config['burst_kick']}% Rumble={config['burst_rumble']}% Dur={config['burst_duration']}ms Count={config['burst_count']}")
-        print(f"  Auto: Kick={config['auto_kick']}% Rumble={config['auto_rumble']}% Dur={config['auto_duration']}ms Rate={config['auto_rate']}ms")
-        print(f"{'='*50}\n")
+        if log.isEnabledFor(logging.INFO):
+            banner = [
+                f"\n{'='*50}",
+                f"CONFIG LOADED",
+                f"{'='*50}",
+                f"  Mode: {config['mode_select']}",
+                f"  Feedback: {config['feedback']}",
+                f"  Latency: {config['latency']}ms",
+                f"  Single: Kick={config['single_kick']}% Rumble={config['single_rumble']}% Dur={config['single_duration']}ms",
+                f"  Burst: Kick={config['burst_kick']}% Rumble={config['burst_rumble']}% Dur={config['burst_duration']}ms Count={config['burst_count']}",
+                f"  Auto: Kick={config['auto_kick']}% Rumble={config['auto_rumble']}% Dur={config['auto_duration']}ms Rate={config['auto_rate']}ms",
+            ]
+            if active_profile is not None:
+                banner.append(f"  Profile: {active_profile} (overrides {', '.join(profile_bank.profiles[active_profile].overrides)})")
+            if active_config.routes != DEFAULT_ROUTES:
+                banner.append(f"  Routes: {describe_routes(active_config.routes)}")
+            if active_config.custom_patterns:
+                banner.append(f"  Patterns: {', '.join(active_config.custom_patterns)}")
+            if config_reload_count:
+                banner.append(f"  Applied {last_config_apply_ms:.1f}ms after write (reload #{config_reload_count})")
+            banner.append(f"{'='*50}\n")
+            log.info("\n".join(banner))
         
     except Exception as e:
-        print(f"[CONFIG] Error loading config: {e}")
+        log.error("[CONFIG] Error reporting config: %s", e)
+    
+    return True
 
 
 def write_driver_config():
     """Write config file for C++ driver to read"""
     try:
-        with config_lock:
-            mode_select = config['mode_select']
-            filter_window = config.get('filter_window_ms', 60)
+        values = effective_config()
+        mode_select = values['mode_select']
+        filter_window = values.get('filter_window_ms', 60)
         
         # Map GUI mode names to driver mode names
         mode_map = {
@@ -167,94 +252,394 @@ def write_driver_config():
             f.write(f"kick_duration=100\n")
             f.write(f"filter_window_ms={filter_window}\n")
         
-        print(f"[DRIVER CONFIG] Written: mode={driver_mode}, filter={filter_window}ms")
-        print(f"[DRIVER CONFIG] Location: {DRIVER_CONFIG_FILE}")
+        log.info("[DRIVER CONFIG] Written: mode=%s, filter=%sms", driver_mode, filter_window)
+        log.info("[DRIVER CONFIG] Location: %s", DRIVER_CONFIG_FILE)
         
     except Exception as e:
-        print(f"[DRIVER CONFIG] Error writing: {e}")
+        log.error("[DRIVER CONFIG] Error writing: %s", e)
 
 
-def config_watcher():
-    """Watch config file for changes and reload"""
-    global bridge_running
+def apply_config_delta(changes):
+    """Apply validated field changes pushed by the GUI, returns the new snapshot version
     
-    print("[CONFIG] Config file watcher started")
+    Fields the active profile overrides are what the GUI shows for them, so
+    changes to those go to the profile (and its file); the rest to the
+    base config.
+    """
+    global active_config
     
-    while bridge_running:
-        load_config()
-        time.sleep(1.0)  # Check every second
+    profile = profile_bank.profiles.get(active_profile)
+    overrides = {}
+    if profile is not None:
+        overrides = {key: value for key, value in changes.items() if key in profile.overrides}
+        changes = {key: value for key, value in changes.items() if key not in overrides}
+    
+    merged = dict(config)
+    merged.update(changes)
+    snapshot = compile_config(merged)
+    if overrides:
+        # Validate the profile with its changes before touching anything
+        profile_values = dict(merged)
+        profile_values.update(profile.overrides)
+        profile_values.update(overrides)
+        compile_config(profile_values)
+        profile.overrides.update(overrides)
+        schedule_profile_save(profile)
+    config.update(changes)
+    active_config = rebase_profiles(snapshot)
     
-    print("[CONFIG] Config file watcher stopped")
+    return active_config.version
 
 
-def battery_watcher():
-    """Monitor battery level and write to file for GUI"""
-    global bridge_running
+def schedule_profile_save(profile):
+    """Write a changed profile to its file once the GUI's changes to it stop (write-behind)"""
+    pending = profile_saves.pop(profile.name, None)
+    if pending is not None:
+        pending.cancel()
+    if bridge_loop is None:
+        write_profile(profile)
+    else:
+        profile_saves[profile.name] = bridge_loop.call_later(PROFILE_SAVE_DELAY, write_profile, profile)
+
+
+def write_profile(profile):
+    profile_saves.pop(profile.name, None)
+    try:
+        save_profile(profile, PROFILES_DIR)
+        log.info("[PROFILE] Saved %s", profile.name)
+    except OSError as e:
+        log.error("[PROFILE] Can't save %s: %s", profile.name, e)
+
+
+def effective_config():
+    """Config values in effect: the active profile's fields over the base config"""
+    if active_profile is None:
+        return config
+    return profile_bank.values.get(active_profile, config)
+
+
+def rebase_profiles(base_snapshot):
+    """Recompile the profile bank over a new base config, returns the snapshot to make live"""
+    for name, error in profile_bank.compile(config, base_snapshot).items():
+        log.warning("[PROFILE] %s doesn't compile over the new settings (%s); it uses them unchanged", name, error)
+    return profile_bank.select(active_profile)
+
+
+def switch_profile(name, source):
+    """Make a preloaded profile live (None: the base config), KeyError if there's no such profile
+    
+    The shot path only sees the snapshot reference change; the driver
+    config file and the GUI are brought up to date afterwards.
+    """
+    global active_config, active_profile, last_profile_swap_ns
     
-    if not battery_available:
+    previous = effective_config()
+    start = time.perf_counter_ns()
+    active_config = profile_bank.select(name)
+    last_profile_swap_ns = time.perf_counter_ns() - start
+    active_profile = name
+    profile_switches[source] += 1
+    log.info("[PROFILE] %s (%s, swapped in %.1fus)", name or "Base config", source, last_profile_swap_ns / 1000)
+    
+    current = effective_config()
+    if any(previous.get(key) != current.get(key) for key in DRIVER_FIELDS):
+        write_driver_config()
+    if status_block is not None:
+        publish_status()
+        notify_status(NOTIFY_PROFILE)
+    return active_config
+
+
+def cycle_profile(offset):
+    """Controller gesture: step to the next (or previous) profile, the base config included"""
+    if not profile_bank.names:
+        log.info("[PROFILE] No profiles in %s/ to switch to", PROFILES_DIR)
+        return
+    switch_profile(profile_bank.step(active_profile, offset), "driver")
+
+
+def select_profile_message(name):
+    """Driver 'profile:<name>' message: switch by name ('base' or empty for the base config)
+
+    Profiles can't be named after the keywords (protube_profiles.RESERVED_NAMES).
+    """
+    # Exact "profile:next"/"profile:prev" datagrams hit the dispatch table;
+    # these only get here with whitespace that handle_text_message stripped
+    if name in ("next", "prev"):
+        cycle_profile(1 if name == "next" else -1)
         return
+    try:
+        switch_profile(None if name in ("", "base") else name, "driver")
+    except KeyError:
+        log.warning("[PROFILE] Unknown profile '%s' (have: %s)", name, ", ".join(profile_bank.names) or "none")
+
+
+class ControlProtocol(asyncio.DatagramProtocol):
+    """Serve GUI commands and status subscriptions on the local control port"""
     
-    print("[BATTERY] Battery monitor started")
+    def __init__(self):
+        self.subscribers = {}  # addr -> loop time the subscription expires
+        self.event_seq = 0
+        self.replies = collections.OrderedDict()  # (addr, id) -> reply, for resent commands
     
-    while bridge_running:
+    def connection_made(self, transport):
+        self.transport = transport
+        log.info("[CONTROL] Listening for GUI commands on port %s", CONTROL_PORT)
+    
+    def connection_lost(self, exc):
+        log.info("[CONTROL] Control listener stopped")
+    
+    def error_received(self, exc):
+        pass  # Windows reports ICMP port-unreachable from an earlier reply here
+    
+    def datagram_received(self, data, addr):
         try:
-            # Try to get battery level for right hand (channel 4)
-            # Function signature may vary - trying common patterns
-            battery_level = forcetube.GetBatteryLevel(4)
-            
-            # Write to file for GUI to read
-            with open(BATTERY_FILE, 'w') as f:
-                f.write(str(battery_level))
-            
-            # Only print on battery level changes
-            if not hasattr(battery_watcher, 'last_level') or battery_watcher.last_level != battery_level:
-                print(f"[BATTERY] Level: {battery_level}%")
-                battery_watcher.last_level = battery_level
-                
-        except Exception as e:
-            # If battery function doesn't work, write a default value
-            with open(BATTERY_FILE, 'w') as f:
-                f.write("100")  # Default to 100% if we can't read it
-        
-        time.sleep(10.0)  # Check every 10 seconds
-    
-    print("[BATTERY] Battery monitor stopped")
-
-
-def get_mode_config(mode):
-    """Get kick/rumble/duration for a specific mode"""
-    with config_lock:
-        if mode == SINGLE_SHOT:
-            kick = percent_to_raw(config["single_kick"])
-            rumble = percent_to_raw(config["single_rumble"])
-            duration = config["single_duration"]
-        elif mode == BURST_FIRE:
-            kick = percent_to_raw(config["burst_kick"])
-            rumble = percent_to_raw(config["burst_rumble"])
-            duration = config["burst_duration"]
-        elif mode == FULL_AUTO:
-            kick = percent_to_raw(config["auto_kick"])
-            rumble = percent_to_raw(config["auto_rumble"])
-            duration = config["auto_duration"]
+            verb, cmd_id, body = parse_request(data)
+        except (ValueError, UnicodeDecodeError):
+            log.warning("[CONTROL] Malformed request: %r", data)
+            return
+        
+        if verb == "sub":
+            self.subscribe(cmd_id, addr)
+            return
+        
+        # A resend whose reply got lost: answer again without running it twice
+        key = (addr, cmd_id)
+        reply = self.replies.get(key)
+        if reply is not None:
+            self.transport.sendto(reply, addr)
+            return
+        
+        try:
+            if verb == "set":
+                changes = decode_set(body)
+                reply = encode_ack(cmd_id, apply_config_delta(changes))
+            elif verb == "mode":
+                reply = encode_ack(cmd_id, self.set_fire_mode(body))
+            elif verb == "profile":
+                reply = encode_ack(cmd_id, self.set_profile(body))
+            elif verb == "quit":
+                reply = encode_ack(cmd_id, "")
+            else:
+                raise ValueError(f"unknown command '{verb}'")
+        except ValueError as e:
+            self.reply(key, encode_nak(cmd_id, e))
+            log.warning("[CONTROL] Rejected %s:%s: %s", verb, body, e)
+            return
+        
+        # Ack first: the work below is not on the apply path
+        self.reply(key, reply)
+        if verb == "set":
+            log.info("[CONTROL] Applied %s (config v%s)", body, active_config.version)
+            if any(key in changes for key in DRIVER_FIELDS):
+                write_driver_config()
+        elif verb == "quit":
+            log.info("[CONTROL] Shutdown requested by the GUI")
+            stop_bridge()
+    
+    def reply(self, key, reply):
+        """Send a reply and keep it for a resend of the same command"""
+        self.replies[key] = reply
+        if len(self.replies) > REPLY_CACHE_SIZE:
+            self.replies.popitem(last=False)
+        self.transport.sendto(reply, key[0])
+    
+    def set_fire_mode(self, mode):
+        """Fire mode command: switch like the controller button does"""
+        if mode not in FIRE_MODES:
+            raise ValueError(f"unknown fire mode '{mode}'")
+        if driver_protocol is None:
+            raise ValueError("device not ready")
+        if driver_protocol.ready:
+            handle_mode_change(mode)
         else:
-            kick, rumble, duration = 255, 120, 100
+            # Held and replayed in order with the driver's own events
+            driver_protocol.hold(text_dispatch[f"mode:{mode}".encode()])
+        return mode
+    
+    def set_profile(self, name):
+        """Profile command: swap in a preloaded profile, returns the live config version"""
+        try:
+            return switch_profile(name or None, "gui").version
+        except KeyError:
+            raise ValueError(f"unknown profile '{name}'") from None
+    
+    def subscribe(self, cmd_id, addr):
+        """Start or renew a subscription and tell the subscriber where the bridge is"""
+        if addr not in self.subscribers:
+            log.info("[CONTROL] Status subscriber %s:%s", addr[0], addr[1])
+        self.subscribers[addr] = bridge_loop.time() + SUBSCRIPTION_TTL
+        self.transport.sendto(encode_ack(cmd_id, active_config.version), addr)
+        # The current state, as if the subscriber had been there all along
+        state = NOTIFY_STARTED if status_block.state == STATE_STARTING else NOTIFY_READY
+        self.event_seq += 1
+        self.transport.sendto(encode_event(self.event_seq, state), addr)
+    
+    def notify(self, name):
+        """Push a status event to every live subscriber"""
+        if not self.subscribers:
+            return
+        self.event_seq += 1
+        message = encode_event(self.event_seq, name)
+        now = bridge_loop.time()
+        for addr, expires in list(self.subscribers.items()):
+            if expires < now:
+                del self.subscribers[addr]  # GUI went away without saying so
+                continue
+            self.transport.sendto(message, addr)
+
+
+def on_config_file_changed(path):
+    """FileWatcher callback: reload, asking for a retry if the file was half-written"""
+    return load_config()
+
+
+async def device_call(func, *args, channel=None):
+    """Call a device function, on a worker thread if it may block
+
+    Calls for a channel go through that channel's lane, in order with its
+    Shots; others (startup) run on the loop's default executor.
+    """
+    if device_lanes is None:
+        return func(*args)
+    if channel is None:
+        return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+    return await asyncio.wrap_future(device_lanes.call(channel, func, *args))
+
+
+async def battery_watcher():
+    """Monitor battery levels and publish them in the status block"""
+    if not device.battery_available:
+        return
+    
+    log.info("[BATTERY] Battery monitor started")
     
-    return kick, rumble, duration
+    try:
+        while True:
+            await read_battery()
+            await asyncio.sleep(BATTERY_INTERVAL)
+    finally:
+        log.info("[BATTERY] Battery monitor stopped")
 
 
-def send_kick_feedback(channel, num_pulses):
-    """Send weak kick feedback pattern (1-3 pulses = mode indicator)"""
-    with config_lock:
-        if not config["feedback"]:
-            print(f"  [KICK FEEDBACK] Disabled in settings")
-            return
+async def read_battery():
+    """Read the battery level of every routed channel once and publish it for the GUI"""
+    changed = False
+    for channel in active_config.channels:
+        try:
+            battery_level = int(await device_call(device.get_battery_level, channel, channel=channel))
+        except Exception as e:
+            # Unknown, rather than pretending the battery is full
+            battery_level = BATTERY_UNKNOWN
+            log.debug("[BATTERY] Can't read channel %s: %s", channel, e)
+        
+        # Only log battery level changes
+        if status_block.battery[channel] != battery_level:
+            if battery_level != BATTERY_UNKNOWN:
+                log.info("[BATTERY] Channel %s: %s%%", channel, battery_level)
+            status_block.battery[channel] = battery_level
+            changed = True
+    publish_status()
+    if changed:
+        notify_status(NOTIFY_BATTERY)
+
+
+async def wait_for_device():
+    """Poll the device's is_ready() until it connects or its ready_timeout runs out
+
+    Returns False if the bridge was told to stop meanwhile.
+    """
+    channels = active_config.channels
+    deadline = now_ns() + int(device.ready_timeout * 1e9)
+    while not await device_call(device.is_ready, channels):
+        if now_ns() >= deadline:
+            log.warning("[STARTUP] Device not ready after %.0fs, going ahead anyway", device.ready_timeout)
+            return True
+        try:
+            await asyncio.wait_for(shutdown_event.wait(), READY_POLL_SECONDS)
+        except asyncio.TimeoutError:
+            continue
+        return False
+    return not shutdown_event.is_set()
+
+
+async def profile_autoselect():
+    """Switch to the profile of the game that is running
+    
+    Edge-triggered: it switches when a different game is detected, and back
+    to the base config when that game exits, so a profile picked by hand in
+    between sticks.
+    """
+    global process_scanner, last_process_scan_ms
+    
+    process_scanner = ProcessScanner()
+    loop = asyncio.get_running_loop()
+    detected = None
+    log.info("[PROFILE] Auto-selecting profiles for: %s", ", ".join(sorted(profile_bank.by_process)))
+    
+    while True:
+        start = time.perf_counter()
+        running = await loop.run_in_executor(None, process_scanner.scan)
+        last_process_scan_ms = (time.perf_counter() - start) * 1000
+        found = profile_bank.match(running)
+        if found != detected:
+            if found is not None:
+                switch_profile(found, "auto")
+            elif active_profile == detected:
+                switch_profile(None, "auto")  # Its game exited
+            detected = found
+        await asyncio.sleep(PROFILE_SCAN_INTERVAL)
+
+
+def publish_status():
+    """Copy the live bridge state into the shared status block"""
+    status_block.fire_mode = current_mode
+    status_block.config_version = active_config.version
+    status_block.profile = active_profile or ""
+    if scheduler is not None:
+        status_block.shots = sum(scheduler.issued.values())
+    status_block.publish()
+
+
+def notify_status(name):
+    """Tell subscribed GUIs the status block changed (publish it first)"""
+    if control_protocol is not None:
+        control_protocol.notify(name)
+
+
+def note_startup(phase, at_ns=None):
+    """Record how long after start the bridge reached a milestone"""
+    seconds = ((at_ns or now_ns()) - bridge_start_ns) / 1e9
+    startup_times[phase] = seconds
+    log.info("[STARTUP] %s after %.0fms", phase.replace("_", " ").capitalize(), seconds * 1000)
+
+
+async def status_heartbeat():
+    """Refresh the status block's heartbeat and headline latency stats, and prove liveness"""
+    while True:
+        if "first_shot" not in startup_times and scheduler.first_issue_ns is not None:
+            note_startup("first_shot", scheduler.first_issue_ns)
+        if latency_recorder is not None:
+            device_latency = latency_recorder.combined("device")
+            status_block.latency_p50_us = device_latency.percentile(50) // 1000
+            status_block.latency_p99_us = device_latency.percentile(99) // 1000
+            status_block.latency_max_us = device_latency.max // 1000
+        publish_status()
+        notify_status(NOTIFY_HEARTBEAT)
+        await asyncio.sleep(STATUS_INTERVAL)
+
+
+def send_kick_feedback(mode):
+    """Queue the mode's feedback pattern (by default 1-3 weak kicks = mode indicator)"""
+    cfg = active_config
+    if not cfg.feedback:
+        log.info("  [KICK FEEDBACK] Disabled in settings")
+        return
     
-    print(f"  [KICK FEEDBACK] Sending {num_pulses} light kicks to channel {channel}")
-    for i in range(num_pulses):
-        print(f"    Kick {i+1}: Shot(1, 0, 5, {channel})")
-        forcetube.Shot(1, 0, 5, channel)  # Minimal kick=1, no rumble, duration=5ms
-        if i < num_pulses - 1:
-            time.sleep(0.175)  # 175ms between kicks
+    steps = cfg.feedback_patterns[mode]
+    log.info("  [KICK FEEDBACK] Sending %s-step pattern to channel %s", len(steps),
+             "+".join(map(str, cfg.routes[ROUTE_FEEDBACK])))
+    scheduler.schedule_pattern(steps, tag=FEEDBACK_TAG)
 
 
 def handle_mode_change(mode_name):
@@ -263,235 +648,735 @@ def handle_mode_change(mode_name):
     
     if mode_name == "single":
         current_mode = SINGLE_SHOT
-        pulses = 1
     elif mode_name == "burst":
         current_mode = BURST_FIRE
-        pulses = 2
     elif mode_name == "auto":
         current_mode = FULL_AUTO
-        pulses = 3
     else:
         return
+    event_counts["mode_changes"] += 1
+    
+    # Drop pulses still queued from the old mode (pending bursts, old feedback)
+    dropped = scheduler.cancel('right', 'left', FEEDBACK_TAG)
+    for hand in ['right', 'left']:
+        stop_auto_fire(hand)
+    if dropped:
+        log.info("  [SCHEDULER] Dropped %s pending pulses", dropped)
     
-    print(f"\n{'='*50}")
-    print(f"MODE CHANGED: {MODE_NAMES[current_mode]}")
-    print(f"{'='*50}\n")
+    log.info("\n%s\nMODE CHANGED: %s\n%s\n", '='*50, MODE_NAMES[current_mode], '='*50)
+    publish_status()
+    notify_status(NOTIFY_MODE)
     
     # Send light kick feedback on right hand (where mode button is)
-    send_kick_feedback(4, pulses)
+    send_kick_feedback(current_mode)
 
 
-def auto_fire_loop(hand, channel):
-    """Continuously kick while trigger is held in full auto mode"""
-    print(f"  [AUTO-FIRE START] {hand.upper()} hand")
-    
-    while not stop_auto_fire[hand].is_set() and trigger_held[hand]:
-        kick, rumble, duration = get_mode_config(FULL_AUTO)
-        with config_lock:
-            fire_rate = config["auto_rate"]
-        
-        forcetube.Shot(kick, rumble, duration, channel)
-        time.sleep(fire_rate / 1000.0)
+def start_auto_fire(hand, route, cfg):
+    """Start playing the auto round pattern every auto_rate ms on an absolute deadline grid"""
+    period_ns = ms_to_ns(cfg.auto_rate_ms)
     
+    cadence = CadenceStats(period_ns)
+    auto_fire_cadence[hand] = cadence
+    auto_fire_active[hand] = True
+    status_block.set_auto_fire(hand, True)
+    event_counts["auto_fire_sessions"] += 1
+    scheduler.schedule_pattern_repeating(cfg.patterns[FULL_AUTO][route], period_ns,
+                                         tag=hand, cadence=cadence)
+    log.info("  [AUTO-FIRE START] %s hand", hand.upper())
+
+
+def stop_auto_fire(hand):
+    """Stop a running full auto session and report its cadence"""
+    if not auto_fire_active[hand]:
+        return
+    scheduler.cancel(hand)
     auto_fire_active[hand] = False
-    print(f"  [AUTO-FIRE STOP] {hand.upper()} hand")
+    status_block.set_auto_fire(hand, False)
+    if log.isEnabledFor(logging.INFO):
+        log.info("  [AUTO-FIRE STOP] %s hand - %s", hand.upper(), auto_fire_cadence[hand].summary())
 
 
-def handle_shot(hand, channel):
-    """Handle shot based on current fire mode"""
+def handle_shot(hand, route):
+    """Handle shot based on current fire mode (only enqueues, never sleeps)"""
     
-    # Apply latency if configured
-    with config_lock:
-        latency_ms = config["latency"]
-    
-    if latency_ms > 0:
-        time.sleep(latency_ms / 1000.0)
+    # One snapshot for the whole shot; a concurrent reload can't mix settings.
+    # Its compiled patterns already include the latency compensation.
+    cfg = active_config
     
     if current_mode == SINGLE_SHOT:
-        kick, rumble, duration = get_mode_config(SINGLE_SHOT)
-        forcetube.Shot(kick, rumble, duration, channel)
-        print(f"  [SINGLE] {hand}")
+        scheduler.schedule_pattern(cfg.patterns[SINGLE_SHOT][route], tag=hand)
+        log.debug("  [SINGLE] %s", hand)
         
     elif current_mode == BURST_FIRE:
-        # Check cooldown
-        now = datetime.now()
-        
-        with config_lock:
-            burst_cooldown = 200  # Fixed cooldown
+        # Check cooldown (on the scheduler's clock, so it follows simulated time too)
+        now = scheduler.clock.now_ns()
         
         if last_burst_time[hand] is not None:
-            time_since_last_burst = (now - last_burst_time[hand]).total_seconds() * 1000
-            if time_since_last_burst < burst_cooldown:
-                print(f"  [BURST COOLDOWN] {hand} - too soon, ignoring")
+            time_since_last_burst = (now - last_burst_time[hand]) / 1e6
+            if time_since_last_burst < BURST_COOLDOWN_MS:
+                log.debug("  [BURST COOLDOWN] %s - too soon, ignoring", hand)
                 return
         
-        # Get burst settings
-        kick, rumble, duration = get_mode_config(BURST_FIRE)
-        with config_lock:
-            burst_count = config["burst_count"]
-            burst_rate = config["auto_rate"]  # Use auto_rate for burst spacing
-        
-        # Burst: Multiple rapid kicks
-        for i in range(burst_count):
-            forcetube.Shot(kick, rumble, duration, channel)
-            if i < burst_count - 1:
-                time.sleep(burst_rate / 1000.0)
+        # Burst: Multiple rapid kicks (burst_count rounds auto_rate apart by default)
+        steps = cfg.patterns[BURST_FIRE][route]
+        scheduler.schedule_pattern(steps, tag=hand)
         
         last_burst_time[hand] = now
-        print(f"  [BURST] {burst_count} rounds ({hand})")
+        log.debug("  [BURST] %s rounds on %s channels (%s)", len(steps) // len(cfg.routes[route]),
+                  len(cfg.routes[route]), hand)
         
     elif current_mode == FULL_AUTO:
         # Full auto: Start continuous fire if trigger is held
         if trigger_held[hand] and not auto_fire_active[hand]:
-            auto_fire_active[hand] = True
-            stop_auto_fire[hand].clear()
-            
-            auto_fire_threads[hand] = threading.Thread(
-                target=auto_fire_loop,
-                args=(hand, channel),
-                daemon=True
-            )
-            auto_fire_threads[hand].start()
+            start_auto_fire(hand, route, cfg)
     
     elif current_mode == HAPTIC_EXPERIMENTAL:
         # Haptic Experimental: Immediate passthrough with no fire mode logic
         # Uses Single Shot settings for customization
-        kick, rumble, duration = get_mode_config(SINGLE_SHOT)
-        forcetube.Shot(kick, rumble, duration, channel)
-        print(f"  [EXPERIMENTAL] {hand}")
+        scheduler.schedule_pattern(cfg.patterns[HAPTIC_EXPERIMENTAL][route], tag=hand)
+        log.debug("  [EXPERIMENTAL] %s", hand)
 
 
 def handle_trigger_state(hand, state):
     """Handle trigger press/release for full auto mode"""
     was_held = trigger_held[hand]
     trigger_held[hand] = (state == "1")
+    if trigger_held[hand] != was_held:
+        status_block.set_trigger(hand, trigger_held[hand])
     
     # Trigger state changed
     if was_held and not trigger_held[hand]:
-        # Trigger released - stop auto fire
-        if auto_fire_active[hand]:
-            stop_auto_fire[hand].set()
+        # Trigger released - stop auto fire and drop its pending rounds
+        stop_auto_fire(hand)
     elif not was_held and trigger_held[hand]:
         # Trigger pressed - will be handled by shot message
         pass
 
 
-# Load initial config
-load_config()
-
-# Start config file watcher in separate thread
-config_thread = threading.Thread(target=config_watcher, daemon=True)
-config_thread.start()
-
-# Start battery monitor in separate thread
-battery_thread = threading.Thread(target=battery_watcher, daemon=True)
-battery_thread.start()
-
-# Set up UDP listener for driver messages
-sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-sock.bind((UDP_IP, UDP_PORT))
-sock.settimeout(0.5)  # 500ms timeout for responsive shutdown
-
-print(f"\nListening on port {UDP_PORT} (driver messages)...")
-print(f"Watching config file: {CONFIG_FILE}")
-print(f"\nFire Mode Controls:")
-print(f"  B Button (upper right button on right controller):")
-print(f"    Hold 1 second   = Single Shot")
-print(f"    Double tap      = Burst Fire")
-print(f"    Triple tap      = Full Auto")
-print(f"\nCurrent Mode: {MODE_NAMES[current_mode]}")
-print(f"\nKick Feedback:")
-print(f"  1 pulse  = Single Shot")
-print(f"  2 pulses = Burst Fire")
-print(f"  3 pulses = Full Auto")
-print(f"\nWaiting for input...\n")
-
-try:
-    while bridge_running:
-        try:
-            data, addr = sock.recvfrom(1024)
-            message = data.decode('utf-8').strip()
-            
-            # Mode changes
-            if message.startswith("mode:"):
-                mode_name = message.split(":")[1]
-                handle_mode_change(mode_name)
-            
-            # Trigger state updates (for full auto)
-            elif message.startswith("trigger_"):
-                parts = message.split(":")
-                # Swap right/left to match actual controller orientation
-                hand = "left" if "right" in parts[0] else "right"
-                state = parts[1]
-                
-                # Check if hand should be ignored
-                if hand == "left":
-                    with config_lock:
-                        ignore_left = config.get("ignore_left_hand", False)
-                    if ignore_left:
-                        continue  # Skip left hand trigger events
-                elif hand == "right":
-                    with config_lock:
-                        ignore_right = config.get("ignore_right_hand", False)
-                    if ignore_right:
-                        continue  # Skip right hand trigger events
-                
-                handle_trigger_state(hand, state)
-            
-            # Shot events (from haptics)
-            elif message == "shot_right":
-                # Check if left hand should be ignored (right message = left controller)
-                with config_lock:
-                    ignore_left = config.get("ignore_left_hand", False)
-                if not ignore_left:
-                    handle_shot('left', 5)
-            elif message == "shot_left":
-                # Check if right hand should be ignored (left message = right controller)
-                with config_lock:
-                    ignore_right = config.get("ignore_right_hand", False)
-                if not ignore_right:
-                    handle_shot('right', 4)
-            
-            # Debug messages
-            elif message.startswith("duration:"):
-                pass  # Ignore debug duration messages
-            else:
-                print(f"Received: {message}")
+# === DRIVER MESSAGE DISPATCH ===
+
+def on_shot_message(hand, route):
+    """Shot event for a hand, unless that hand is ignored"""
+    if not active_config.ignore_route[route]:
+        handle_shot(hand, route)
+    else:
+        ignored_events[hand] += 1
+
+
+def on_trigger_message(hand, state):
+    """Trigger state event for a hand, unless that hand is ignored"""
+    if not active_config.ignore_hand[hand]:
+        handle_trigger_state(hand, state)
+    else:
+        ignored_events[hand] += 1
+
+
+def build_dispatch_tables():
+    """Precompile every fixed driver message to a bound handler
+    
+    Returns (text_table, binary_table, event_kinds): raw datagram bytes ->
+    handler, binary_key(type, hand, payload) -> handler for binary protocol
+    events, and handler -> (kind, hand, value) for the coalescer.
+    """
+    text_table = {}
+    binary_table = {}
+    event_kinds = {}
+    
+    # Swap right/left to match actual controller orientation
+    for driver_side, proto_hand, hand in (("right", HAND_RIGHT, "left"), ("left", HAND_LEFT, "right")):
+        shot = partial(on_shot_message, hand, HAND_ROUTES[hand])
+        text_table[f"shot_{driver_side}".encode()] = shot
+        binary_table[binary_key(EVENT_SHOT, proto_hand, 0)] = shot
+        event_kinds[shot] = (KIND_SHOT, hand, None)
         
-        except socket.timeout:
-            continue  # Normal timeout, keep looping
-        except Exception as e:
-            if bridge_running:
-                print(f"Error processing message: {e}")
-            
-except KeyboardInterrupt:
-    print("\nShutting down...")
-finally:
-    bridge_running = False
+        for state in (0, 1):
+            trigger = partial(on_trigger_message, hand, str(state))
+            text_table[f"trigger_{driver_side}:{state}".encode()] = trigger
+            binary_table[binary_key(EVENT_TRIGGER, proto_hand, state)] = trigger
+            event_kinds[trigger] = (KIND_TRIGGER, hand, state)
     
-    # Stop all auto-fire threads
-    for hand in ['right', 'left']:
-        if auto_fire_active[hand]:
-            stop_auto_fire[hand].set()
+    for mode_id, mode_name in MODE_IDS.items():
+        change = partial(handle_mode_change, mode_name)
+        text_table[f"mode:{mode_name}".encode()] = change
+        for proto_hand in (HAND_RIGHT, HAND_LEFT):
+            binary_table[binary_key(EVENT_MODE, proto_hand, mode_id)] = change
+        event_kinds[change] = (KIND_MODE, None, mode_name)
+    
+    # Controller gesture for stepping through the profiles
+    text_table[b"profile:next"] = partial(cycle_profile, 1)
+    text_table[b"profile:prev"] = partial(cycle_profile, -1)
+    
+    return text_table, binary_table, event_kinds
+
+
+def handle_text_message(message):
+    """Slow path: parse a text message that isn't in the dispatch table"""
+    message = message.strip()
+    
+    # Mode changes
+    if message.startswith("mode:"):
+        mode_name = message.split(":")[1]
+        handle_mode_change(mode_name)
+    
+    # Profile by name (profile:next/prev are in the dispatch table)
+    elif message.startswith("profile:"):
+        select_profile_message(message.split(":", 1)[1])
+    
+    # Trigger state updates (for full auto)
+    elif message.startswith("trigger_"):
+        parts = message.split(":")
+        # Swap right/left to match actual controller orientation
+        hand = "left" if "right" in parts[0] else "right"
+        on_trigger_message(hand, parts[1])
+    
+    # Shot events (from haptics)
+    elif message == "shot_right":
+        on_shot_message('left', ROUTE_LEFT)
+    elif message == "shot_left":
+        on_shot_message('right', ROUTE_RIGHT)
+    
+    # Debug messages
+    elif message.startswith("duration:"):
+        pass  # Ignore debug duration messages
+    else:
+        log.info("Received: %s", message)
+
+
+def resolve_binary(data, addr):
+    """Handler for one binary protocol event (None to drop it), tracking the sender's loss/reorder/latency"""
+    event_type, hand, seq, send_ns, payload = decode_event(data)
+    
+    stats = source_stats.get(addr)
+    if stats is None:
+        stats = source_stats[addr] = SourceStats()
+    in_order = stats.record(seq, send_ns, time.monotonic_ns())
+    
+    # A stale press/release must not override the newer trigger state we already applied
+    if not in_order and event_type == EVENT_TRIGGER:
+        return None
     
-    # Wait for watcher threads to finish
-    config_thread.join(timeout=2.0)
-    if battery_available:
-        battery_thread.join(timeout=2.0)
+    handler = binary_dispatch.get(binary_key(event_type, hand, payload))
+    if handler is None:
+        handler = partial(handle_text_message, event_to_message(event_type, hand, payload))
+    return handler
+
+
+def resolve_datagram(data, addr):
+    """Handler for one received datagram (None if it should be dropped)"""
+    # Fast path: the raw datagram is the key - no decode, strip or split
+    handler = text_dispatch.get(data)
+    if handler is not None:
+        return handler
     
-    # Clean up battery file
-    if os.path.exists(BATTERY_FILE):
+    # Binary protocol packets are recognised by their first byte
+    if is_binary(data):
+        return resolve_binary(data, addr)
+    return partial(handle_text_message, data.decode('utf-8'))
+
+
+class DriverProtocol(asyncio.DatagramProtocol):
+    """Driver datagrams -> dispatch-table handlers, coalesced per burst
+    
+    The transport delivers one datagram per callback. Resolved handlers
+    are collected until a loop iteration passes with no new datagram,
+    then the whole batch goes through the coalescer and runs.
+    
+    With a LatencyRecorder every event is timestamped on arrival and
+    dispatched under a LatencyTrace; without one the untraced methods
+    are used as they are.
+    
+    Created with ready=False (the device is still connecting) it only
+    holds the most recent PRE_READY_QUEUE events until replay().
+    """
+    
+    def __init__(self, coalescer, recorder=None, ready=True):
+        self.coalescer = coalescer
+        self.immediate = coalescer.policy == "off"
+        self.pending = []
+        self.fresh = False        # a datagram arrived since the flush was last deferred
+        self.flush_handle = None
+        self.loop = None
+        self.recorder = recorder
+        if recorder is not None:
+            self.arrivals = []    # receive time of each pending handler
+            self.enqueue = self.enqueue_traced
+            self.flush = self.flush_traced
+        self.held = None
+        self.held_dropped = 0
+        if not ready:
+            self.held = collections.deque(maxlen=PRE_READY_QUEUE)  # (receive time, handler)
+            self.enqueue_ready, self.enqueue = self.enqueue, self.hold
+    
+    @property
+    def ready(self):
+        """False while events are being held for the device"""
+        return self.held is None
+    
+    def connection_made(self, transport):
+        self.loop = asyncio.get_running_loop()
         try:
-            os.remove(BATTERY_FILE)
-        except:
-            pass
+            sock = transport.get_extra_info('socket')
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SOCKET_RCVBUF)
+        except OSError:
+            pass  # Keep the OS default
+    
+    def error_received(self, exc):
+        pass  # Windows reports ICMP port-unreachable here
+    
+    def datagram_received(self, data, addr):
+        event_counts["received"] += 1
+        handler = text_dispatch.get(data)
+        if handler is None:
+            try:
+                handler = resolve_datagram(data, addr)
+            except ProtocolError as e:
+                event_counts["bad"] += 1
+                log.warning("[PROTOCOL] Bad packet from %s: %s", addr, e)
+                return
+            except ValueError as e:
+                event_counts["bad"] += 1
+                log.error("Error processing message: %s", e)
+                return
+            if handler is None:
+                return
+        self.enqueue(handler)
+    
+    def enqueue(self, handler):
+        """Add a resolved handler to the batch, flushing or deferring as needed"""
+        self.pending.append(handler)
+        if self.immediate or len(self.pending) >= MAX_BATCH:
+            self.flush()
+            return
+        self.fresh = True
+        if self.flush_handle is None:
+            self.flush_handle = self.loop.call_soon(self.flush_when_quiet)
+    
+    def flush_when_quiet(self):
+        """Keep collecting while datagrams arrive in consecutive loop iterations"""
+        if self.fresh:
+            self.fresh = False
+            self.flush_handle = self.loop.call_soon(self.flush_when_quiet)
+            return
+        self.flush_handle = None
+        self.flush()
+    
+    def flush(self):
+        """Coalesce and run everything collected so far"""
+        handlers, self.pending = self.pending, []
+        for handler in self.coalescer.coalesce(handlers):
+            try:
+                handler()
+            except Exception as e:
+                if bridge_running:
+                    log.error("Error processing message: %s", e)
+    
+    def enqueue_traced(self, handler):
+        self.arrivals.append(now_ns())
+        DriverProtocol.enqueue(self, handler)
+    
+    def hold(self, handler):
+        """Keep an event until the device is ready (the oldest goes when full)"""
+        if len(self.held) == PRE_READY_QUEUE:
+            self.held_dropped += 1
+        self.held.append((now_ns(), handler))
+    
+    def replay(self):
+        """The device is ready: dispatch the held events, then pass new ones straight on
+        
+        Returns (replayed, stale) counts. Replayed events go through the
+        normal batch and coalescer, timed from the replay rather than their
+        arrival so the wait for the device stays out of the latency stats.
+        """
+        held, self.held = self.held, None
+        self.enqueue = self.enqueue_ready
+        del self.enqueue_ready
+        
+        cutoff = now_ns() - ms_to_ns(PRE_READY_SHOT_AGE_MS)
+        replayed = stale = 0
+        for recv_ns, handler in held:
+            kind = event_kinds.get(handler)
+            if kind is not None and kind[0] == KIND_SHOT and recv_ns < cutoff:
+                stale += 1
+                continue
+            self.enqueue(handler)
+            replayed += 1
+        return replayed, stale
+    
+    def flush_traced(self):
+        """flush() with each surviving event dispatched under its own trace"""
+        handlers, self.pending = self.pending, []
+        arrivals, self.arrivals = self.arrivals, []
+        
+        # A coalesced run keeps its first event, so that is the arrival to measure from
+        first_arrival = {}
+        for handler, recv_ns in zip(handlers, arrivals):
+            first_arrival.setdefault(handler, recv_ns)
+        
+        recorder = self.recorder
+        for handler in self.coalescer.coalesce(handlers):
+            kind = event_kinds.get(handler)
+            hand = kind[1] if kind is not None and kind[1] is not None else "-"
+            trace = LatencyTrace(first_arrival[handler], now_ns(), MODE_NAMES[current_mode])
+            recorder.record("dispatch", hand, trace.mode, trace.dispatch_ns - trace.recv_ns)
+            scheduler.current_trace = trace
+            try:
+                handler()
+            except Exception as e:
+                if bridge_running:
+                    log.error("Error processing message: %s", e)
+        scheduler.current_trace = None
+
+
+text_dispatch, binary_dispatch, event_kinds = build_dispatch_tables()
+
+
+def collect_metrics():
+    """Render the bridge's counters as a Prometheus text page"""
+    page = MetricsPage()
+    
+    for channel, total in sorted(scheduler.issued.items()):
+        page.counter("protube_shots_total", "Shots issued to the device", total, channel=channel)
+    for channel, rate in sorted(shot_rates.rates().items()):
+        page.gauge("protube_shots_per_second", "Shots/sec over the last few seconds",
+                   f"{rate:.3f}", channel=channel)
+    
+    page.counter("protube_events_received_total", "Driver datagrams received", event_counts["received"])
+    page.counter("protube_events_bad_total", "Driver datagrams that couldn't be decoded", event_counts["bad"])
+    for hand, total in ignored_events.items():
+        page.counter("protube_events_ignored_total", "Driver events dropped by ignore_left/right_hand",
+                     total, hand=hand)
+    page.counter("protube_events_merged_total", "Duplicate shots folded by the coalescer",
+                 coalescer.stats.merged)
+    page.counter("protube_events_dropped_total", "Redundant trigger events dropped by the coalescer",
+                 coalescer.stats.dropped)
+    for outcome, total in held_events.items():
+        page.counter("protube_events_held_total", "Driver events held while the device connected, by outcome",
+                     total, outcome=outcome)
+    page.counter("protube_mode_changes_total", "Fire mode changes", event_counts["mode_changes"])
+    page.gauge("protube_fire_mode", "Current fire mode (0 single, 1 burst, 2 auto, 3 experimental)", current_mode)
+    page.counter("protube_auto_fire_sessions_total", "Full auto sessions started", event_counts["auto_fire_sessions"])
+    for hand, active in auto_fire_active.items():
+        page.gauge("protube_auto_fire_active", "1 while full auto is firing", int(active), hand=hand)
     
-    # Clean up driver config file
-    if os.path.exists(DRIVER_CONFIG_FILE):
+    for phase, seconds in startup_times.items():
+        page.gauge("protube_startup_seconds", "Time from bridge start to each startup milestone",
+                   f"{seconds:.6f}", phase=phase)
+    
+    for source, total in profile_switches.items():
+        page.counter("protube_profile_switches_total", "Config profile switches, by where they came from",
+                     total, source=source)
+    for name in (None,) + profile_bank.names:
+        page.gauge("protube_profile_active", "1 for the config profile in effect (base: none)",
+                   int(name == active_profile), profile=name or "base")
+    if last_profile_swap_ns is not None:
+        page.gauge("protube_profile_swap_seconds", "Lookup + snapshot swap time of the last profile switch",
+                   f"{last_profile_swap_ns / 1e9:.9f}")
+    if process_scanner is not None:
+        page.counter("protube_process_scans_total", "Process scans for profile auto-selection",
+                     process_scanner.scans)
+        page.counter("protube_process_lookups_total", "Process names resolved (the rest came from the cache)",
+                     process_scanner.resolved)
+        if last_process_scan_ms is not None:
+            page.gauge("protube_process_scan_seconds", "Duration of the last process scan",
+                       f"{last_process_scan_ms / 1000:.6f}")
+    
+    page.counter("protube_config_reloads_total", "Config file reloads applied", config_reload_count)
+    if last_config_apply_ms is not None:
+        page.gauge("protube_config_apply_seconds", "Config file write -> applied time of the last reload",
+                   f"{last_config_apply_ms / 1000:.6f}")
+    page.gauge("protube_config_version", "Version of the live config snapshot", active_config.version)
+    
+    for tag in ('right', 'left', FEEDBACK_TAG):
+        page.gauge("protube_scheduler_pending", "Pulses waiting in the scheduler", scheduler.pending(tag), tag=tag)
+    if driver_protocol is not None:
+        page.gauge("protube_batch_pending", "Driver events waiting to be coalesced", len(driver_protocol.pending))
+    if device_lanes is not None:
+        for channel, lane in sorted(device_lanes.lanes.items()):
+            page.gauge("protube_lane_depth", "Device calls queued on a channel's worker lane",
+                       lane.depth(), channel=channel)
+            page.gauge("protube_lane_max_depth", "Deepest a channel's worker lane has been",
+                       lane.max_depth, channel=channel)
+            page.counter("protube_lane_dropped_total", "Shots dropped because the channel's lane was full",
+                         lane.dropped, channel=channel)
+    for channel, state in sorted(scheduler.occupancy.channels.items()):
+        for action in OVERLAP_COUNTERS:
+            page.counter("protube_overlap_total", "Shots by overlap path (overlapped = device was still busy)",
+                         getattr(state, action), channel=channel, action=action)
+        page.counter("protube_device_busy_seconds_total", "Time a channel's device spent playing Shots",
+                     f"{state.busy_ns / 1e9:.6f}", channel=channel)
+    
+    for addr, stats in source_stats.items():
+        source = f"{addr[0]}:{addr[1]}"
+        page.counter("protube_protocol_lost_total", "Binary events lost in transit", stats.lost, source=source)
+        page.counter("protube_protocol_reordered_total", "Binary events received out of order",
+                     stats.reordered, source=source)
+    
+    if latency_recorder is not None:
+        for (stage, hand, mode), histogram in sorted(latency_recorder.histograms.items(), key=str):
+            page.summary("protube_latency_seconds", "Receive->Shot latency by stage", histogram,
+                         stage=stage, hand=hand, mode=mode)
+    
+    return page.render()
+
+
+def recent_log_text():
+    """The log ring buffer as plain text"""
+    return "\n".join(recent_lines()) + "\n"
+
+
+async def sample_shot_rates():
+    """Feed the per-channel Shots/sec meter once a second"""
+    while True:
+        shot_rates.sample(time.monotonic(), scheduler.issued)
+        await asyncio.sleep(1.0)
+
+
+def stop_bridge():
+    """Ask a running bridge to shut down (safe to call from any thread)"""
+    global bridge_running
+    bridge_running = False
+    if bridge_loop is not None:
         try:
-            os.remove(DRIVER_CONFIG_FILE)
-        except:
-            pass
+            bridge_loop.call_soon_threadsafe(shutdown_event.set)
+        except RuntimeError:
+            pass  # Loop already closed
+
+
+async def serve_bridge(backend, coalesce=DEFAULT_POLICY, latency_trace=True, stats_port=STATS_PORT,
+                       overlap=DEFAULT_OVERLAP, overlap_queue=MAX_QUEUE, auto_profile=False):
+    """Start the device, watchers and scheduler, then serve driver messages until stopped"""
+    global device, device_lanes, scheduler, coalescer, latency_recorder, driver_protocol
+    global bridge_running, bridge_loop, shutdown_event, status_block, control_protocol, bridge_start_ns
+    global profile_bank
+    
+    bridge_start_ns = now_ns()
+    startup_times.clear()
+    for outcome in held_events:
+        held_events[outcome] = 0
+    log.info("Starting ProTube Bridge with 3-Mode Fire Selector...")
+    loop = asyncio.get_running_loop()
+    shutdown_event = asyncio.Event()
+    bridge_loop = loop
+    bridge_running = True
+    
+    # Everything startup creates, so a stop (or Ctrl+C) at any point cleans up what exists
+    status_block = control_protocol = driver_protocol = coalescer = scheduler = device = None
+    control_transport = driver_transport = config_watch = stats_server = None
+    tasks = []
+    
+    try:
+        # Status block and control channel first, so the GUI sees the bridge starting
+        status_block = StatusWriter(STATUS_FILE)
+        status_block.open()
+        status_block.publish()
+        
+        # Preload the profiles, then load the initial config (compiling them over
+        # it) before serving config deltas on top of it
+        profile_bank = ProfileBank(load_profiles(PROFILES_DIR))
+        profile_bank.compile(config, active_config)
+        if profile_bank.names:
+            log.info("[PROFILE] Preloaded %s profiles: %s", len(profile_bank.names), ", ".join(profile_bank.names))
+        load_config()
+        
+        # Serve config deltas and status subscriptions from the GUI
+        control_transport, control_protocol = await loop.create_datagram_endpoint(
+            ControlProtocol, local_addr=(CONTROL_IP, CONTROL_PORT))
+        
+        # Listen for the driver right away: events arriving while the device
+        # connects are held and replayed once it is ready, instead of lost
+        latency_recorder = LatencyRecorder() if latency_trace else None
+        coalescer = EventCoalescer(event_kinds, coalesce)
+        driver_transport, driver_protocol = await loop.create_datagram_endpoint(
+            lambda: DriverProtocol(coalescer, latency_recorder, ready=False), local_addr=(UDP_IP, UDP_PORT))
+        note_startup("listening")
+        
+        # Initialize the haptic device (DLL load and connect start off the loop)
+        device = backend
+        if device.blocking:
+            device_lanes = DeviceLanes(profile_bank.channels)  # Lanes for every profile's routes too
+        await device_call(device.init)
+        
+        scheduler = HapticScheduler(device.shot, device_lanes, latency_recorder,
+                                    DeviceOccupancy(overlap, overlap_queue))
+        
+        # Start the haptic scheduler
+        scheduler.start(loop)
+
+        # Watch the config file (inotify on Linux, change notifications on Windows, stat polling elsewhere)
+        config_watch = FileWatcher(CONFIG_FILE, on_config_file_changed)
+        config_watch.start(loop)
+        log.info("[CONFIG] Config file watcher started (%s)", config_watch.mode)
+
+        # Poll the device until it accepts shots (meanwhile the driver's events are held)
+        if not await wait_for_device():
+            return  # Stopped while the device was connecting
+        note_startup("device_ready")
+        held_events["replayed"], held_events["stale"] = driver_protocol.replay()
+        held_events["overflowed"] = driver_protocol.held_dropped
+        if any(held_events.values()):
+            log.info("[STARTUP] Replayed %s events held while connecting (%s stale shots skipped, %s overflowed)",
+                     held_events["replayed"], held_events["stale"], held_events["overflowed"])
+
+        # Start battery monitor
+        tasks.append(loop.create_task(battery_watcher()))
+        
+        # Ready: tell subscribed GUIs, then keep the heartbeat going
+        status_block.state = STATE_RUNNING
+        publish_status()
+        notify_status(NOTIFY_READY)
+        tasks.append(loop.create_task(status_heartbeat()))
+        
+        # Follow the running game's profile, if asked to and any profile names its executable
+        if auto_profile:
+            if profile_bank.auto_selectable:
+                tasks.append(loop.create_task(profile_autoselect()))
+            else:
+                log.warning("[PROFILE] Auto-selection needs a profile with a \"processes\" list in %s/", PROFILES_DIR)
+        
+        # Local stats endpoint (Prometheus text on loopback)
+        tasks.append(loop.create_task(sample_shot_rates()))
+        if stats_port:
+            stats_server = StatsServer({b"/metrics": collect_metrics, b"/log": recent_log_text}, port=stats_port)
+            try:
+                await stats_server.start()
+            except OSError as e:
+                log.warning("[STATS] Can't serve metrics on port %s: %s", stats_port, e)
+                stats_server = None
+
+        log.info("\n".join([
+            f"\nListening on port {UDP_PORT} (driver messages, coalescing: {coalesce}, overlap: {overlap})...",
+            f"Watching config file: {CONFIG_FILE}",
+            f"\nFire Mode Controls:",
+            f"  B Button (upper right button on right controller):",
+            f"    Hold 1 second   = Single Shot",
+            f"    Double tap      = Burst Fire",
+            f"    Triple tap      = Full Auto",
+            f"    Quadruple tap   = Next profile ({len(profile_bank.names)} loaded)",
+            f"\nCurrent Mode: {MODE_NAMES[current_mode]}",
+            f"\nKick Feedback:",
+            f"  1 pulse  = Single Shot",
+            f"  2 pulses = Burst Fire",
+            f"  3 pulses = Full Auto",
+            f"\nWaiting for input...\n",
+        ]))
+        
+        await shutdown_event.wait()
+    finally:
+        log.info("\nShutting down...")
+        bridge_running = False
+        if status_block is not None:
+            status_block.state = STATE_STOPPING
+            status_block.publish()
+            notify_status(NOTIFY_STOPPING)
+        
+        # No more input
+        if driver_transport is not None:
+            driver_transport.close()
+        if control_transport is not None:
+            control_transport.close()
+        control_protocol = None
+        if config_watch is not None:
+            config_watch.stop()
+        if stats_server is not None:
+            stats_server.close()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        
+        if scheduler is not None:
+            # Stop all auto-fire sessions
+            for hand in ['right', 'left']:
+                stop_auto_fire(hand)
+            
+            # Stop the scheduler (drops any pending pulses)
+            scheduler.stop()
+        
+        # Let the lanes finish the device calls already queued
+        if device_lanes is not None:
+            device_lanes.close()
+            log.info("[LANES] %s", device_lanes.summary())
+            device_lanes = None
+        if device is not None:
+            device.close()
+        
+        # Clean up driver config file
+        if os.path.exists(DRIVER_CONFIG_FILE):
+            try:
+                os.remove(DRIVER_CONFIG_FILE)
+            except:
+                pass
+        
+        for addr, stats in source_stats.items():
+            log.info("[PROTOCOL] %s:%s - %s", addr[0], addr[1], stats.summary())
+        if coalescer is not None:
+            log.info("[COALESCE] %s: %s", coalescer.policy, coalescer.stats.summary())
+        if scheduler is not None:
+            log.info("[OVERLAP] %s", scheduler.occupancy.summary())
+        for name, pending in list(profile_saves.items()):
+            pending.cancel()
+            write_profile(profile_bank.profiles[name])
+        if any(profile_switches.values()):
+            log.info("[PROFILE] Switches: %s", ", ".join(f"{source} {total}" for source, total in profile_switches.items()))
+        if latency_recorder is not None:
+            for line in latency_recorder.summary_lines():
+                log.info("[LATENCY] %s", line)
+        
+        # Tell the GUI the bridge is gone (the block itself stays mapped)
+        if status_block is not None:
+            status_block.close()
+        
+        bridge_loop = None
+        log.info("Bridge closed.")
+
+
+def run_bridge(backend, coalesce=DEFAULT_POLICY, latency_trace=True, stats_port=STATS_PORT,
+               overlap=DEFAULT_OVERLAP, overlap_queue=MAX_QUEUE, auto_profile=False):
+    """Run the bridge on its own event loop until stopped or interrupted"""
+    try:
+        asyncio.run(serve_bridge(backend, coalesce, latency_trace, stats_port, overlap, overlap_queue,
+                                 auto_profile))
+    except KeyboardInterrupt:
+        pass  # serve_bridge has already shut down cleanly
+
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="ProTube OpenXR Companion bridge")
+    parser.add_argument("--backend", choices=sorted(BACKENDS),
+                        default=os.environ.get("PROTUBE_BACKEND", "forcetube"),
+                        help="haptic device backend (sim records shots without hardware)")
+    parser.add_argument("--coalesce", choices=COALESCE_POLICIES,
+                        default=os.environ.get("PROTUBE_COALESCE", DEFAULT_POLICY),
+                        help="how redundant shot/trigger events arriving together are collapsed")
+    parser.add_argument("--overlap", choices=OVERLAP_POLICIES,
+                        default=os.environ.get("PROTUBE_OVERLAP", DEFAULT_OVERLAP),
+                        help="what a Shot does when its device is still playing one from another event")
+    parser.add_argument("--overlap-queue", type=int,
+                        default=int(os.environ.get("PROTUBE_OVERLAP_QUEUE", MAX_QUEUE)),
+                        help="Shots waiting per channel under --overlap queue (more are dropped)")
+    parser.add_argument("--auto-profile", action="store_true",
+                        default=os.environ.get("PROTUBE_AUTO_PROFILE", "0") == "1",
+                        help=f"switch to the profile in {PROFILES_DIR}/ whose game is running")
+    parser.add_argument("--no-latency-trace", dest="latency_trace", action="store_false",
+                        default=os.environ.get("PROTUBE_LATENCY_TRACE", "1") != "0",
+                        help="don't timestamp events into receive->Shot latency histograms")
+    parser.add_argument("--stats-port", type=int,
+                        default=int(os.environ.get("PROTUBE_STATS_PORT", STATS_PORT)),
+                        help="loopback port for Prometheus metrics (0 to disable)")
+    parser.add_argument("--log-level", choices=LOG_LEVELS,
+                        default=os.environ.get("PROTUBE_LOG_LEVEL", DEFAULT_LEVEL),
+                        help="lowest level written (debug shows every shot)")
+    parser.add_argument("--log-file", default=os.environ.get("PROTUBE_LOG_FILE"),
+                        help="also write the log to this file, rotated at 1 MB")
+    args = parser.parse_args()
     
-    sock.close()
-    print("Bridge closed.")
+    setup_logging(args.log_level, args.log_file)
+    try:
+        run_bridge(create_backend(args.backend), args.coalesce, args.latency_trace, args.stats_port,
+                   args.overlap, args.overlap_queue, args.auto_profile)
+    finally:
+        shutdown_logging()
+
+
+if __name__ == "__main__":
+    main()
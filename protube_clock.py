@@ -0,0 +1,105 @@
+"""Clocks and timers for the ProTube bridge.
+
+Everything on the fire-mode path (the scheduler's deadlines, full auto
+re-arming, the burst cooldown) reads time and sets timers through one
+clock object, so it can run on something other than the wall clock:
+
+- LoopClock:    time.monotonic_ns() and the event loop's timers (the bridge)
+- VirtualClock: time that only moves when advance() is called; timers
+  run in deadline order as it passes them, so hours of play take as long
+  as the callbacks themselves
+"""
+import asyncio
+import heapq
+import itertools
+import time
+
+
+class LoopClock:
+    """Real monotonic time, timers on an asyncio event loop"""
+
+    def __init__(self, loop=None):
+        self.loop = loop
+
+    def bind(self, loop=None):
+        """Use a loop's timers (the running one by default)"""
+        self.loop = loop or asyncio.get_running_loop()
+
+    def now_ns(self):
+        return time.monotonic_ns()
+
+    def call_at(self, due_ns, callback, *args):
+        """Run callback(*args) at a monotonic time, returns a handle with cancel()"""
+        return self.loop.call_later((due_ns - time.monotonic_ns()) / 1e9, callback, *args)
+
+    def call_soon_threadsafe(self, callback, *args):
+        """Run callback(*args) on the loop's thread, from any thread"""
+        try:
+            self.loop.call_soon_threadsafe(callback, *args)
+        except RuntimeError:
+            pass  # Loop already closed (a lane finishing after shutdown)
+
+
+class VirtualTimer:
+    """Handle of a VirtualClock timer"""
+    __slots__ = ("due_ns", "callback", "args", "cancelled")
+
+    def __init__(self, due_ns, callback, args):
+        self.due_ns = due_ns
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class VirtualClock:
+    """Simulated time for driving the fire-mode logic without waiting
+
+    Timers due at the same time run in the order they were set, like the
+    loop's. A callback may set further timers; those that come due within
+    the current advance() run in it too.
+    """
+
+    def __init__(self, start_ns=0):
+        self._now = start_ns
+        self._timers = []  # heap of (due_ns, order, VirtualTimer)
+        self._order = itertools.count()
+        self.fired = 0
+
+    def bind(self, loop=None):
+        pass  # No loop needed
+
+    def now_ns(self):
+        return self._now
+
+    def call_at(self, due_ns, callback, *args):
+        timer = VirtualTimer(max(due_ns, self._now), callback, args)
+        heapq.heappush(self._timers, (timer.due_ns, next(self._order), timer))
+        return timer
+
+    def call_soon_threadsafe(self, callback, *args):
+        callback(*args)  # Nothing runs on other threads in virtual time
+
+    def pending(self):
+        """Timers set and not yet run or cancelled"""
+        return sum(1 for _, _, timer in self._timers if not timer.cancelled)
+
+    def advance(self, ns):
+        """Move time forward by ns, running every timer that comes due on the way"""
+        self.advance_to(self._now + ns)
+
+    def advance_ms(self, ms):
+        self.advance(int(ms * 1_000_000))
+
+    def advance_to(self, end_ns):
+        timers = self._timers
+        while timers and timers[0][0] <= end_ns:
+            due_ns, _, timer = heapq.heappop(timers)
+            if timer.cancelled:
+                continue
+            self._now = due_ns
+            self.fired += 1
+            timer.callback(*timer.args)
+        self._now = max(self._now, end_ns)
@@ -0,0 +1,151 @@
+"""Same-tick coalescing of driver events for the ProTube bridge.
+
+The bridge drains every datagram waiting on its socket per wakeup and
+resolves each one to a handler. Before the batch is run, redundant
+shot/trigger events for the same hand are collapsed so a haptic burst
+from the game doesn't become one device Shot per duplicate datagram.
+
+Policies:
+- "off":    run every event
+- "merge":  duplicate shots for a hand collapse into the first one until
+            that hand's trigger changes; trigger events repeating a state
+            already set earlier in the batch are dropped
+- "latest": one shot per hand per batch and only the final trigger state
+            of each hand is applied
+
+Mode changes are barriers: nothing is merged across them.
+"""
+
+# Event kinds the coalescer knows about (anything else passes through)
+KIND_SHOT = "shot"
+KIND_TRIGGER = "trigger"
+KIND_MODE = "mode"
+
+COALESCE_POLICIES = ("off", "merge", "latest")
+DEFAULT_POLICY = "merge"
+
+# Upper bound on datagrams drained per wakeup so a flood can't starve shutdown
+MAX_BATCH = 256
+
+
+class CoalesceStats:
+    """Counters for the events the coalescer has seen"""
+    __slots__ = ("batches", "events", "max_batch", "merged", "dropped")
+
+    def __init__(self):
+        self.batches = 0
+        self.events = 0
+        self.max_batch = 0
+        self.merged = 0   # duplicate shots folded into an earlier shot
+        self.dropped = 0  # trigger events superseded or repeating the current state
+
+    def mean_batch(self):
+        """Average events per drained batch"""
+        if not self.batches:
+            return 0.0
+        return self.events / self.batches
+
+    def summary(self):
+        return (f"{self.events} events in {self.batches} batches "
+                f"(mean {self.mean_batch():.2f}, max {self.max_batch}), "
+                f"{self.merged} shots merged, {self.dropped} triggers dropped")
+
+
+class EventCoalescer:
+    """Collapse redundant events within one batch of resolved handlers
+
+    kinds maps a handler to (kind, hand, value) for the events that may be
+    coalesced; handlers not in kinds are always run, in order.
+    """
+
+    def __init__(self, kinds, policy=DEFAULT_POLICY):
+        if policy not in COALESCE_POLICIES:
+            raise ValueError(f"Unknown coalesce policy '{policy}' (choose from {', '.join(COALESCE_POLICIES)})")
+        self.kinds = kinds
+        self.policy = policy
+        self.stats = CoalesceStats()
+
+    def coalesce(self, handlers):
+        """Return the handlers of a batch that should actually run"""
+        stats = self.stats
+        stats.batches += 1
+        stats.events += len(handlers)
+        if len(handlers) > stats.max_batch:
+            stats.max_batch = len(handlers)
+
+        if self.policy == "off" or len(handlers) < 2:
+            return handlers
+        if self.policy == "merge":
+            return self._merge(handlers)
+        return self._latest(handlers)
+
+    def _merge(self, handlers):
+        kinds = self.kinds
+        stats = self.stats
+        result = []
+        shot_seen = set()     # hands that already have a shot in the current run
+        trigger_state = {}    # hand -> last trigger state kept in this batch
+
+        for handler in handlers:
+            info = kinds.get(handler)
+            if info is None:
+                result.append(handler)
+                continue
+            kind, hand, value = info
+
+            if kind == KIND_SHOT:
+                if hand in shot_seen:
+                    stats.merged += 1
+                    continue
+                shot_seen.add(hand)
+            elif kind == KIND_TRIGGER:
+                if trigger_state.get(hand) == value:
+                    stats.dropped += 1
+                    continue
+                trigger_state[hand] = value
+                shot_seen.discard(hand)  # a press/release starts a new run of shots
+            elif kind == KIND_MODE:
+                shot_seen.clear()
+                trigger_state.clear()
+            result.append(handler)
+
+        return result
+
+    def _latest(self, handlers):
+        kinds = self.kinds
+        stats = self.stats
+
+        # Backward pass: keep only each hand's last trigger before the next mode change
+        keep = [True] * len(handlers)
+        later_trigger = set()
+        for index in range(len(handlers) - 1, -1, -1):
+            info = kinds.get(handlers[index])
+            if info is None:
+                continue
+            kind, hand, _ = info
+            if kind == KIND_TRIGGER:
+                if hand in later_trigger:
+                    keep[index] = False
+                    stats.dropped += 1
+                later_trigger.add(hand)
+            elif kind == KIND_MODE:
+                later_trigger.clear()
+
+        result = []
+        shot_seen = set()
+        for handler, kept in zip(handlers, keep):
+            if not kept:
+                continue
+            info = kinds.get(handler)
+            if info is not None:
+                kind, hand, _ = info
+                if kind == KIND_SHOT:
+                    if hand in shot_seen:
+                        stats.merged += 1
+                        continue
+                    shot_seen.add(hand)
+                elif kind == KIND_MODE:
+                    shot_seen.clear()
+            result.append(handler)
+
+        return result
@@ -0,0 +1,211 @@
+"""Bridge configuration: defaults and compiled runtime snapshots.
+
+The GUI's JSON config is compiled once per reload into an immutable
+ConfigSnapshot that already holds the ignore flags, the full auto rate,
+the channel routes (protube_routing) and the compiled haptic patterns
+(protube_pattern) with their raw kick/rumble values and durations.
+The bridge swaps the snapshot reference atomically, so the shot path
+reads one object and never takes a lock.
+"""
+import itertools
+import json
+import os
+import tempfile
+import time
+from types import MappingProxyType
+
+from protube_pattern import (MODE_PATTERNS, FEEDBACK_PATTERNS, PATTERN_NAMES,
+                             validate_steps, default_steps, compile_for_channels)
+from protube_routing import ROUTE_SOURCES, ROUTE_FEEDBACK, HAND_ROUTES, compile_routes, routed_channels
+
+# Fire mode constants
+SINGLE_SHOT = 0
+BURST_FIRE = 1
+FULL_AUTO = 2
+HAPTIC_EXPERIMENTAL = 3
+
+MODE_NAMES = {
+    SINGLE_SHOT: "SINGLE SHOT",
+    BURST_FIRE: "BURST FIRE",
+    FULL_AUTO: "FULL AUTO",
+    HAPTIC_EXPERIMENTAL: "HAPTIC EXPERIMENTAL"
+}
+
+# Default settings
+DEFAULT_CONFIG = {
+    "mode_select": "Haptic Filtered",
+    "feedback": True,
+    "ignore_left_hand": False,
+    "ignore_right_hand": False,
+    "latency": 0,
+    "filter_window_ms": 60,
+    "single_kick": 100,
+    "single_rumble": 47,
+    "single_duration": 100,
+    "burst_kick": 100,
+    "burst_rumble": 47,
+    "burst_duration": 100,
+    "burst_count": 3,
+    "auto_kick": 100,
+    "auto_rumble": 47,
+    "auto_duration": 100,
+    "auto_rate": 60
+}
+
+# Haptic modes offered by the GUI's mode dropdown
+HAPTIC_MODES = ("Trigger", "Haptic Filtered", "Haptic Experimental A", "Haptic Experimental B")
+
+# Type and allowed range of every config field (matches the GUI's widgets)
+CONFIG_FIELDS = {
+    "mode_select": (str, HAPTIC_MODES),
+    "feedback": (bool, None),
+    "ignore_left_hand": (bool, None),
+    "ignore_right_hand": (bool, None),
+    "latency": (int, (0, 100)),
+    "filter_window_ms": (int, (30, 150)),
+    "single_kick": (int, (0, 100)),
+    "single_rumble": (int, (0, 100)),
+    "single_duration": (int, (10, 200)),
+    "burst_kick": (int, (0, 100)),
+    "burst_rumble": (int, (0, 100)),
+    "burst_duration": (int, (10, 200)),
+    "burst_count": (int, (1, 5)),
+    "auto_kick": (int, (0, 100)),
+    "auto_rumble": (int, (0, 100)),
+    "auto_duration": (int, (10, 200)),
+    "auto_rate": (int, (30, 150)),
+}
+
+_versions = itertools.count(1)
+
+
+def coerce_field(key, value):
+    """Convert a config value (or its text form) to the field's type, ValueError if invalid"""
+    if key not in CONFIG_FIELDS:
+        raise ValueError(f"unknown config field '{key}'")
+    kind, allowed = CONFIG_FIELDS[key]
+
+    if kind is bool:
+        if isinstance(value, str):
+            if value.lower() in ("1", "true", "on"):
+                return True
+            if value.lower() in ("0", "false", "off"):
+                return False
+            raise ValueError(f"{key} must be true/false, got '{value}'")
+        return bool(value)
+
+    if kind is int:
+        number = int(value)
+        low, high = allowed
+        if not low <= number <= high:
+            raise ValueError(f"{key} must be {low}-{high}, got {number}")
+        return number
+
+    value = str(value)
+    if value not in allowed:
+        raise ValueError(f"{key} must be one of {', '.join(allowed)}")
+    return value
+
+
+class _Frozen:
+    """Base for snapshot objects: attributes can only be set in __init__"""
+    __slots__ = ()
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def _init(self, **values):
+        for name, value in values.items():
+            object.__setattr__(self, name, value)
+
+
+class ConfigSnapshot(_Frozen):
+    """Immutable, precompiled view of the config used by the shot path"""
+    __slots__ = ("version", "auto_rate_ms", "feedback", "ignore_hand", "ignore_route", "routes", "channels",
+                 "patterns", "feedback_patterns", "custom_patterns")
+
+    def __init__(self, version, auto_rate_ms, feedback, ignore_hand, ignore_route, routes, channels,
+                 patterns, feedback_patterns, custom_patterns=()):
+        self._init(version=version, auto_rate_ms=auto_rate_ms, feedback=feedback,
+                   ignore_hand=ignore_hand, ignore_route=ignore_route,
+                   routes=routes,  # [route] -> channels
+                   channels=channels,  # every routed channel
+                   patterns=patterns,  # [fire mode][route] -> compiled steps
+                   feedback_patterns=feedback_patterns,  # [fire mode] -> compiled steps
+                   custom_patterns=custom_patterns)  # names overridden by the config
+
+
+def compile_config(values):
+    """Compile a config dict (GUI JSON merged over defaults) into a ConfigSnapshot"""
+    merged = dict(DEFAULT_CONFIG)
+    merged.update(values)
+
+    ignore_hand = MappingProxyType({
+        'right': bool(merged.get("ignore_right_hand", False)),
+        'left': bool(merged.get("ignore_left_hand", False)),
+    })
+    ignore_route = [False] * len(ROUTE_SOURCES)
+    for hand, route in HAND_ROUTES.items():
+        ignore_route[route] = ignore_hand[hand]
+    routes = compile_routes(merged.get("routes"))
+
+    auto_rate = int(merged["auto_rate"])
+    latency_ms = max(0, int(merged["latency"]))
+
+    # Haptic patterns: defaults from the flat settings, overridden by "patterns"
+    steps = default_steps(merged)
+    custom = merged.get("patterns") or {}
+    if not isinstance(custom, dict):
+        raise ValueError("patterns must be an object")
+    for name, pattern in custom.items():
+        if name not in PATTERN_NAMES:
+            raise ValueError(f"unknown pattern '{name}' (one of {', '.join(PATTERN_NAMES)})")
+        steps[name] = validate_steps(name, pattern)
+    # Haptic Experimental plays whatever Single Shot plays, custom pattern included
+    steps.setdefault("experimental", steps["single"])
+    if steps["auto"][-1][0] >= auto_rate:
+        raise ValueError(f"pattern 'auto' must fit in one round ({auto_rate}ms)")
+
+    patterns = tuple(tuple(compile_for_channels(steps[name], channels, latency_ms) for channels in routes)
+                     for name in MODE_PATTERNS)
+    feedback_patterns = tuple(compile_for_channels(steps[name], routes[ROUTE_FEEDBACK])
+                              for name in FEEDBACK_PATTERNS)
+
+    return ConfigSnapshot(
+        version=next(_versions),
+        auto_rate_ms=auto_rate,
+        feedback=bool(merged["feedback"]),
+        ignore_hand=ignore_hand,
+        ignore_route=tuple(ignore_route),
+        routes=routes,
+        channels=routed_channels(routes),
+        patterns=patterns,
+        feedback_patterns=feedback_patterns,
+        custom_patterns=tuple(sorted(custom)),
+    )
+
+
+def atomic_write_json(path, data, indent=4):
+    """Write JSON via temp file + rename so readers never see a partial file"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp_", suffix=".json", dir=directory)
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f, indent=indent)
+            f.flush()
+            os.fsync(f.fileno())
+        # Windows refuses the rename while another process has the file open; retry briefly
+        for attempt in range(5):
+            try:
+                os.replace(tmp_path, path)
+                return
+            except PermissionError:
+                if attempt == 4:
+                    raise
+                time.sleep(0.01)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
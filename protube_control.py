@@ -0,0 +1,119 @@
+"""Local control channel between the GUI and a running bridge.
+
+The GUI pushes field-level config deltas straight to the bridge over
+loopback UDP; the JSON file is only persistence. Every command carries
+an id and the bridge answers it with an ack (config snapshot version it
+applied, or the fire mode now active) or a nak:
+
+    GUI    -> bridge   set:<id>:<key>=<value>[;<key>=<value>...]
+    GUI    -> bridge   mode:<id>:<single|burst|auto>
+    GUI    -> bridge   profile:<id>:<name | empty for the base config>
+    GUI    -> bridge   quit:<id>:
+    bridge -> GUI      ack:<id>:<version | mode | empty>
+    bridge -> GUI      nak:<id>:<reason>
+
+Lost datagrams are handled by the GUI resending the same command with
+the same id; the bridge remembers its recent replies and answers a
+repeat without running the command again.
+
+The GUI also subscribes to status events. A subscription is a lease the
+GUI renews; the bridge answers with the current state and then pushes
+an event whenever it changes, plus a heartbeat. Events only say what
+changed - the values are in the shared status block (protube_status):
+
+    GUI    -> bridge   sub:<id>:
+    bridge -> GUI      evt:<seq>:<name>
+"""
+from protube_config import coerce_field
+
+CONTROL_IP = "127.0.0.1"
+CONTROL_PORT = 5016
+
+# Status events pushed to subscribers
+NOTIFY_STARTED = "started"      # bridge is up, device still initializing
+NOTIFY_READY = "ready"          # device ready, serving driver messages
+NOTIFY_MODE = "mode"            # fire mode changed
+NOTIFY_PROFILE = "profile"      # a different config profile is active
+NOTIFY_BATTERY = "battery"      # a battery level changed
+NOTIFY_STOPPING = "stopping"    # bridge is shutting down
+NOTIFY_HEARTBEAT = "heartbeat"  # nothing changed, bridge still alive
+
+SUBSCRIPTION_TTL = 6.0  # seconds a subscription lasts unless renewed
+
+FIRE_MODES = ("single", "burst", "auto")  # mode command arguments
+REPLY_CACHE_SIZE = 64  # recent replies the bridge keeps for resent commands
+
+
+def encode_set(cmd_id, changes):
+    """Build a set request for a dict of config changes"""
+    fields = ";".join(f"{key}={_format_value(value)}" for key, value in changes.items())
+    return f"set:{cmd_id}:{fields}".encode('utf-8')
+
+
+def _format_value(value):
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    return str(value)
+
+
+def parse_request(data):
+    """Split a request datagram into (verb, id, body)"""
+    verb, cmd_id, body = data.decode('utf-8').split(":", 2)
+    return verb, cmd_id, body
+
+
+def decode_set(body):
+    """Parse 'key=value;...' into a dict of typed values, ValueError if any is invalid"""
+    changes = {}
+    for field in body.split(";"):
+        if not field:
+            continue
+        key, sep, value = field.partition("=")
+        if not sep:
+            raise ValueError(f"malformed field '{field}'")
+        changes[key] = coerce_field(key, value)
+    if not changes:
+        raise ValueError("no fields")
+    return changes
+
+
+def encode_mode(cmd_id, mode):
+    return f"mode:{cmd_id}:{mode}".encode('utf-8')
+
+
+def encode_profile(cmd_id, name):
+    return f"profile:{cmd_id}:{name or ''}".encode('utf-8')
+
+
+def encode_shutdown(cmd_id):
+    return f"quit:{cmd_id}:".encode('utf-8')
+
+
+def encode_subscribe(cmd_id):
+    return f"sub:{cmd_id}:".encode('utf-8')
+
+
+def encode_event(seq, name):
+    return f"evt:{seq}:{name}".encode('utf-8')
+
+
+def encode_ack(cmd_id, version):
+    return f"ack:{cmd_id}:{version}".encode('utf-8')
+
+
+def encode_nak(cmd_id, reason):
+    return f"nak:{cmd_id}:{reason}".encode('utf-8')
+
+
+def parse_reply(data):
+    """Split an ack/nak datagram into (verb, id, detail)"""
+    verb, cmd_id, detail = data.decode('utf-8').split(":", 2)
+    return verb, cmd_id, detail
+
+
+def parse_event(data):
+    """Split an evt datagram into (seq, name), ValueError if it isn't one"""
+    verb, seq, name = data.decode('utf-8').split(":", 2)
+    if verb != "evt":
+        raise ValueError(f"not an event: {verb}")
+    return int(seq), name
@@ -0,0 +1,272 @@
+"""File change notification for the ProTube bridge config.
+
+FileWatcher calls back on the bridge's event loop shortly after a file
+is rewritten:
+- on Linux the inotify fd is registered with the loop (no wakeups while
+  nothing changes)
+- on Windows, whose proactor loop can't watch an fd, a thread blocks on a
+  directory change notification (FindFirstChangeNotificationW, the
+  ReadDirectoryChangesW family) next to a stop event, and hands each
+  change to the loop; changes to other files in the directory are told
+  apart by the file's (mtime, size)
+- anywhere else, or if neither can be set up, a task falls back to
+  stat() polling once a second, the rate the bridge always polled at
+
+Bursts of writes are debounced into one callback. If the callback
+returns False (e.g. it read a half-written file) the watcher retries a
+few times instead of waiting for the next write.
+"""
+import asyncio
+import ctypes
+import ctypes.util
+import logging
+import os
+import struct
+import sys
+import threading
+
+log = logging.getLogger("protube.watch")
+
+# inotify constants (linux/inotify.h)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+_EVENT_HEADER = struct.Struct("iIII")  # wd, mask, cookie, len
+
+# Directory change notification constants (winbase.h, winnt.h)
+FILE_NOTIFY_CHANGE_FILE_NAME = 0x00000001  # renames: atomic saves replace the file
+FILE_NOTIFY_CHANGE_SIZE = 0x00000008
+FILE_NOTIFY_CHANGE_LAST_WRITE = 0x00000010
+WAIT_OBJECT_0 = 0
+INFINITE = 0xFFFFFFFF
+INVALID_HANDLE_VALUE = ctypes.c_void_p(-1).value
+
+DEBOUNCE_MS = 5      # quiet time after the last write before reloading
+RETRY_MS = 20        # delay before re-reading a file the callback rejected
+MAX_RETRIES = 5
+POLL_INTERVAL = 1.0  # stat() interval when inotify is unavailable
+
+
+def _load_inotify():
+    """Return libc if it provides inotify, else None"""
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1
+        libc.inotify_add_watch
+    except (OSError, AttributeError):
+        return None
+    return libc
+
+
+def _load_kernel32():
+    """Return kernel32 with the change notification calls declared, else None"""
+    if sys.platform != "win32":
+        return None
+    try:
+        kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+    except OSError:
+        return None
+    HANDLE = ctypes.c_void_p  # not an int on 64-bit
+    kernel32.FindFirstChangeNotificationW.restype = HANDLE
+    kernel32.FindFirstChangeNotificationW.argtypes = [ctypes.c_wchar_p, ctypes.c_int, ctypes.c_uint32]
+    kernel32.FindNextChangeNotification.argtypes = [HANDLE]
+    kernel32.FindCloseChangeNotification.argtypes = [HANDLE]
+    kernel32.CreateEventW.restype = HANDLE
+    kernel32.CreateEventW.argtypes = [ctypes.c_void_p, ctypes.c_int, ctypes.c_int, ctypes.c_wchar_p]
+    kernel32.SetEvent.argtypes = [HANDLE]
+    kernel32.CloseHandle.argtypes = [HANDLE]
+    kernel32.WaitForMultipleObjects.restype = ctypes.c_uint32
+    kernel32.WaitForMultipleObjects.argtypes = [ctypes.c_uint32, ctypes.POINTER(HANDLE), ctypes.c_int,
+                                                ctypes.c_uint32]
+    return kernel32
+
+
+def file_signature(path):
+    """(mtime_ns, size) of a file, or None if it doesn't exist"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+class FileWatcher:
+    """Watch one file and call on_change(path) on the event loop after it is written"""
+
+    def __init__(self, path, on_change, debounce_ms=DEBOUNCE_MS):
+        self.path = os.path.abspath(path)
+        self.on_change = on_change
+        self.debounce = debounce_ms / 1000.0
+        if _load_inotify():
+            self.mode = "inotify"
+        elif _load_kernel32():
+            self.mode = "win32"
+        else:
+            self.mode = "polling"
+        self._loop = None
+        self._fd = None
+        self._kernel32 = None
+        self._change_handle = None  # win32: directory change notification
+        self._stop_event = None     # win32: set by stop() to end the wait
+        self._thread = None
+        self._last = None           # win32: file signature when last seen
+        self._poll_task = None
+        self._timer = None  # pending debounce or retry callback
+
+    def start(self, loop=None):
+        """Start watching on a loop (the running one by default)"""
+        self._loop = loop or asyncio.get_running_loop()
+        if self.mode == "inotify" and not self._start_inotify():
+            self.mode = "polling"
+        if self.mode == "win32" and not self._start_win32():
+            self.mode = "polling"
+        if self.mode == "polling":
+            self._poll_task = self._loop.create_task(self._run_polling())
+
+    def stop(self):
+        """Stop watching"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._fd is not None:
+            self._loop.remove_reader(self._fd)
+            os.close(self._fd)
+            self._fd = None
+        if self._poll_task is not None:
+            self._poll_task.cancel()
+            self._poll_task = None
+        if self._thread is not None:
+            self._kernel32.SetEvent(self._stop_event)
+            self._thread.join()
+            self._thread = None
+            self._kernel32.FindCloseChangeNotification(self._change_handle)
+            self._kernel32.CloseHandle(self._stop_event)
+            self._change_handle = self._stop_event = None
+
+    def _notify(self, retries=MAX_RETRIES):
+        """Run the callback, retrying briefly while it rejects the file"""
+        self._timer = None
+        try:
+            accepted = self.on_change(self.path) is not False
+        except Exception as e:
+            log.error("[WATCH] Change handler failed: %s", e)
+            return
+        if not accepted and retries > 1:
+            self._timer = self._loop.call_later(RETRY_MS / 1000.0, self._notify, retries - 1)
+
+    def _start_inotify(self):
+        """Register an inotify fd for the file's directory, False if unavailable"""
+        libc = _load_inotify()
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            log.warning("[WATCH] inotify unavailable (%s), polling instead", os.strerror(ctypes.get_errno()))
+            return False
+
+        # Watch the directory: editors and atomic saves replace the file's inode
+        directory, name = os.path.split(self.path)
+        mask = IN_CLOSE_WRITE | IN_MOVED_TO
+        if libc.inotify_add_watch(fd, directory.encode(), mask) < 0:
+            log.warning("[WATCH] Cannot watch %s (%s), polling instead", directory, os.strerror(ctypes.get_errno()))
+            os.close(fd)
+            return False
+
+        try:
+            self._loop.add_reader(fd, self._on_inotify, name.encode())
+        except NotImplementedError:
+            os.close(fd)
+            return False
+        self._fd = fd
+        return True
+
+    def _on_inotify(self, name):
+        """inotify fd readable: (re)start the debounce timer if our file was written"""
+        if self._read_matches(self._fd, name):
+            self._debounce()
+
+    def _debounce(self):
+        """(Re)start the debounce timer: the callback runs once the writer has been quiet for a moment"""
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = self._loop.call_later(self.debounce, self._notify)
+
+    def _read_matches(self, fd, name):
+        """Drain pending inotify events, True if any were for our file"""
+        matched = False
+        while True:
+            try:
+                data = os.read(fd, 4096)
+            except BlockingIOError:
+                return matched
+            offset = 0
+            while offset < len(data):
+                _, _, _, length = _EVENT_HEADER.unpack_from(data, offset)
+                offset += _EVENT_HEADER.size
+                if data[offset:offset + length].rstrip(b"\0") == name:
+                    matched = True
+                offset += length
+
+    def _start_win32(self):
+        """Start a thread waiting on a change notification for the file's directory, False if unavailable"""
+        kernel32 = _load_kernel32()
+        directory = os.path.dirname(self.path)
+        mask = FILE_NOTIFY_CHANGE_FILE_NAME | FILE_NOTIFY_CHANGE_SIZE | FILE_NOTIFY_CHANGE_LAST_WRITE
+        handle = kernel32.FindFirstChangeNotificationW(directory, False, mask)
+        if not handle or handle == INVALID_HANDLE_VALUE:
+            log.warning("[WATCH] Cannot watch %s (error %s), polling instead", directory, ctypes.get_last_error())
+            return False
+        stop_event = kernel32.CreateEventW(None, True, False, None)
+        if not stop_event:
+            kernel32.FindCloseChangeNotification(handle)
+            return False
+
+        self._kernel32 = kernel32
+        self._change_handle = handle
+        self._stop_event = stop_event
+        self._last = file_signature(self.path)
+        self._thread = threading.Thread(target=self._wait_win32, name="ConfigWatch", daemon=True)
+        self._thread.start()
+        return True
+
+    def _wait_win32(self):
+        """Watch thread: hand every directory change to the loop until stop() sets the event"""
+        kernel32 = self._kernel32
+        handles = (ctypes.c_void_p * 2)(self._change_handle, self._stop_event)
+        while kernel32.WaitForMultipleObjects(2, handles, False, INFINITE) == WAIT_OBJECT_0:
+            try:
+                self._loop.call_soon_threadsafe(self._on_directory_change)
+            except RuntimeError:
+                return  # Loop closed
+            if not kernel32.FindNextChangeNotification(self._change_handle):
+                log.warning("[WATCH] Change notification failed (error %s)", ctypes.get_last_error())
+                return
+
+    def _on_directory_change(self):
+        """Something in the directory changed: debounce if it was our file"""
+        if self._thread is None:
+            return  # Stopped meanwhile
+        current = file_signature(self.path)
+        if current != self._last:
+            self._last = current
+            self._debounce()
+
+    async def _run_polling(self):
+        """Fallback: compare the file's mtime/size every POLL_INTERVAL"""
+        last = file_signature(self.path)
+        while True:
+            await asyncio.sleep(POLL_INTERVAL)
+            current = file_signature(self.path)
+            if current == last:
+                continue
+            # Debounce: wait until the signature stops changing
+            while True:
+                await asyncio.sleep(self.debounce)
+                settled = file_signature(self.path)
+                if settled == current:
+                    break
+                current = settled
+            last = current
+            self._notify()
@@ -2,39 +2,83 @@ import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 import json
 import os
+import socket
 import subprocess
 import time
 import sys
+from contextlib import contextmanager
+
+from protube_config import CONFIG_FIELDS, atomic_write_json
+from protube_control import (CONTROL_IP, CONTROL_PORT, NOTIFY_STARTED, NOTIFY_STOPPING,
+                             NOTIFY_HEARTBEAT, encode_set, encode_mode, encode_profile, encode_shutdown,
+                             encode_subscribe, parse_event, parse_reply)
+from protube_profiles import PROFILES_DIR, list_profiles, load_profile, valid_profile_name
+from protube_routing import HAND_CHANNELS, ROUTE_RIGHT, compile_routes
+from protube_status import STATE_RUNNING, StatusReader
+
+# Write-behind autosave: save this long after the last change,
+# but at least this often while changes keep coming (slider drags)
+AUTOSAVE_DELAY_MS = 200
+AUTOSAVE_MAX_DELAY_MS = 1000
+
+# Bridge commands: resend after this long without an ack, give up after
+# this many sends (the bridge isn't running)
+ACK_RETRY_MS = 150
+MAX_ATTEMPTS = 3
+ACK_POLL_MS = 5
+
+# Bridge status subscription: check once a second, like the old status
+# poll (where Tk can watch the socket, not on Windows, events are also
+# applied as they arrive); renew the lease this often (retry faster while
+# no bridge answers), and call the bridge hung after this long without a
+# heartbeat
+STATUS_POLL_MS = 1000
+SUBSCRIBE_INTERVAL_MS = 2000
+SUBSCRIBE_RETRY_MS = 250
+HEARTBEAT_TIMEOUT_MS = 2000
+
+# Bridge states shown in the bridge control section: (light, text, text color)
+BRIDGE_STATES = {
+    "stopped": ("off", "Not Running", "#b0b0b0"),
+    "starting": ("off", "Starting...", "#FFA500"),
+    "running": ("on", "Running", "#90EE90"),
+    "hung": ("off", "Not Responding", "#FF6B6B"),
+}
+
+# Profile menu entry for the bridge's own config (no profile)
+BASE_PROFILE_LABEL = "Base config"
+_UNSET = object()  # base config has no value for a field a profile sets
 
 class IndicatorLight(tk.Canvas):
-    """Small indicator light widget"""
+    """Small indicator light widget (one rectangle, recolored when the state changes)"""
+    colors = {"on": "#90EE90", "off": "#404040"}
+    
     def __init__(self, parent, width=12, height=20, **kwargs):
         super().__init__(parent, width=width, height=height, highlightthickness=0, **kwargs)
         self.configure(bg='#2b2b2b')
         self.state = "on"
-        self.draw()
-    
-    def draw(self):
-        self.delete("all")
-        if self.state == "on":
-            self.create_rectangle(0, 0, self.winfo_reqwidth(), self.winfo_reqheight(), 
-                                 fill="#90EE90", outline="")
-        elif self.state == "off":
-            self.create_rectangle(0, 0, self.winfo_reqwidth(), self.winfo_reqheight(), 
-                                 fill="#404040", outline="")
+        self.light = self.create_rectangle(0, 0, self.winfo_reqwidth(), self.winfo_reqheight(),
+                                           fill=self.colors["on"], outline="")
     
     def set_state(self, state):
         """Set state: 'on' or 'off'"""
+        if state == self.state:
+            return
         self.state = state
-        self.draw()
+        self.itemconfigure(self.light, fill=self.colors.get(state, ""))
 
 class ToggleSwitch(tk.Canvas):
-    """Custom toggle switch widget"""
+    """Custom toggle switch widget
+    
+    The pill and knob are created once; draw() only recolors the pill and
+    moves the knob, and does nothing if the switch already shows is_on.
+    """
     def __init__(self, parent, width=50, height=24, **kwargs):
         super().__init__(parent, width=width, height=height, highlightthickness=0, **kwargs)
         self.width = width
         self.height = height
         self.is_on = True
+        self.shown = None  # is_on as currently drawn
         
         # Colors
         self.bg_on = "#90EE90"  # Lime green
@@ -43,20 +87,23 @@ class ToggleSwitch(tk.Canvas):
         
         self.configure(bg='#2b2b2b')
         self.bind("<Button-1>", self.toggle)
-        self.draw()
-    
-    def draw(self):
-        self.delete("all")
-        bg = self.bg_on if self.is_on else self.bg_off
         
-        # Background pill
-        self.create_oval(0, 0, self.height, self.height, fill=bg, outline="")
-        self.create_oval(self.width-self.height, 0, self.width, self.height, fill=bg, outline="")
-        self.create_rectangle(self.height/2, 0, self.width-self.height/2, self.height, fill=bg, outline="")
+        # Background pill (one tag, so it is recolored in one call)
+        self.create_oval(0, 0, self.height, self.height, outline="", tags="pill")
+        self.create_oval(self.width-self.height, 0, self.width, self.height, outline="", tags="pill")
+        self.create_rectangle(self.height/2, 0, self.width-self.height/2, self.height, outline="", tags="pill")
         
         # Circle
+        self.knob = self.create_oval(0, 4, 0, self.height-4, fill=self.circle_color, outline="")
+        self.draw()
+    
+    def draw(self):
+        if self.shown == self.is_on:
+            return
+        self.shown = self.is_on
+        self.itemconfigure("pill", fill=self.bg_on if self.is_on else self.bg_off)
         circle_x = self.width - self.height/2 - 4 if self.is_on else self.height/2
-        self.create_oval(circle_x-8, 4, circle_x+8, self.height-4, fill=self.circle_color, outline="")
+        self.coords(self.knob, circle_x-8, 4, circle_x+8, self.height-4)
     
     def toggle(self, event=None):
         self.is_on = not self.is_on
@@ -71,6 +118,20 @@ class ToggleSwitch(tk.Canvas):
     def get(self):
         return self.is_on
 
+class WidgetCache:
+    """Last options set on each widget, so config() calls that change nothing never reach Tk"""
+    def __init__(self):
+        self.applied = {}  # widget -> {option: value}
+    
+    def config(self, widget, **options):
+        """widget.config() with only the options that differ from the last call, True if any did"""
+        applied = self.applied.setdefault(widget, {})
+        changed = {key: value for key, value in options.items() if applied.get(key) != value}
+        if changed:
+            widget.config(**changed)
+            applied.update(changed)
+        return bool(changed)
+
 class ToolTip:
     """Tooltip widget"""
     def __init__(self, widget, text):
@@ -99,6 +160,233 @@ class ToolTip:
             self.tooltip.destroy()
             self.tooltip = None
 
+class ConfigAutosaver:
+    """Debounced write-behind saving: coalesces bursts of changes into one write"""
+    def __init__(self, root, save_func, delay_ms=AUTOSAVE_DELAY_MS, max_delay_ms=AUTOSAVE_MAX_DELAY_MS):
+        self.root = root
+        self.save_func = save_func
+        self.delay_ms = delay_ms
+        self.max_delay_ms = max_delay_ms
+        self.dirty = False
+        self.requests = 0  # change notifications received
+        self.writes = 0    # actual file writes
+        self._after_id = None
+        self._first_request = None
+    
+    def request(self):
+        """Note that the config changed; the write happens later"""
+        self.requests += 1
+        self.dirty = True
+        now = time.monotonic()
+        if self._after_id is not None:
+            # Keep postponing while changes keep coming, but never past max_delay_ms
+            if (now - self._first_request) * 1000 >= self.max_delay_ms:
+                return
+            self.root.after_cancel(self._after_id)
+        else:
+            self._first_request = now
+        self._after_id = self.root.after(self.delay_ms, self.flush)
+    
+    def flush(self):
+        """Write now if anything is pending"""
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+            self._after_id = None
+        self._first_request = None
+        if not self.dirty:
+            return
+        self.dirty = False
+        self.writes += 1
+        self.save_func()
+
+class PendingCommand:
+    """A command sent to the bridge that hasn't been answered yet"""
+    __slots__ = ("payload", "description", "quiet", "on_fail", "sent_at", "attempts")
+    
+    def __init__(self, payload, description, quiet, on_fail=None):
+        self.payload = payload
+        self.description = description
+        self.quiet = quiet  # don't report it if nobody answers
+        self.on_fail = on_fail  # called if the bridge rejects it or never answers
+        self.sent_at = None
+        self.attempts = 0
+
+class BridgeControlChannel:
+    """Long-lived command client for the bridge: one socket, command ids, acks and retries"""
+    def __init__(self, root):
+        self.root = root
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setblocking(False)
+        self.pending = {}  # command id -> PendingCommand
+        self.applied_version = None  # config version the bridge last acknowledged
+        self.last_rtt_ms = None
+        self.rtt_count = 0
+        self.rtt_total_ms = 0.0
+        self.rtt_max_ms = 0.0
+        self.retries = 0
+        self.timeouts = 0
+        self._next_id = 1
+        self._poll_id = None
+    
+    def push(self, changes, on_fail=None):
+        """Send changed fields to the bridge (no-op cost if the bridge isn't running)"""
+        # Not reported if unanswered: a bridge started later reads the saved file
+        self.send(lambda cmd_id: encode_set(cmd_id, changes), f"config {changes}", quiet=True, on_fail=on_fail)
+    
+    def send_mode(self, mode):
+        """Switch the bridge's fire mode"""
+        self.send(lambda cmd_id: encode_mode(cmd_id, mode), f"fire mode {mode}")
+    
+    def send_profile(self, name):
+        """Switch the bridge to a preloaded profile (None: its base config)"""
+        self.send(lambda cmd_id: encode_profile(cmd_id, name), f"profile {name or BASE_PROFILE_LABEL}")
+    
+    def shutdown(self):
+        """Ask the bridge to shut down cleanly"""
+        self.send(encode_shutdown, "shutdown")
+    
+    def send(self, encode, description, quiet=False, on_fail=None):
+        """Send a command built by encode(cmd_id) and track it until answered"""
+        cmd_id = str(self._next_id)
+        self._next_id += 1
+        command = PendingCommand(encode(cmd_id), description, quiet, on_fail)
+        self.pending[cmd_id] = command
+        self._transmit(command)
+        if self._poll_id is None:
+            self._poll_id = self.root.after(ACK_POLL_MS, self.poll_acks)
+        return cmd_id
+    
+    def _transmit(self, command):
+        command.sent_at = time.perf_counter()
+        command.attempts += 1
+        try:
+            self.sock.sendto(command.payload, (CONTROL_IP, CONTROL_PORT))
+        except OSError as e:
+            print(f"[GUI] Could not send {command.description}: {e}")
+    
+    def poll_acks(self):
+        """Collect replies and resend unanswered commands while any are outstanding"""
+        self._poll_id = None
+        now = time.perf_counter()
+        while True:
+            try:
+                data, _ = self.sock.recvfrom(1024)
+            except BlockingIOError:
+                break
+            except OSError:
+                continue  # Windows: port unreachable from a send while the bridge was down
+            try:
+                verb, cmd_id, detail = parse_reply(data)
+            except (ValueError, UnicodeDecodeError):
+                continue
+            command = self.pending.pop(cmd_id, None)
+            if command is None:
+                continue  # Answer to a resend we already have
+            if verb != "ack":
+                print(f"[GUI] Bridge rejected {command.description}: {detail}")
+                if command.on_fail is not None:
+                    command.on_fail()
+                continue
+            if command.attempts == 1:
+                # Only unambiguous samples: a resent command's ack may answer any of its sends
+                self.last_rtt_ms = (now - command.sent_at) * 1000
+                self.rtt_count += 1
+                self.rtt_total_ms += self.last_rtt_ms
+                self.rtt_max_ms = max(self.rtt_max_ms, self.last_rtt_ms)
+            if command.payload.startswith(b"set:"):
+                self.applied_version = int(detail)
+        
+        for cmd_id, command in list(self.pending.items()):
+            if (now - command.sent_at) * 1000 < ACK_RETRY_MS:
+                continue
+            if command.attempts < MAX_ATTEMPTS:
+                self.retries += 1
+                self._transmit(command)
+                continue
+            # Nobody answering (bridge not running)
+            del self.pending[cmd_id]
+            self.timeouts += 1
+            if not command.quiet:
+                print(f"[GUI] No answer from bridge to {command.description}")
+            if command.on_fail is not None:
+                command.on_fail()
+        
+        if self.pending:
+            self._poll_id = self.root.after(ACK_POLL_MS, self.poll_acks)
+    
+    def rtt_summary(self):
+        """Command round-trip times so far"""
+        if not self.rtt_count:
+            return "no acknowledged commands"
+        return (f"{self.rtt_count} acked, rtt last {self.last_rtt_ms:.2f}ms "
+                f"mean {self.rtt_total_ms / self.rtt_count:.2f}ms max {self.rtt_max_ms:.2f}ms, "
+                f"{self.retries} resends, {self.timeouts} unanswered")
+    
+    def close(self):
+        if self._poll_id is not None:
+            self.root.after_cancel(self._poll_id)
+            self._poll_id = None
+        self.sock.close()
+
+class BridgeStatusSubscriber:
+    """Subscribes to the bridge's status events, whoever started the bridge"""
+    def __init__(self):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setblocking(False)
+        self.last_event_at = None  # perf_counter of the last event from the bridge
+        self.last_seq = None
+        self._renew_at = 0.0
+        self._next_id = 1
+    
+    def poll(self):
+        """Renew the subscription when due and drain events
+        
+        Returns the names of the events received, with "resync" added when
+        some were lost in between.
+        """
+        now = time.perf_counter()
+        if now >= self._renew_at:
+            interval = SUBSCRIBE_INTERVAL_MS if self.last_event_at is not None else SUBSCRIBE_RETRY_MS
+            self._renew_at = now + interval / 1000
+            try:
+                self.sock.sendto(encode_subscribe(self._next_id), (CONTROL_IP, CONTROL_PORT))
+                self._next_id += 1
+            except OSError:
+                pass  # Retried on the next renewal
+        
+        events = []
+        while True:
+            try:
+                data, _ = self.sock.recvfrom(1024)
+            except BlockingIOError:
+                break
+            except OSError:
+                continue  # Windows: port unreachable while the bridge is down
+            try:
+                seq, name = parse_event(data)
+            except (ValueError, UnicodeDecodeError):
+                continue  # Subscription acks
+            if self.last_seq is not None and seq != self.last_seq + 1 and name != NOTIFY_STARTED:
+                events.append("resync")
+            self.last_seq = seq
+            self.last_event_at = now
+            events.append(name)
+        return events
+    
+    def silent_ms(self):
+        """Milliseconds since the bridge was last heard from, None if never"""
+        if self.last_event_at is None:
+            return None
+        return (time.perf_counter() - self.last_event_at) * 1000
+    
+    def forget(self):
+        """The bridge stopped: the next one starts a new event sequence"""
+        self.last_event_at = None
+        self.last_seq = None
+    
+    def close(self):
+        self.sock.close()
+
 class ProTubeGUI:
     def __init__(self, root):
         self.root = root
@@ -121,9 +409,22 @@ class ProTubeGUI:
         self.sliders = {}  # config_key -> slider widget
         self.value_vars = {}  # config_key -> StringVar
         
+        # What the widgets currently show, so updates that change nothing skip Tk
+        self.widget_cache = WidgetCache()
+        self.filter_shown = None
+        self.experimental_layout = None
+        
         # Config file
         self.config_file = "protube_gui_config.json"
         
+        # Write-behind persistence; bulk updates suppress per-widget saves
+        self.autosaver = ConfigAutosaver(self.root, self.save_config_file)
+        self._bulk_depth = 0
+        self._bulk_changed = False
+        
+        # Direct config push to a running bridge (the file is only persistence)
+        self.control = BridgeControlChannel(self.root)
+        
         # Default values
         self.config = {
             "mode_select": "Haptic Filtered",
@@ -148,6 +449,14 @@ class ProTubeGUI:
         # Load existing config if available
         self.load_default_config()
         
+        # Field values the bridge already has (from the file it loads at startup)
+        self.pushed_config = dict(self.config)
+        
+        # Profile whose values the widgets show, and the base values of the
+        # fields it overrides (self.config holds the profile's while it is active)
+        self.profile_shown = None
+        self.profile_base = {}
+        
         # Build UI
         self.create_ui()
         
@@ -159,7 +468,8 @@ class ProTubeGUI:
         # Handle window close
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
         
-        # Check if bridge is running
+        # Follow the bridge's pushed status events
+        self.status_watched = self.watch_status_socket()
         self.check_bridge_status()
     
     def load_default_config(self):
@@ -174,14 +484,60 @@ class ProTubeGUI:
                 print(f"Could not load config: {e}")
     
     def save_config_file(self):
-        """Save current config to file"""
+        """Save current config to file (atomically, so the bridge never reads a partial file)"""
         try:
-            with open(self.config_file, 'w') as f:
-                json.dump(self.config, f, indent=4)
+            atomic_write_json(self.config_file, self.base_config())
             print(f"Config auto-saved to {self.config_file}")
         except Exception as e:
             print(f"Error saving config: {e}")
     
+    def base_config(self):
+        """self.config without the active profile's values (what the config file holds)"""
+        values = dict(self.config)
+        for key, value in self.profile_base.items():
+            if value is _UNSET:
+                values.pop(key, None)
+            else:
+                values[key] = value
+        return values
+    
+    def commit_config_change(self):
+        """Push changed fields to the bridge now and persist them write-behind"""
+        if self._bulk_depth:
+            self._bulk_changed = True
+            return
+        self.push_config_to_bridge()
+        self.autosaver.request()
+    
+    def push_config_to_bridge(self):
+        """Send only the fields that changed since the last push"""
+        changes = {key: value for key, value in self.config.items()
+                   if key in CONFIG_FIELDS and self.pushed_config.get(key) != value}
+        if changes:
+            self.control.push(changes, on_fail=lambda: self.forget_pushed(changes))
+            self.pushed_config.update(changes)
+    
+    def forget_pushed(self, changes):
+        """A push was rejected or unanswered: send those fields again with the next one"""
+        for key, value in changes.items():
+            # A newer value pushed meanwhile is its own command
+            if self.pushed_config.get(key) == value:
+                del self.pushed_config[key]
+    
+    @contextmanager
+    def bulk_update(self):
+        """Apply many widget changes with exactly one save at the end"""
+        self._bulk_depth += 1
+        try:
+            yield
+        finally:
+            self._bulk_depth -= 1
+            if self._bulk_depth == 0 and self._bulk_changed:
+                self._bulk_changed = False
+                self.push_config_to_bridge()
+                self.autosaver.request()
+                self.autosaver.flush()
+    
     def create_ui(self):
         """Create the entire UI"""
         
@@ -228,8 +584,28 @@ class ProTubeGUI:
                                      font=('Arial', 10), bg=self.bg_panel, fg=self.text_gray)
         self.battery_text.pack(side='left', padx=(0, 20))
         
-        # Battery file for reading from bridge
-        self.battery_file = "protube_battery.txt"
+        # Profile the bridge is using (one of the files it preloaded from profiles/)
+        tk.Label(bridge_inner, text="Profile:", font=('Arial', 10, 'bold'), 
+                bg=self.bg_panel, fg=self.text_white).pack(side='left', padx=(10, 5))
+        
+        self.profile_var = tk.StringVar(value=BASE_PROFILE_LABEL)
+        profile_menu = tk.OptionMenu(bridge_inner, self.profile_var, BASE_PROFILE_LABEL,
+                                     *filter(valid_profile_name, list_profiles()),
+                                     command=self.on_profile_selected)
+        profile_menu.config(bg=self.bg_panel, fg=self.text_white, 
+                           activebackground=self.lime_green, highlightthickness=0)
+        profile_menu.pack(side='left', padx=(0, 20))
+        
+        ToolTip(profile_menu,
+                f"Game profiles saved in the {PROFILES_DIR} folder next to the bridge.\n"
+                "The bridge loads them all at startup, so switching is instant.\n"
+                "Quadruple tap B on the controller steps to the next one.")
+        
+        # Status events pushed by the bridge; values come from its shared-memory status block
+        self.bridge_state = None
+        self.battery_shown = None
+        self.status_events = BridgeStatusSubscriber()
+        self.status_reader = StatusReader()
         
         # Start/Stop button
         self.bridge_button = tk.Button(bridge_inner, text="Start Bridge", 
@@ -240,7 +616,7 @@ class ProTubeGUI:
         
         # Info label
         info_label = tk.Label(bridge_inner, 
-                            text="Bridge reads config automatically - changes apply within 1 second", 
+                            text="Changes are pushed to the running bridge instantly", 
                             font=('Arial', 8), bg=self.bg_panel, fg=self.text_gray, 
                             anchor='e')
         info_label.pack(side='right', padx=10)
@@ -519,6 +895,8 @@ class ProTubeGUI:
     def on_slider_change(self, config_key, value, value_var, slider):
         """Handle slider changes"""
         int_value = int(float(value))
+        if self.config.get(config_key) == int_value:
+            return  # Programmatic set() to the current value, nothing to save
         self.config[config_key] = int_value
         value_var.set(str(int_value))
         self.on_config_change()
@@ -540,14 +918,22 @@ class ProTubeGUI:
     
     def update_filter_visibility(self):
         """Show or hide filter slider based on current mode"""
-        if self.config["mode_select"] in ["Haptic Filtered", "Haptic Experimental A"]:
+        shown = self.config["mode_select"] in ["Haptic Filtered", "Haptic Experimental A"]
+        if shown == self.filter_shown:
+            return
+        self.filter_shown = shown
+        if shown:
             self.filter_container.pack(side='left', padx=(10, 0))
         else:
             self.filter_container.pack_forget()
     
     def update_fire_mode_visibility(self):
         """Show or hide fire mode panels based on selected mode"""
-        if self.config["mode_select"] in ["Haptic Experimental A", "Haptic Experimental B"]:
+        experimental = self.config["mode_select"] in ["Haptic Experimental A", "Haptic Experimental B"]
+        if experimental == self.experimental_layout:
+            return
+        self.experimental_layout = experimental
+        if experimental:
             # Experimental modes: Show only Single Shot, center it
             self.burst_panel.grid_forget()
             self.auto_panel.grid_forget()
@@ -575,25 +961,18 @@ class ProTubeGUI:
         if self.config["mode_select"] in ["Haptic Experimental A", "Haptic Experimental B"]:
             self.send_fire_mode_to_bridge("single")
         
-        self.save_config_file()
+        self.commit_config_change()
     
     def send_fire_mode_to_bridge(self, mode):
-        """Send fire mode change to Bridge via UDP"""
-        try:
-            import socket
-            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-            message = f"mode:{mode}"
-            sock.sendto(message.encode('utf-8'), ("127.0.0.1", 5015))
-            sock.close()
-            print(f"[GUI] Sent fire mode to Bridge: {mode}")
-        except Exception as e:
-            print(f"[GUI] Could not send fire mode: {e}")
+        """Send fire mode change to the Bridge (acknowledged, resent if lost)"""
+        self.control.send_mode(mode)
+        print(f"[GUI] Sent fire mode to Bridge: {mode}")
     
     def update_latency_range(self):
         """Update latency slider range based on selected mode"""
         if self.config["mode_select"] in ["Haptic Experimental A", "Haptic Experimental B"]:
             # Experimental A and B modes: 0-10ms only
-            self.latency_slider.config(to=10)
+            self.widget_cache.config(self.latency_slider, to=10)
             # Clamp current value if needed
             if self.config["latency"] > 10:
                 self.config["latency"] = 10
@@ -601,11 +980,13 @@ class ProTubeGUI:
                 self.latency_value_var.set("10")
         else:
             # Other modes: 0-100ms
-            self.latency_slider.config(to=100)
+            self.widget_cache.config(self.latency_slider, to=100)
     
     def on_latency_change(self, value):
         """Handle latency slider changes"""
         int_value = int(float(value))
+        if self.config["latency"] == int_value:
+            return  # Programmatic set() to the current value, nothing to save
         self.config["latency"] = int_value
         self.latency_value_var.set(str(int_value))
         self.on_config_change()
@@ -627,8 +1008,7 @@ class ProTubeGUI:
     
     def on_config_change(self):
         """Called whenever any config value changes - auto-save"""
-        # Update config from UI
-        self.config["mode_select"] = self.mode_var.get()
+        # Update config from UI (mode_select is kept current by on_mode_change)
         self.config["feedback"] = self.feedback_toggle.get()
         self.config["ignore_left_hand"] = self.ignore_left_toggle.get()
         self.config["ignore_right_hand"] = self.ignore_right_toggle.get()
@@ -636,54 +1016,138 @@ class ProTubeGUI:
         # Show/hide filter slider based on mode
         self.update_filter_visibility()
         
-        # Auto-save to file
-        self.save_config_file()
+        # Push to the bridge and auto-save (debounced write-behind)
+        self.commit_config_change()
+    
+    def watch_status_socket(self):
+        """Have Tk apply status events as they arrive, False where it can't (Windows)"""
+        try:
+            self.root.tk.createfilehandler(self.status_events.sock, tk.READABLE,
+                                           lambda sock, mask: self.update_bridge_status())
+        except (AttributeError, tk.TclError):
+            return False
+        return True
     
     def check_bridge_status(self):
-        """Check if bridge process is running and read battery status"""
-        if self.bridge_process and self.bridge_process.poll() is None:
-            # Bridge is running
-            self.bridge_status_light.set_state("on")
-            self.bridge_status_text.config(text="Running", fg=self.lime_green)
-            self.bridge_button.config(text="Stop Bridge", bg="#FF6B6B")
-            
-            # Try to read battery status from file
-            self.read_battery_status()
+        """Periodic status check: renews the subscription and notices a silent or exited bridge"""
+        self.update_bridge_status()
+        self.root.after(STATUS_POLL_MS, self.check_bridge_status)
+    
+    def update_bridge_status(self):
+        """Apply status events pushed by the bridge, touching only widgets that changed"""
+        events = self.status_events.poll()
+        process_alive = self.bridge_process is not None and self.bridge_process.poll() is None
+        silent_ms = self.status_events.silent_ms()
+        
+        if NOTIFY_STOPPING in events or (self.bridge_process is not None and not process_alive):
+            self.status_events.forget()
+            state = "stopped"
+        elif silent_ms is None:
+            # Launched but not listening yet, or no bridge at all
+            state = "starting" if process_alive else "stopped"
+        elif silent_ms > HEARTBEAT_TIMEOUT_MS:
+            # Heartbeat missed: alive but stuck, or killed without saying so
+            state = "hung" if process_alive else "stopped"
         else:
-            # Bridge is not running
-            self.bridge_status_light.set_state("off")
-            self.bridge_status_text.config(text="Not Running", fg=self.text_gray)
-            self.bridge_button.config(text="Start Bridge", bg=self.lime_green)
-            self.battery_text.config(text="---%", fg=self.text_gray)
+            state = "running"
         
-        # Check again in 1 second
-        self.root.after(1000, self.check_bridge_status)
+        if state != self.bridge_state:
+            self.set_bridge_state(state)
+        if any(name != NOTIFY_HEARTBEAT for name in events):
+            self.read_bridge_status()
+    
+    def close_status_events(self):
+        if self.status_watched:
+            self.root.tk.deletefilehandler(self.status_events.sock)
+        self.status_events.close()
     
-    def read_battery_status(self):
-        """Read battery percentage from bridge-created file"""
+    def set_bridge_state(self, state):
+        """Show a new bridge state in the bridge control section"""
+        self.bridge_state = state
+        light, text, color = BRIDGE_STATES[state]
+        self.bridge_status_light.set_state(light)
+        self.widget_cache.config(self.bridge_status_text, text=text, fg=color)
+        if state == "stopped":
+            self.widget_cache.config(self.bridge_button, text="Start Bridge", bg=self.lime_green)
+            self.show_battery(None)
+            self.show_profile("")
+        else:
+            self.widget_cache.config(self.bridge_button, text="Stop Bridge", bg="#FF6B6B")
+    
+    def read_bridge_status(self):
+        """Show the right hand's battery percentage and the active profile from the bridge status block"""
+        status = self.status_reader.read()
+        battery_pct = None
+        if status is not None and status.state == STATE_RUNNING:
+            battery_pct = status.battery_level(self.battery_channel())
+        self.show_battery(battery_pct)
+        if status is not None:
+            self.show_profile(status.profile)
+    
+    def show_profile(self, name):
+        """Show the bridge's active profile in the profile menu and its values in the widgets ('': none)"""
+        label = name or BASE_PROFILE_LABEL
+        if self.profile_var.get() != label:
+            self.profile_var.set(label)
+        if (name or None) != self.profile_shown:
+            self.show_profile_values(name or None)
+    
+    def show_profile_values(self, name):
+        """Swap the widgets from the previous profile's values to this one's (None: the base config)
+        
+        Changes to a field the profile sets go to the profile; the bridge
+        saves them in its file. The config file keeps the base values.
+        """
+        overrides = {}
+        if name is not None:
+            try:
+                overrides = load_profile(name, PROFILES_DIR).overrides
+            except (OSError, ValueError, TypeError) as e:
+                print(f"[GUI] Can't read profile {name}: {e}")
+        self.config = self.base_config()
+        self.profile_base = {key: self.config.get(key, _UNSET) for key in overrides}
+        self.config.update(overrides)
+        self.profile_shown = name
+        # The bridge already has these values: don't push them back as changes
+        self.pushed_config.update((key, value) for key, value in self.config.items() if key in CONFIG_FIELDS)
+        with self.bulk_update():
+            self.refresh_gui_from_config()
+    
+    def on_profile_selected(self, label):
+        """Profile menu choice: switch the running bridge to it"""
+        self.control.send_profile(None if label == BASE_PROFILE_LABEL else label)
+        print(f"[GUI] Sent profile to Bridge: {label}")
+    
+    def battery_channel(self):
+        """Channel whose battery is shown: the first one the right hand is routed to"""
         try:
-            if os.path.exists(self.battery_file):
-                with open(self.battery_file, 'r') as f:
-                    battery_str = f.read().strip()
-                    battery_pct = int(battery_str)
-                    
-                    # Color code based on battery level
-                    if battery_pct > 50:
-                        color = self.lime_green
-                    elif battery_pct > 20:
-                        color = "#FFA500"  # Orange
-                    else:
-                        color = "#FF6B6B"  # Red
-                    
-                    self.battery_text.config(text=f"{battery_pct}%", fg=color)
-            else:
-                self.battery_text.config(text="---%", fg=self.text_gray)
-        except:
-            self.battery_text.config(text="---%", fg=self.text_gray)
+            return compile_routes(self.config.get("routes"))[ROUTE_RIGHT][0]
+        except ValueError:
+            return HAND_CHANNELS['right']
+    
+    def show_battery(self, battery_pct):
+        """Update the battery label if the percentage changed (None: unknown)"""
+        if battery_pct == self.battery_shown:
+            return
+        self.battery_shown = battery_pct
+        
+        if battery_pct is None:
+            self.widget_cache.config(self.battery_text, text="---%", fg=self.text_gray)
+            return
+        
+        # Color code based on battery level
+        if battery_pct > 50:
+            color = self.lime_green
+        elif battery_pct > 20:
+            color = "#FFA500"  # Orange
+        else:
+            color = "#FF6B6B"  # Red
+        
+        self.widget_cache.config(self.battery_text, text=f"{battery_pct}%", fg=color)
     
     def toggle_bridge(self):
-        """Start or stop the bridge process"""
-        if self.bridge_process is None or self.bridge_process.poll() is not None:
+        """Start or stop the bridge (including one this GUI didn't launch)"""
+        if self.bridge_state == "stopped":
             self.start_bridge()
         else:
             self.stop_bridge()
@@ -733,12 +1197,23 @@ class ProTubeGUI:
         stopped = False
         
         try:
+            # Ask the bridge to shut down cleanly first (also reaches a bridge we didn't launch)
+            self.control.shutdown()
+            
             if self.bridge_process:
-                # Try graceful termination first
+                try:
+                    self.bridge_process.wait(timeout=1.0)
+                    print("Bridge stopped gracefully")
+                    stopped = True
+                except subprocess.TimeoutExpired:
+                    pass
+            
+            if self.bridge_process and not stopped:
+                # Try termination next
                 self.bridge_process.terminate()
                 try:
                     self.bridge_process.wait(timeout=2.0)
-                    print("Bridge stopped gracefully")
+                    print("Bridge terminated")
                     stopped = True
                 except subprocess.TimeoutExpired:
                     # Force kill if it doesn't stop
@@ -749,8 +1224,7 @@ class ProTubeGUI:
                         stopped = True
                     except:
                         print("Bridge didn't respond to kill signal")
-                
-                self.bridge_process = None
+            self.bridge_process = None
             
             # NUCLEAR OPTION: Use taskkill to ensure ALL Bridge instances are dead
             if os.name == 'nt':  # Windows only
@@ -769,13 +1243,8 @@ class ProTubeGUI:
                 except Exception as e:
                     print(f"Taskkill failed: {e}")
             
-            # Clean up battery file to prevent stale data
-            try:
-                if os.path.exists(self.battery_file):
-                    os.remove(self.battery_file)
-                    print("Cleaned up battery file")
-            except Exception as e:
-                print(f"Could not remove battery file: {e}")
+            # Don't wait for the missed heartbeat of a bridge we just killed
+            self.status_events.forget()
             
             if stopped or not self.bridge_process:
                 print("Bridge stop complete")
@@ -831,11 +1300,11 @@ class ProTubeGUI:
                 # Update config
                 self.config.update(loaded_config)
                 
-                # Refresh all GUI widgets with new values
-                self.refresh_gui_from_config()
-                
-                # Save to default config file
-                self.save_config_file()
+                # Refresh all GUI widgets with new values and save to the
+                # default config file in a single write
+                with self.bulk_update():
+                    self.refresh_gui_from_config()
+                    self.commit_config_change()
                 
                 # Show success message
                 messagebox.showinfo("Config Loaded", 
@@ -852,15 +1321,17 @@ class ProTubeGUI:
     def refresh_gui_from_config(self):
         """Refresh all GUI widgets from current config values"""
         try:
-            # Update mode dropdown
-            self.mode_var.set(self.config["mode_select"])
+            # Update mode dropdown (setting it runs on_mode_change, so only if it differs)
+            if self.mode_var.get() != self.config["mode_select"]:
+                self.mode_var.set(self.config["mode_select"])
             self.update_filter_visibility()
             
             # Update feedback toggle
             self.feedback_toggle.set(self.config["feedback"])
             
-            # Update ignore left hand toggle
+            # Update ignore hand toggles
             self.ignore_left_toggle.set(self.config["ignore_left_hand"])
+            self.ignore_right_toggle.set(self.config.get("ignore_right_hand", False))
             
             # Update all sliders and their value displays
             for config_key in self.sliders:
@@ -879,11 +1350,18 @@ class ProTubeGUI:
     
     def on_closing(self):
         """Handle window close event"""
+        # Write any pending autosave before exiting
+        self.autosaver.flush()
+        
         # Stop bridge if running
         if self.bridge_process and self.bridge_process.poll() is None:
             self.stop_bridge()
             # Give bridge a moment to fully terminate and release files
             time.sleep(0.5)
+        print(f"[GUI] Bridge commands: {self.control.rtt_summary()}")
+        self.control.close()
+        self.close_status_events()
+        self.status_reader.close()
         
         # Destroy window
         self.root.destroy()
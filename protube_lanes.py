@@ -0,0 +1,115 @@
+"""Per-channel device worker lanes for the ProTube bridge.
+
+Blocking device calls (the ForceTube DLL) are handed off the event loop.
+Each channel gets its own long-lived worker thread with a bounded queue,
+so a slow call or a queue of burst rounds on one hand never delays the
+other hand's Shots. Lanes for the hand channels are started with the
+bridge; nothing on the shot or trigger path ever creates a thread.
+
+A lane whose queue is full drops the Shot instead of letting the backlog
+(and with it the latency) grow without bound; drops are counted per lane.
+"""
+import concurrent.futures
+import logging
+import queue
+import threading
+
+log = logging.getLogger("protube.lanes")
+
+LANE_DEPTH = 32  # queued device calls per channel before Shots are dropped
+
+
+class DeviceLane:
+    """One worker thread and bounded queue serving a single channel"""
+
+    def __init__(self, channel, depth=LANE_DEPTH):
+        self.channel = channel
+        self.submitted = 0  # counters are only touched by the submitting (loop) thread
+        self.dropped = 0
+        self.max_depth = 0
+        self._queue = queue.Queue(depth)
+        self._thread = threading.Thread(target=self._run, name=f"HapticLane-{channel}", daemon=True)
+        self._thread.start()
+
+    def depth(self):
+        """Calls waiting in the queue"""
+        return self._queue.qsize()
+
+    def submit(self, func, *args):
+        """Queue a fire-and-forget call, False if the lane is full and it was dropped"""
+        return self._put((func, args, None))
+
+    def call(self, func, *args):
+        """Queue a call and return a concurrent.futures.Future for its result"""
+        future = concurrent.futures.Future()
+        if not self._put((func, args, future)):
+            future.set_exception(queue.Full(f"channel {self.channel} lane is full"))
+        return future
+
+    def close(self):
+        """Finish the queued calls and stop the worker"""
+        self._queue.put(None)
+        self._thread.join()
+
+    def _put(self, item):
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            self.dropped += 1
+            return False
+        self.submitted += 1
+        depth = self._queue.qsize()
+        if depth > self.max_depth:
+            self.max_depth = depth
+        return True
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            func, args, future = item
+            if future is not None and not future.set_running_or_notify_cancel():
+                continue
+            try:
+                result = func(*args)
+            except Exception as e:
+                if future is None:
+                    log.error("[LANE] Device call failed on channel %s: %s", self.channel, e)
+                else:
+                    future.set_exception(e)
+            else:
+                if future is not None:
+                    future.set_result(result)
+
+
+class DeviceLanes:
+    """Worker lanes by channel, created up front for the known channels"""
+
+    def __init__(self, channels, depth=LANE_DEPTH):
+        self.depth = depth
+        self.lanes = {channel: DeviceLane(channel, depth) for channel in channels}
+
+    def lane(self, channel):
+        """The channel's lane (started on first use for a channel not given up front)"""
+        lane = self.lanes.get(channel)
+        if lane is None:
+            lane = self.lanes[channel] = DeviceLane(channel, self.depth)
+        return lane
+
+    def submit(self, channel, func, *args):
+        """Queue a fire-and-forget call on a channel's lane, False if it was dropped"""
+        return self.lane(channel).submit(func, *args)
+
+    def call(self, channel, func, *args):
+        """Queue a call on a channel's lane, returns a concurrent.futures.Future"""
+        return self.lane(channel).call(func, *args)
+
+    def close(self):
+        """Let every lane finish its queue, then stop the workers"""
+        for lane in self.lanes.values():
+            lane.close()
+
+    def summary(self):
+        return ", ".join(f"ch{c}: {lane.submitted} calls, {lane.dropped} dropped, max depth {lane.max_depth}"
+                         for c, lane in sorted(self.lanes.items()))
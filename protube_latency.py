@@ -0,0 +1,138 @@
+"""End-to-end latency instrumentation for the ProTube bridge.
+
+Every driver event gets a LatencyTrace when it is dispatched. Pulses the
+event schedules carry the trace to the device call, and each stage is
+recorded into a log-bucketed histogram per (stage, hand, fire mode):
+
+    dispatch  receive -> handler runs (batching/coalescing wait)
+    schedule  receive -> pulse queued on the scheduler
+    device    receive -> Shot call starts (first pulse of the event only)
+    late      pulse deadline -> Shot call starts (timer/offload lateness)
+    call      duration of the Shot call itself
+
+Histograms are HDR-style: 16 linear sub-buckets per power of two (about
+6% relative error) in one flat list of counts, so recording is a few
+integer operations and never allocates. Turning tracing off removes the
+timestamps, traces and histogram work from the hot path entirely.
+"""
+
+STAGES = ("dispatch", "schedule", "device", "late", "call")
+
+SUB_BUCKET_BITS = 4
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+# Buckets up to 2**63 ns; the first 2 * SUB_BUCKETS are exact
+BUCKET_COUNT = (64 - SUB_BUCKET_BITS) * SUB_BUCKETS
+
+
+def bucket_index(value):
+    """Histogram bucket for a non-negative integer value"""
+    shift = value.bit_length() - SUB_BUCKET_BITS - 1
+    if shift <= 0:
+        return value
+    return (shift << SUB_BUCKET_BITS) + (value >> shift)
+
+
+def bucket_upper(index):
+    """Largest value that falls into a bucket"""
+    shift = (index >> SUB_BUCKET_BITS) - 1
+    if shift <= 0:
+        return index
+    return (((index - (shift << SUB_BUCKET_BITS)) + 1) << shift) - 1
+
+
+class LatencyHistogram:
+    """Log-bucketed histogram of nanosecond values"""
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts = [0] * BUCKET_COUNT
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def record(self, value_ns):
+        """Add one value (negative values count as 0)"""
+        if value_ns < 0:
+            value_ns = 0
+        self.counts[bucket_index(value_ns)] += 1
+        self.count += 1
+        self.total += value_ns
+        if value_ns > self.max:
+            self.max = value_ns
+
+    def percentile(self, pct):
+        """Upper bound of the bucket holding the pct-th percentile, in ns"""
+        if not self.count:
+            return 0
+        rank = max(1, -(-self.count * pct // 100))  # nearest rank, rounded up
+        seen = 0
+        for index, bucket in enumerate(self.counts):
+            seen += bucket
+            if seen >= rank:
+                return min(bucket_upper(index), self.max)
+        return self.max
+
+    def mean(self):
+        """Mean value in ns"""
+        if not self.count:
+            return 0.0
+        return self.total / self.count
+
+    def summary(self):
+        """count, p50/p95/p99 and max in milliseconds"""
+        return (f"n={self.count} p50 {self.percentile(50) / 1e6:.3f}ms "
+                f"p95 {self.percentile(95) / 1e6:.3f}ms p99 {self.percentile(99) / 1e6:.3f}ms "
+                f"max {self.max / 1e6:.3f}ms")
+
+
+class LatencyTrace:
+    """Timestamps of one driver event, carried by the pulses it schedules"""
+    __slots__ = ("recv_ns", "dispatch_ns", "mode", "issued")
+
+    def __init__(self, recv_ns, dispatch_ns, mode):
+        self.recv_ns = recv_ns
+        self.dispatch_ns = dispatch_ns
+        self.mode = mode
+        self.issued = False  # set once the event's first Shot has been issued
+
+
+class LatencyRecorder:
+    """Histograms per (stage, hand, mode)
+
+    Each histogram has a single writer, the event loop: device-call
+    stages timed on a channel's worker lane are handed back to the loop
+    to be recorded.
+    """
+
+    def __init__(self):
+        self.histograms = {}
+
+    def histogram(self, stage, hand, mode):
+        """The histogram for one stage/hand/mode, created on first use"""
+        key = (stage, hand, mode)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms.setdefault(key, LatencyHistogram())
+        return histogram
+
+    def record(self, stage, hand, mode, value_ns):
+        self.histogram(stage, hand, mode).record(value_ns)
+
+    def combined(self, stage):
+        """One histogram of a stage across every hand and mode"""
+        merged = LatencyHistogram()
+        for (key_stage, _, _), histogram in list(self.histograms.items()):
+            if key_stage != stage:
+                continue
+            merged.counts = [a + b for a, b in zip(merged.counts, histogram.counts)]
+            merged.count += histogram.count
+            merged.total += histogram.total
+            merged.max = max(merged.max, histogram.max)
+        return merged
+
+    def summary_lines(self):
+        """One line per histogram, grouped by hand and mode"""
+        order = {stage: i for i, stage in enumerate(STAGES)}
+        keys = sorted(self.histograms, key=lambda k: (str(k[1]), str(k[2]), order.get(k[0], len(order))))
+        return [f"{hand}/{mode} {stage:<8} {self.histograms[(stage, hand, mode)].summary()}"
+                for stage, hand, mode in keys]
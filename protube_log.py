@@ -0,0 +1,122 @@
+"""Queue-backed logging for the ProTube bridge.
+
+Bridge modules log through the standard logging module. setup_logging()
+routes every record through an in-memory queue to a background writer
+thread, so a slow console (the GUI starts the bridge in its own console
+window) never sits in the haptic path:
+
+- records below the active level are rejected by the logger before any
+  formatting happens
+- records that pass are queued unformatted; the writer thread formats
+  them for the console, the optional rotating log file and a ring buffer
+  of recent lines (served by the stats endpoint at /log)
+"""
+import collections
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+
+LOG_LEVELS = ("debug", "info", "warning", "error")
+DEFAULT_LEVEL = "info"
+
+RING_SIZE = 500                   # recent lines kept in memory
+LOG_FILE_MAX_BYTES = 1_000_000
+LOG_FILE_BACKUPS = 3
+
+CONSOLE_FORMAT = "%(message)s"
+FILE_FORMAT = "%(asctime)s.%(msecs)03d %(levelname)-7s %(name)s: %(message)s"
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+_listener = None
+_ring = None
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that leaves formatting to the writer thread
+
+    The stock prepare() formats the message in the logging thread so the
+    record can be pickled; the queue here never leaves the process, so
+    records go on it as they are. Only tracebacks are rendered up front,
+    while the frames are still alive.
+    """
+
+    def prepare(self, record):
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class RingBufferHandler(logging.Handler):
+    """Keeps the most recent formatted lines in memory"""
+
+    def __init__(self, size=RING_SIZE):
+        super().__init__()
+        self.lines = collections.deque(maxlen=size)
+        self._lines_lock = threading.Lock()
+
+    def emit(self, record):
+        try:
+            line = self.format(record)
+        except Exception:
+            self.handleError(record)
+            return
+        with self._lines_lock:
+            self.lines.append(line)
+
+    def recent(self, count=None):
+        """The last count lines (all kept lines by default), oldest first"""
+        with self._lines_lock:
+            lines = list(self.lines)
+        return lines if count is None else lines[-count:]
+
+
+def setup_logging(level=DEFAULT_LEVEL, log_file=None, ring_size=RING_SIZE):
+    """Route the root logger through the queue to console, file and ring buffer"""
+    global _listener, _ring
+    shutdown_logging()
+
+    console = logging.StreamHandler(sys.stdout)
+    console.setFormatter(logging.Formatter(CONSOLE_FORMAT))
+    _ring = RingBufferHandler(ring_size)
+    _ring.setFormatter(logging.Formatter(FILE_FORMAT, DATE_FORMAT))
+    handlers = [console, _ring]
+    if log_file:
+        rotating = logging.handlers.RotatingFileHandler(
+            log_file, maxBytes=LOG_FILE_MAX_BYTES, backupCount=LOG_FILE_BACKUPS, encoding="utf-8")
+        rotating.setFormatter(logging.Formatter(FILE_FORMAT, DATE_FORMAT))
+        handlers.append(rotating)
+
+    records = queue.SimpleQueue()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(DeferredQueueHandler(records))
+    root.setLevel(level.upper() if isinstance(level, str) else level)
+
+    _listener = logging.handlers.QueueListener(records, *handlers, respect_handler_level=True)
+    _listener.start()
+
+
+def shutdown_logging():
+    """Write out everything still queued and stop the writer thread"""
+    global _listener
+    if _listener is None:
+        return
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        if isinstance(handler, DeferredQueueHandler):
+            root.removeHandler(handler)
+    _listener.stop()
+    for handler in _listener.handlers:
+        handler.close()
+    _listener = None
+
+
+def recent_lines(count=None):
+    """Recent log lines from the ring buffer (empty before setup_logging)"""
+    if _ring is None:
+        return []
+    return _ring.recent(count)
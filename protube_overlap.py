@@ -0,0 +1,168 @@
+"""Device occupancy tracking and overlap policy for the ProTube bridge.
+
+A Shot keeps a channel's device busy for its duration. Games can ask
+for haptics faster than that (a 100ms single_duration with shots every
+30ms), so the scheduler consults DeviceOccupancy whenever a pulse comes
+due while the device is still playing one from another driver event:
+
+- preempt: issue it anyway, the new command replaces the old (default,
+  the bridge's original behaviour)
+- drop:    skip it
+- merge:   issue one command covering both: the stronger kick and
+  rumble, lasting until the later of the two would have ended
+- queue:   play it as soon as the device is free, with at most
+  max_queue Shots waiting per channel (more are dropped)
+
+A pattern's own steps never overlap each other in this sense: full
+auto rounds and burst rounds faster than their duration are issued as
+configured, each replacing the one before.
+
+Every path is counted per channel, along with the time each device
+spent busy.
+"""
+
+OVERLAP_PREEMPT = "preempt"
+OVERLAP_DROP = "drop"
+OVERLAP_MERGE = "merge"
+OVERLAP_QUEUE = "queue"
+OVERLAP_POLICIES = (OVERLAP_PREEMPT, OVERLAP_DROP, OVERLAP_MERGE, OVERLAP_QUEUE)
+DEFAULT_OVERLAP = OVERLAP_PREEMPT
+
+MAX_QUEUE = 4  # Shots waiting per channel under the queue policy
+
+# admit() verdicts
+ISSUE = 0
+DROP = 1
+DEFER = 2
+
+OVERLAP_COUNTERS = ("issued", "overlapped", "preempted", "dropped", "merged", "queued", "queue_full")
+
+
+class ChannelOccupancy:
+    """What one channel's device is doing, and how overlaps were handled"""
+    __slots__ = ("free_at", "playing_until", "kick", "rumble", "source", "reserved", "busy_ns") + OVERLAP_COUNTERS
+
+    def __init__(self):
+        self.free_at = 0        # when the last issued (or queued) Shot ends
+        self.playing_until = 0  # when the last issued Shot ends
+        self.kick = 0           # strength of the Shot playing until playing_until
+        self.rumble = 0
+        self.source = None      # pattern the last issued Shot came from
+        self.reserved = []      # (start_ns, end_ns) slots of Shots deferred by the queue policy
+        self.busy_ns = 0
+        for name in OVERLAP_COUNTERS:
+            setattr(self, name, 0)
+
+    def occupy(self, now, end_ns, kick, rumble, source):
+        """Record a Shot playing from now until end_ns, replacing whatever was playing"""
+        # Busy time only grows: a Shot cut short by a shorter one still counts in full
+        self.busy_ns += max(0, end_ns - max(now, self.free_at))
+        self.playing_until = end_ns
+        # Queued Shots keep their slots (the last one ends last)
+        self.free_at = max(end_ns, self.reserved[-1][1]) if self.reserved else end_ns
+        self.kick = kick
+        self.rumble = rumble
+        self.source = source
+
+    @property
+    def waiting(self):
+        """Shots deferred by the queue policy, not yet issued"""
+        return len(self.reserved)
+
+    def summary(self):
+        return ", ".join(f"{name} {getattr(self, name)}" for name in OVERLAP_COUNTERS if getattr(self, name))
+
+
+class DeviceOccupancy:
+    """Per-channel busy tracking plus the overlap policy (loop thread only)"""
+
+    def __init__(self, policy=DEFAULT_OVERLAP, max_queue=MAX_QUEUE):
+        if policy not in OVERLAP_POLICIES:
+            raise ValueError(f"unknown overlap policy '{policy}'")
+        self.policy = policy
+        self.max_queue = max_queue
+        self.channels = {}
+
+    def channel(self, channel):
+        state = self.channels.get(channel)
+        if state is None:
+            state = self.channels[channel] = ChannelOccupancy()
+        return state
+
+    def admit(self, channel, kick, rumble, duration, now, source=None):
+        """Decide what to do with a Shot coming due now
+
+        source identifies the pattern (driver event, full auto session,
+        ...) the Shot belongs to: one following a Shot of the same pattern
+        is always issued as is. Returns (ISSUE, kick, rumble, duration) with the values to send,
+        (DROP,), or (DEFER, due_ns) for a Shot the queue policy holds back
+        until due_ns; it is issued then through issue_deferred(), or given up
+        through cancel_deferred().
+        """
+        state = self.channel(channel)
+        duration_ns = duration * 1_000_000
+        if now >= state.free_at or (source is not None and source == state.source):
+            state.occupy(now, now + duration_ns, kick, rumble, source)
+            state.issued += 1
+            return ISSUE, kick, rumble, duration
+
+        state.overlapped += 1
+        policy = self.policy
+        if policy == OVERLAP_PREEMPT:
+            state.preempted += 1
+        elif policy == OVERLAP_DROP:
+            state.dropped += 1
+            return DROP,
+        elif policy == OVERLAP_MERGE:
+            state.merged += 1
+            remaining_ms = -(-(state.free_at - now) // 1_000_000)
+            kick = max(kick, state.kick)
+            rumble = max(rumble, state.rumble)
+            duration = max(duration, remaining_ms)
+            duration_ns = duration * 1_000_000
+        else:
+            if state.waiting >= self.max_queue:
+                state.queue_full += 1
+                return DROP,
+            state.queued += 1
+            due_ns = state.free_at
+            # Reserve the device after whatever is already playing or queued
+            state.reserved.append((due_ns, due_ns + duration_ns))
+            state.busy_ns += duration_ns
+            state.free_at += duration_ns
+            return DEFER, due_ns
+
+        state.occupy(now, now + duration_ns, kick, rumble, source)
+        state.issued += 1
+        return ISSUE, kick, rumble, duration
+
+    def issue_deferred(self, channel, due_ns, kick, rumble, source=None):
+        """A queued Shot reached its reserved slot (starting at due_ns) and is being issued"""
+        state = self.channel(channel)
+        slot = self._release(state, due_ns)
+        state.playing_until = slot[1]
+        state.issued += 1
+        state.kick = kick
+        state.rumble = rumble
+        state.source = source
+
+    def cancel_deferred(self, channel, due_ns):
+        """A queued Shot was cancelled before its slot (starting at due_ns): free the slot again"""
+        state = self.channel(channel)
+        start, end = self._release(state, due_ns)
+        state.busy_ns -= end - start
+        # The device is busy until whatever still plays or waits ends; later
+        # queued Shots keep their slots (their timers are already set)
+        state.free_at = max([state.playing_until] + [end for _, end in state.reserved])
+
+    @staticmethod
+    def _release(state, due_ns):
+        """Remove and return the reserved slot starting at due_ns"""
+        for index, slot in enumerate(state.reserved):
+            if slot[0] == due_ns:
+                return state.reserved.pop(index)
+        raise KeyError(due_ns)
+
+    def summary(self):
+        parts = [f"ch{c}: {state.summary() or 'idle'}" for c, state in sorted(self.channels.items())]
+        return f"{self.policy}: " + ("; ".join(parts) if parts else "no Shots")
@@ -0,0 +1,91 @@
+"""Haptic patterns: fire modes and mode feedback as timed kick/rumble steps.
+
+Every fire mode and every mode-change feedback is a pattern: a list of
+steps [offset_ms, kick %, rumble %, duration_ms]. By default they are
+built from the GUI's flat settings (one step for a single shot,
+burst_count evenly spaced steps for a burst, ...), so nothing changes
+unless the config JSON defines its own under "patterns":
+
+    "patterns": {
+        "single": [[0, 100, 60, 80], [25, 0, 40, 60], [60, 0, 20, 60]],
+        "burst":  [[0, 100, 47, 100], [60, 85, 47, 100], [120, 70, 47, 100]]
+    }
+
+The full auto pattern is one round, repeated every auto_rate ms.
+
+Patterns are validated and compiled once per config load into flat
+tuples of (offset_ns, kick_raw, rumble_raw, duration, channel) steps per
+route (protube_routing), with every channel of the route interleaved and
+the latency compensation already added to the offsets. At fire time the
+bridge indexes the compiled pattern and hands it to the scheduler as is.
+"""
+
+# Pattern names in the config's "patterns" object
+MODE_PATTERNS = ("single", "burst", "auto", "experimental")  # indexed by fire mode
+FEEDBACK_PATTERNS = ("feedback_single", "feedback_burst", "feedback_auto")
+PATTERN_NAMES = MODE_PATTERNS + FEEDBACK_PATTERNS
+
+MAX_STEPS = 16
+MAX_OFFSET_MS = 2000
+STEP_DURATION_MS = (1, 200)
+
+# Mode feedback: 1-3 of the lightest kick the device plays (raw 1), 175ms apart
+FEEDBACK_KICK = 0.4  # percent, becomes raw 1
+FEEDBACK_DURATION_MS = 5
+FEEDBACK_SPACING_MS = 175
+
+
+def percent_to_raw(percent):
+    """Convert percentage (0-100) to raw value (0-255)"""
+    return int(percent * 2.55)
+
+
+def validate_steps(name, steps):
+    """Check a config pattern and return it as sorted (offset, kick, rumble, duration) tuples"""
+    if not isinstance(steps, (list, tuple)) or not 1 <= len(steps) <= MAX_STEPS:
+        raise ValueError(f"pattern '{name}' must be a list of 1-{MAX_STEPS} steps")
+    checked = []
+    for number, step in enumerate(steps, 1):
+        if (not isinstance(step, (list, tuple)) or len(step) != 4
+                or not all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in step)):
+            raise ValueError(f"pattern '{name}' step {number} must be [offset_ms, kick, rumble, duration_ms]")
+        offset, kick, rumble, duration = step
+        low, high = STEP_DURATION_MS
+        if not 0 <= offset <= MAX_OFFSET_MS:
+            raise ValueError(f"pattern '{name}' step {number}: offset must be 0-{MAX_OFFSET_MS}ms")
+        if not (0 <= kick <= 100 and 0 <= rumble <= 100):
+            raise ValueError(f"pattern '{name}' step {number}: kick and rumble must be 0-100")
+        if not low <= duration <= high:
+            raise ValueError(f"pattern '{name}' step {number}: duration must be {low}-{high}ms")
+        checked.append((offset, kick, rumble, duration))
+    checked.sort(key=lambda step: step[0])
+    return tuple(checked)
+
+
+def default_steps(values):
+    """Patterns equivalent to the flat GUI settings, by name ("experimental" follows "single")"""
+    burst_rate = values["auto_rate"]  # Burst spacing uses auto_rate
+    patterns = {
+        "single": ((0, values["single_kick"], values["single_rumble"], values["single_duration"]),),
+        "burst": tuple((i * burst_rate, values["burst_kick"], values["burst_rumble"],
+                        values["burst_duration"]) for i in range(int(values["burst_count"]))),
+        "auto": ((0, values["auto_kick"], values["auto_rumble"], values["auto_duration"]),),
+    }
+    for pulses, name in enumerate(FEEDBACK_PATTERNS, 1):
+        patterns[name] = tuple((i * FEEDBACK_SPACING_MS, FEEDBACK_KICK, 0, FEEDBACK_DURATION_MS)
+                               for i in range(pulses))
+    return patterns
+
+
+def compile_steps(steps, channel, offset_ms=0):
+    """Flat (offset_ns, kick_raw, rumble_raw, duration, channel) tuples for one channel"""
+    return tuple((int((offset_ms + offset) * 1_000_000), percent_to_raw(kick),
+                  percent_to_raw(rumble), int(duration), channel)
+                 for offset, kick, rumble, duration in steps)
+
+
+def compile_for_channels(steps, channels, offset_ms=0):
+    """compile_steps played on several channels at once, merged in offset order"""
+    merged = [step for channel in channels for step in compile_steps(steps, channel, offset_ms)]
+    merged.sort(key=lambda step: step[0])
+    return tuple(merged)
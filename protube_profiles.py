@@ -0,0 +1,296 @@
+"""Preloaded config profiles for the ProTube bridge.
+
+A profile is a config saved for one game: a JSON file in PROFILES_DIR
+(what the GUI's "Save Config As..." writes), named after the file. Its
+fields override the bridge's base config, and an optional "processes"
+list names the game executables it belongs to:
+
+    profiles/Half-Life Alyx.json
+    {
+        "processes": ["hlvr.exe"],
+        "single_kick": 80,
+        "auto_rate": 90
+    }
+
+ProfileBank compiles every profile into a ConfigSnapshot up front, and
+again whenever the base config changes, so switching profiles is one
+dict lookup and one reference swap on the shot path.
+
+ProcessScanner finds which of those executables are running. A scan
+lists the process ids (one call) and resolves only the ids it hasn't
+seen before to a name; every FULL_RESCAN_EVERY scans it forgets the
+cache, in case an id was reused by another process.
+"""
+import ctypes
+import json
+import logging
+import os
+import re
+import sys
+
+from protube_config import atomic_write_json, compile_config, coerce_field
+from protube_status import PROFILE_NAME_BYTES
+
+log = logging.getLogger("protube.profiles")
+
+PROFILES_DIR = "profiles"
+PROFILE_EXT = ".json"
+
+# Profile fields that aren't config fields (validated when compiled, or not config at all)
+STRUCTURED_FIELDS = ("routes", "patterns")
+PROCESSES_FIELD = "processes"
+
+# Driver message keywords ("profile:next", "profile:base", ...) a profile can't be named
+RESERVED_NAMES = ("base", "next", "prev")
+
+PROFILE_SCAN_INTERVAL = 5.0  # seconds between process scans for auto-selection
+FULL_RESCAN_EVERY = 12       # scans between dropping the pid -> name cache
+
+
+class Profile:
+    """One profile file: config overrides and the executables it is for"""
+    __slots__ = ("name", "overrides", "processes")
+
+    def __init__(self, name, overrides, processes=()):
+        self.name = name
+        self.overrides = overrides
+        self.processes = processes  # lowercase executable names
+
+    def to_json(self):
+        """The profile's file contents"""
+        data = {PROCESSES_FIELD: list(self.processes)} if self.processes else {}
+        data.update(self.overrides)
+        return data
+
+
+def check_profile_name(name):
+    """ValueError unless a profile can be called name (selectable from the driver, fits the status block)"""
+    if name.lower() in RESERVED_NAMES:
+        raise ValueError(f"'{name}' is reserved for profile:{name.lower()} messages, rename the file")
+    if len(name.encode('utf-8')) > PROFILE_NAME_BYTES:
+        raise ValueError(f"name is longer than {PROFILE_NAME_BYTES} bytes, rename the file")
+
+
+def valid_profile_name(name):
+    try:
+        check_profile_name(name)
+    except ValueError:
+        return False
+    return True
+
+
+def parse_profile(name, data):
+    """Validate a profile's name and JSON object into a Profile, ValueError if it isn't one"""
+    check_profile_name(name)
+    if not isinstance(data, dict):
+        raise ValueError("profile must be a JSON object")
+    overrides = {}
+    processes = ()
+    for key, value in data.items():
+        if key == PROCESSES_FIELD:
+            if not isinstance(value, list) or not all(isinstance(p, str) and p for p in value):
+                raise ValueError(f"{PROCESSES_FIELD} must be a list of executable names")
+            processes = tuple(p.lower() for p in value)
+        elif key in STRUCTURED_FIELDS:
+            overrides[key] = value
+        else:
+            overrides[key] = coerce_field(key, value)
+    return Profile(name, overrides, processes)
+
+
+def list_profiles(directory=PROFILES_DIR):
+    """Names of the profile files in a directory, sorted (none if it doesn't exist)"""
+    try:
+        files = os.listdir(directory)
+    except OSError:
+        return []
+    return sorted(f[:-len(PROFILE_EXT)] for f in files if f.lower().endswith(PROFILE_EXT))
+
+
+def profile_path(name, directory=PROFILES_DIR):
+    return os.path.join(directory, name + PROFILE_EXT)
+
+
+def load_profile(name, directory=PROFILES_DIR):
+    """Read one profile file, OSError/ValueError if it can't be used"""
+    with open(profile_path(name, directory), 'r') as f:
+        return parse_profile(name, json.load(f))
+
+
+def load_profiles(directory=PROFILES_DIR):
+    """Read every profile in a directory, logging and skipping the invalid ones"""
+    profiles = []
+    for name in list_profiles(directory):
+        try:
+            profiles.append(load_profile(name, directory))
+        except (OSError, ValueError, TypeError) as e:
+            log.warning("[PROFILE] Skipping %s: %s", profile_path(name, directory), e)
+    return profiles
+
+
+def save_profile(profile, directory=PROFILES_DIR):
+    """Write a profile back to its file (atomically, the GUI may be reading it)"""
+    atomic_write_json(profile_path(profile.name, directory), profile.to_json())
+
+
+class ProfileBank:
+    """Every profile compiled against the base config, ready to swap in"""
+
+    def __init__(self, profiles=()):
+        self.profiles = {profile.name: profile for profile in profiles}
+        self.names = tuple(sorted(self.profiles))
+        self.base = None
+        self.snapshots = {}  # name -> ConfigSnapshot
+        self.values = {}     # name -> config dict the snapshot was compiled from
+        # Executable -> profile, first profile (by name) wins
+        self.by_process = {}
+        for name in self.names:
+            for process in self.profiles[name].processes:
+                self.by_process.setdefault(process, name)
+
+    def compile(self, base_values, base_snapshot=None):
+        """Compile every profile over a base config, returns {name: error} for those that failed
+
+        A profile that fails keeps no snapshot, so selecting it falls back
+        to the base config until it compiles again.
+        """
+        self.base = base_snapshot or compile_config(base_values)
+        self.snapshots = {}
+        self.values = {}
+        errors = {}
+        for name in self.names:
+            merged = dict(base_values)
+            merged.update(self.profiles[name].overrides)
+            try:
+                self.snapshots[name] = compile_config(merged)
+            except (ValueError, KeyError, TypeError) as e:
+                errors[name] = e
+                continue
+            self.values[name] = merged
+        return errors
+
+    def select(self, name):
+        """Snapshot of a profile, or the base config's for None; KeyError if unknown"""
+        if name is None:
+            return self.base
+        snapshot = self.snapshots.get(name)
+        if snapshot is None:
+            if name not in self.profiles:
+                raise KeyError(name)
+            return self.base  # Known, but didn't compile over this base
+        return snapshot
+
+    def step(self, name, offset):
+        """Profile offset places from name in the cycle base, first..last (None is the base)"""
+        cycle = (None,) + self.names
+        index = cycle.index(name) if name in cycle else 0
+        return cycle[(index + offset) % len(cycle)]
+
+    def match(self, processes):
+        """Profile for the first running executable that has one, None if none do"""
+        for process in sorted(processes):
+            name = self.by_process.get(process)
+            if name is not None:
+                return name
+        return None
+
+    @property
+    def channels(self):
+        """Every channel the base config or any profile routes to, sorted"""
+        snapshots = [self.base, *self.snapshots.values()]
+        return tuple(sorted({channel for snapshot in snapshots for channel in snapshot.channels}))
+
+    @property
+    def auto_selectable(self):
+        """True if any profile names executables to look for"""
+        return bool(self.by_process)
+
+
+class ProcessScanner:
+    """Names of the running executables, resolving each process id only once"""
+
+    def __init__(self):
+        self.names = {}  # pid -> lowercase executable name ('' if it couldn't be read)
+        self.scans = 0
+        self.resolved = 0  # pid lookups done, across every scan
+        if sys.platform == "win32":
+            self._list_pids = self._windows_pids
+            self._resolve = self._windows_name
+            self._psapi = ctypes.WinDLL("psapi")
+            self._kernel32 = kernel32 = ctypes.WinDLL("kernel32")
+            kernel32.OpenProcess.restype = ctypes.c_void_p  # HANDLE, not an int on 64-bit
+            kernel32.OpenProcess.argtypes = [ctypes.c_uint32, ctypes.c_int, ctypes.c_uint32]
+            kernel32.QueryFullProcessImageNameW.argtypes = [ctypes.c_void_p, ctypes.c_uint32, ctypes.c_wchar_p,
+                                                            ctypes.POINTER(ctypes.c_uint32)]
+            kernel32.CloseHandle.argtypes = [ctypes.c_void_p]
+        else:
+            self._list_pids = self._proc_pids
+            self._resolve = self._proc_name
+
+    def scan(self):
+        """Set of lowercase executable names running now (blocking: call off the loop)"""
+        self.scans += 1
+        if self.scans % FULL_RESCAN_EVERY == 0:
+            self.names.clear()
+        cached = self.names
+        running = {}
+        for pid in self._list_pids():
+            name = cached.get(pid)
+            if name is None:
+                name = self._resolve(pid)
+                self.resolved += 1
+            running[pid] = name
+        self.names = running  # Drops processes that exited
+        return {name for name in running.values() if name}
+
+    # --- Windows: EnumProcesses + QueryFullProcessImageNameW ---
+
+    def _windows_pids(self):
+        size = 1024
+        while True:
+            pids = (ctypes.c_uint32 * size)()
+            returned = ctypes.c_uint32()
+            if not self._psapi.EnumProcesses(pids, ctypes.sizeof(pids), ctypes.byref(returned)):
+                return []
+            count = returned.value // ctypes.sizeof(ctypes.c_uint32)
+            if count < size:
+                return pids[:count]
+            size *= 2  # Buffer was full: there may be more
+
+    def _windows_name(self, pid):
+        PROCESS_QUERY_LIMITED_INFORMATION = 0x1000
+        handle = self._kernel32.OpenProcess(PROCESS_QUERY_LIMITED_INFORMATION, False, pid)
+        if not handle:
+            return ""  # System processes, or ones we may not open
+        try:
+            buffer = ctypes.create_unicode_buffer(1024)
+            length = ctypes.c_uint32(len(buffer))
+            if not self._kernel32.QueryFullProcessImageNameW(handle, 0, buffer, ctypes.byref(length)):
+                return ""
+            return _basename(buffer.value)
+        finally:
+            self._kernel32.CloseHandle(handle)
+
+    # --- Linux: /proc (Proton/Wine games show their .exe as argv[0]) ---
+
+    def _proc_pids(self):
+        try:
+            return [int(entry) for entry in os.listdir("/proc") if entry.isdigit()]
+        except OSError:
+            return []
+
+    def _proc_name(self, pid):
+        try:
+            with open(f"/proc/{pid}/cmdline", 'rb') as f:
+                argv0 = f.read().split(b"\0", 1)[0]
+            if argv0:
+                return _basename(argv0.decode('utf-8', 'replace'))
+            with open(f"/proc/{pid}/comm", 'rb') as f:
+                return f.read().strip().decode('utf-8', 'replace').lower()
+        except OSError:
+            return ""  # Exited meanwhile, or not ours to read
+
+
+def _basename(path):
+    """Lowercase file name of a Windows or POSIX path"""
+    return re.split(r"[\\/]", path)[-1].lower()
@@ -0,0 +1,135 @@
+"""Versioned binary event protocol for driver -> bridge datagrams.
+
+Lives next to the text protocol (shot_left, trigger_right:1, mode:burst,
+...) on the same port. Binary packets start with PROTOCOL_MAGIC, which
+is not a printable ASCII character, so the bridge can tell the two
+apart from the first byte.
+
+Packet layout (little-endian, 20 bytes):
+
+    magic    u8   PROTOCOL_MAGIC
+    version  u8   PROTOCOL_VERSION
+    type     u8   EVENT_SHOT / EVENT_TRIGGER / EVENT_MODE / EVENT_DURATION
+    hand     u8   HAND_RIGHT / HAND_LEFT (as the driver names it, like the text protocol)
+    seq      u32  per-sender sequence number (wraps)
+    send_ns  u64  sender's monotonic clock (time.monotonic_ns / QueryPerformanceCounter) in ns
+    payload  i32  trigger state, mode id or duration depending on type
+"""
+import struct
+
+PROTOCOL_MAGIC = 0xB7
+PROTOCOL_VERSION = 1
+
+EVENT_SHOT = 1
+EVENT_TRIGGER = 2
+EVENT_MODE = 3
+EVENT_DURATION = 4
+
+HAND_RIGHT = 0
+HAND_LEFT = 1
+
+# Fire mode ids carried by EVENT_MODE
+MODE_IDS = {0: "single", 1: "burst", 2: "auto"}
+
+PACKET = struct.Struct("<BBBBIQi")
+PACKET_SIZE = PACKET.size
+
+_SEQ_MASK = 0xFFFFFFFF
+_HAND_NAMES = ("right", "left")
+
+
+class ProtocolError(ValueError):
+    """Datagram looks binary but can't be decoded"""
+
+
+def is_binary(data):
+    """True if a datagram uses the binary protocol"""
+    return len(data) > 0 and data[0] == PROTOCOL_MAGIC
+
+
+def encode_event(event_type, hand, seq, send_ns, payload=0):
+    """Pack one event into a binary datagram"""
+    return PACKET.pack(PROTOCOL_MAGIC, PROTOCOL_VERSION, event_type, hand,
+                       seq & _SEQ_MASK, send_ns, payload)
+
+
+def decode_event(data):
+    """Unpack a binary datagram into (type, hand, seq, send_ns, payload)"""
+    if len(data) < PACKET_SIZE:
+        raise ProtocolError(f"short packet ({len(data)} bytes)")
+    magic, version, event_type, hand, seq, send_ns, payload = PACKET.unpack_from(data)
+    if version != PROTOCOL_VERSION:
+        raise ProtocolError(f"unsupported protocol version {version}")
+    if hand > HAND_LEFT:
+        raise ProtocolError(f"bad hand {hand}")
+    return event_type, hand, seq, send_ns, payload
+
+
+def binary_key(event_type, hand, payload):
+    """Integer dispatch key for an event (no tuple allocation on lookup)"""
+    return (event_type << 40) | (hand << 32) | (payload & 0xFFFFFFFF)
+
+
+def event_to_message(event_type, hand, payload):
+    """The equivalent text protocol message, so both formats share one dispatcher"""
+    side = _HAND_NAMES[hand]
+    if event_type == EVENT_SHOT:
+        return f"shot_{side}"
+    if event_type == EVENT_TRIGGER:
+        return f"trigger_{side}:{1 if payload else 0}"
+    if event_type == EVENT_MODE:
+        try:
+            return f"mode:{MODE_IDS[payload]}"
+        except KeyError:
+            raise ProtocolError(f"bad mode id {payload}")
+    if event_type == EVENT_DURATION:
+        return f"duration:{payload}"
+    raise ProtocolError(f"unknown event type {event_type}")
+
+
+class SourceStats:
+    """Loss, reordering and latency of the binary events from one sender"""
+    __slots__ = ("received", "lost", "reordered", "expected_seq",
+                 "total_latency_ns", "max_latency_ns")
+
+    def __init__(self):
+        self.received = 0
+        self.lost = 0        # sequence numbers skipped (may later arrive as reordered)
+        self.reordered = 0   # arrived after a later sequence number
+        self.expected_seq = None
+        self.total_latency_ns = 0
+        self.max_latency_ns = 0
+
+    def record(self, seq, send_ns, recv_ns):
+        """Account for one received event"""
+        self.received += 1
+
+        latency = recv_ns - send_ns
+        if latency > 0:
+            self.total_latency_ns += latency
+            if latency > self.max_latency_ns:
+                self.max_latency_ns = latency
+
+        if self.expected_seq is None:
+            self.expected_seq = (seq + 1) & _SEQ_MASK
+            return True
+        ahead = (seq - self.expected_seq) & _SEQ_MASK
+        if ahead < 0x80000000:
+            # In order (ahead == 0) or after a gap
+            self.lost += ahead
+            self.expected_seq = (seq + 1) & _SEQ_MASK
+            return True
+        # Older than something we've already seen
+        self.reordered += 1
+        if self.lost:
+            self.lost -= 1  # it was counted as lost when the gap opened
+        return False
+
+    def mean_latency_ms(self):
+        if not self.received:
+            return 0.0
+        return self.total_latency_ns / self.received / 1e6
+
+    def summary(self):
+        return (f"{self.received} events, {self.lost} lost, {self.reordered} reordered, "
+                f"latency mean {self.mean_latency_ms():.3f}ms max {self.max_latency_ns / 1e6:.3f}ms")
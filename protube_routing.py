@@ -0,0 +1,72 @@
+"""Routing of driver event sources to ForceTube channels.
+
+The driver reports events for two sources, the right and left hand, and
+the bridge adds a third: mode change feedback. Each source is routed to
+any number of ForceTube channels, so one shot can kick a stock-mounted
+unit and a grip together, or be mirrored to several devices. Routes come
+from the config's optional "routes" object; without one every source
+keeps its single default channel:
+
+    "routes": {
+        "right": [4, 1],
+        "left": [5],
+        "feedback": [4]
+    }
+
+Routes are compiled with the rest of the config into tuples indexed by
+route number (ROUTE_RIGHT, ...). The driver's dispatch table binds each
+handler to its route number, so the shot path indexes arrays the same
+way no matter how many channels are routed.
+"""
+
+# Route numbers, used to index every per-route table
+ROUTE_RIGHT = 0
+ROUTE_LEFT = 1
+ROUTE_FEEDBACK = 2
+ROUTE_SOURCES = ("right", "left", "feedback")  # indexed by route number
+HAND_ROUTES = {'right': ROUTE_RIGHT, 'left': ROUTE_LEFT}
+
+# Channel each hand's ForceTube is on by default
+HAND_CHANNELS = {'right': 4, 'left': 5}
+
+# Mode change feedback plays on the right hand (where the mode button is)
+FEEDBACK_CHANNEL = HAND_CHANNELS['right']
+
+DEFAULT_ROUTES = ((HAND_CHANNELS['right'],), (HAND_CHANNELS['left'],), (FEEDBACK_CHANNEL,))
+
+# ForceTube API channels: 0 addresses every device at once, 1-7 one device each
+CHANNEL_RANGE = (1, 7)
+MAX_ROUTE_CHANNELS = 4
+
+
+def compile_routes(routes):
+    """Validate the config's "routes" object, returns channel tuples indexed by route number"""
+    if routes is None:
+        return DEFAULT_ROUTES
+    if not isinstance(routes, dict):
+        raise ValueError("routes must be an object")
+    compiled = list(DEFAULT_ROUTES)
+    low, high = CHANNEL_RANGE
+    for source, channels in routes.items():
+        if source not in ROUTE_SOURCES:
+            raise ValueError(f"unknown route '{source}' (one of {', '.join(ROUTE_SOURCES)})")
+        if isinstance(channels, int) and not isinstance(channels, bool):
+            channels = [channels]
+        if (not isinstance(channels, (list, tuple)) or not 1 <= len(channels) <= MAX_ROUTE_CHANNELS
+                or not all(isinstance(c, int) and not isinstance(c, bool) for c in channels)):
+            raise ValueError(f"route '{source}' must be a list of 1-{MAX_ROUTE_CHANNELS} channels")
+        if not all(low <= c <= high for c in channels):
+            raise ValueError(f"route '{source}': channels must be {low}-{high}")
+        compiled[ROUTE_SOURCES.index(source)] = tuple(dict.fromkeys(channels))  # drop repeats, keep order
+    return tuple(compiled)
+
+
+def routed_channels(routes):
+    """Every channel some route plays on, sorted"""
+    return tuple(sorted({channel for channels in routes for channel in channels}))
+
+
+def describe_routes(routes):
+    """One-line summary, e.g. 'right -> 4+1, left -> 5, feedback -> 4'"""
+    return ", ".join(f"{source} -> {'+'.join(map(str, channels))}"
+                     for source, channels in zip(ROUTE_SOURCES, routes))
@@ -0,0 +1,324 @@
+"""Haptic command scheduler for the ProTube bridge.
+
+The bridge's event loop never sleeps. Shots, bursts, latency delays and
+fire mode feedback are enqueued here as timestamped device commands;
+each one is a loop timer that issues the command when it comes due, so
+the loop only wakes when there is something to fire. A command coming
+due while its channel's device is still busy goes through the overlap
+policy (protube_overlap) first.
+
+Time and timers come from a clock (protube_clock): the event loop's by
+default, or a VirtualClock to run the scheduler in simulated time.
+"""
+import itertools
+import logging
+import time
+
+from protube_clock import LoopClock
+from protube_overlap import ISSUE, DEFER, DeviceOccupancy
+
+log = logging.getLogger("protube.scheduler")
+
+
+def now_ns():
+    """Current monotonic time in nanoseconds"""
+    return time.monotonic_ns()
+
+
+def ms_to_ns(ms):
+    """Convert milliseconds to nanoseconds"""
+    return int(ms * 1_000_000)
+
+
+class CadenceStats:
+    """Deviation of a repeating pulse train from its ideal deadline grid"""
+    __slots__ = ("period_ns", "rounds", "missed", "first_ns", "last_ns",
+                 "total_dev_ns", "max_dev_ns")
+
+    def __init__(self, period_ns):
+        self.period_ns = period_ns
+        self.rounds = 0
+        self.missed = 0  # grid slots skipped because we were more than a period late
+        self.first_ns = None
+        self.last_ns = None
+        self.total_dev_ns = 0
+        self.max_dev_ns = 0
+
+    def record(self, ideal_ns, actual_ns):
+        """Record one fired round against its ideal deadline"""
+        dev = actual_ns - ideal_ns
+        if dev < 0:
+            dev = -dev
+        self.rounds += 1
+        self.total_dev_ns += dev
+        if dev > self.max_dev_ns:
+            self.max_dev_ns = dev
+        if self.first_ns is None:
+            self.first_ns = actual_ns
+        self.last_ns = actual_ns
+
+    def mean_dev_ms(self):
+        """Mean absolute deviation from the grid in milliseconds"""
+        if not self.rounds:
+            return 0.0
+        return self.total_dev_ns / self.rounds / 1e6
+
+    def max_dev_ms(self):
+        """Worst deviation from the grid in milliseconds"""
+        return self.max_dev_ns / 1e6
+
+    def actual_period_ms(self):
+        """Average measured period between fired rounds in milliseconds"""
+        if self.rounds < 2:
+            return self.period_ns / 1e6
+        return (self.last_ns - self.first_ns) / (self.rounds - 1 + self.missed) / 1e6
+
+    def summary(self):
+        """One-line report of the session cadence"""
+        text = (f"{self.rounds} rounds, period {self.actual_period_ms():.2f}ms "
+                f"(target {self.period_ns / 1e6:.2f}ms), "
+                f"jitter mean {self.mean_dev_ms():.2f}ms max {self.max_dev_ms():.2f}ms")
+        if self.missed:
+            text += f", {self.missed} missed"
+        return text
+
+
+class ScheduledPulse:
+    """One timestamped Shot command waiting in the scheduler"""
+    __slots__ = ("due_ns", "channel", "kick", "rumble", "duration", "tag",
+                 "period_ns", "cadence", "cancelled", "trace", "source", "deferred", "grid_ns")
+
+    def __init__(self, due_ns, channel, kick, rumble, duration, tag,
+                 period_ns=0, cadence=None, trace=None, source=None):
+        self.due_ns = due_ns
+        self.channel = channel
+        self.kick = kick
+        self.rumble = rumble
+        self.duration = duration
+        self.tag = tag
+        self.period_ns = period_ns  # > 0 for repeating pulses (full auto)
+        self.cadence = cadence
+        self.cancelled = False
+        self.trace = trace  # LatencyTrace of the driver event that scheduled it
+        self.source = source  # pattern it belongs to; its own steps never overlap each other
+        self.deferred = False  # held back by the queue overlap policy, already admitted
+        self.grid_ns = None  # deferred: the cadence deadline it was held back from
+
+
+class HapticScheduler:
+    """Timestamped Shot commands fired by timers on the bridge's event loop
+
+    Every method must be called from the loop's thread. If lanes (a
+    protube_lanes.DeviceLanes) is given, each device call is handed to
+    its channel's worker lane so a blocking DLL call never stalls the
+    loop or the other channel; otherwise calls run inline.
+
+    With a LatencyRecorder, pulses pick up current_trace when scheduled
+    and their device calls are timed; without one the untimed issue path
+    is bound and no tracing work is done.
+
+    occupancy (a DeviceOccupancy) tracks how long each channel's device
+    is busy and decides what happens to overlapping Shots.
+
+    clock supplies now_ns() and timers; a LoopClock (real time on the
+    event loop) unless one is given.
+    """
+
+    def __init__(self, shot_func, lanes=None, recorder=None, occupancy=None, clock=None):
+        self.shot_func = shot_func  # shot_func(kick, rumble, duration, channel)
+        self.lanes = lanes
+        self.recorder = recorder
+        self.occupancy = occupancy if occupancy is not None else DeviceOccupancy()
+        self.clock = clock if clock is not None else LoopClock()
+        self.current_trace = None  # trace of the driver event being dispatched
+        self.issued = {}  # channel -> Shots issued
+        self.first_issue_ns = None  # clock time the first Shot was issued
+        self._pending = {}  # pulse -> timer handle
+        self._sources = itertools.count(1)  # one per scheduled pattern
+        self._running = False
+        self._issue = self._issue_traced if recorder is not None else self._issue_plain
+
+    def start(self, loop=None):
+        """Start firing pulses (a LoopClock uses loop, the running one by default)"""
+        self.clock.bind(loop)
+        self._running = True
+
+    def stop(self):
+        """Stop firing and drop anything still pending"""
+        self.cancel_all()
+        self._running = False
+
+    def schedule_pattern(self, steps, tag=None):
+        """Queue a compiled pattern: (offset_ns, kick, rumble, duration, channel) steps from now"""
+        start = self.clock.now_ns()
+        trace = self.current_trace
+        source = next(self._sources)
+        for offset_ns, kick, rumble, duration, channel in steps:
+            self._add(ScheduledPulse(start + offset_ns, channel, kick, rumble, duration, tag,
+                                     trace=trace, source=source))
+
+    def schedule_pattern_repeating(self, steps, period_ns, tag=None, cadence=None):
+        """Repeat a compiled pattern every period_ns on an absolute deadline grid until cancelled
+
+        Each step becomes its own repeating pulse on the same grid;
+        cadence (if given) follows the first step.
+        """
+        if period_ns <= 0:
+            raise ValueError("period_ns must be positive")
+        start = self.clock.now_ns()
+        trace = self.current_trace
+        source = next(self._sources)
+        for offset_ns, kick, rumble, duration, channel in steps:
+            self._add(ScheduledPulse(start + offset_ns, channel, kick, rumble, duration, tag,
+                                     period_ns, cadence, trace, source))
+            cadence = None
+
+    def cancel(self, *tags):
+        """Drop every pending pulse carrying one of the given tags, returns how many"""
+        doomed = [p for p in self._pending if p.tag in tags]
+        for pulse in doomed:
+            self._drop(pulse)
+        return len(doomed)
+
+    def cancel_all(self):
+        """Drop every pending pulse, returns how many"""
+        doomed = list(self._pending)
+        for pulse in doomed:
+            self._drop(pulse)
+        return len(doomed)
+
+    def pending(self, tag=None):
+        """Number of pulses waiting (optionally only those with a tag)"""
+        if tag is None:
+            return len(self._pending)
+        return sum(1 for p in self._pending if p.tag == tag)
+
+    def _add(self, pulse):
+        self._arm(pulse)
+        if pulse.trace is not None:
+            self._record_scheduled(pulse)
+
+    def _arm(self, pulse):
+        """Set a timer for the pulse's deadline (dropped while stopped)"""
+        if not self._running:
+            return
+        self._pending[pulse] = self.clock.call_at(pulse.due_ns, self._fire, pulse)
+
+    def _drop(self, pulse):
+        self._pending.pop(pulse).cancel()
+        pulse.cancelled = True
+        if pulse.deferred:
+            self.occupancy.cancel_deferred(pulse.channel, pulse.due_ns)
+
+    def _fire(self, pulse):
+        """Timer callback: apply the overlap policy, issue the pulse, then re-arm it if it repeats"""
+        del self._pending[pulse]
+        now = self.clock.now_ns()
+        cadence = pulse.cadence
+
+        # Cadence counts the rounds that actually go out, against their grid deadline
+        if pulse.deferred:
+            self.occupancy.issue_deferred(pulse.channel, pulse.due_ns, pulse.kick, pulse.rumble, pulse.source)
+            if cadence is not None:
+                cadence.record(pulse.grid_ns, now)
+            self._send(pulse, pulse.kick, pulse.rumble, pulse.duration)
+        else:
+            verdict = self.occupancy.admit(pulse.channel, pulse.kick, pulse.rumble, pulse.duration, now,
+                                           pulse.source)
+            if verdict[0] == ISSUE:
+                if cadence is not None:
+                    cadence.record(pulse.due_ns, now)
+                self._send(pulse, *verdict[1:])
+            elif verdict[0] == DEFER:
+                self._defer(pulse, verdict[1])
+            elif cadence is not None:
+                cadence.missed += 1  # Dropped: a grid slot with no round
+
+        if pulse.period_ns:
+            self._rearm(pulse)
+
+    def _send(self, pulse, kick, rumble, duration):
+        issued = self.issued.get(pulse.channel)
+        if issued is None:
+            issued = 0
+            if self.first_issue_ns is None:
+                self.first_issue_ns = self.clock.now_ns()
+        self.issued[pulse.channel] = issued + 1
+        self._issue(pulse, kick, rumble, duration)
+
+    def _defer(self, pulse, due_ns):
+        """Hold a Shot back until its channel's device is free (one-off, even for repeating pulses)"""
+        held = ScheduledPulse(due_ns, pulse.channel, pulse.kick, pulse.rumble, pulse.duration,
+                              pulse.tag, cadence=pulse.cadence, trace=pulse.trace, source=pulse.source)
+        held.deferred = True
+        held.grid_ns = pulse.due_ns
+        self._arm(held)
+
+    def _issue_plain(self, pulse, kick, rumble, duration):
+        """Call the device for a pulse (inline or on its channel's lane)"""
+        if self.lanes is None:
+            try:
+                self.shot_func(kick, rumble, duration, pulse.channel)
+            except Exception as e:
+                log.error("[SCHEDULER] Shot failed on channel %s: %s", pulse.channel, e)
+        else:
+            # A full lane drops the Shot (counted by the lane)
+            self.lanes.submit(pulse.channel, self.shot_func, kick, rumble, duration, pulse.channel)
+
+    def _issue_traced(self, pulse, kick, rumble, duration):
+        """Like _issue_plain, but time the device call of traced pulses"""
+        if pulse.trace is None:
+            self._issue_plain(pulse, kick, rumble, duration)
+        elif self.lanes is None:
+            start, end = self._timed_shot(pulse.channel, kick, rumble, duration)
+            self._record_shot(pulse, pulse.due_ns, start, end)
+        else:
+            # due_ns is passed along: a repeating pulse is re-armed before the lane runs it
+            self.lanes.submit(pulse.channel, self._timed_lane_shot, pulse, pulse.due_ns, kick, rumble, duration)
+
+    def _timed_shot(self, channel, kick, rumble, duration):
+        """Issue one Shot, returns when its device call started and ended"""
+        clock = self.clock
+        start = clock.now_ns()
+        try:
+            self.shot_func(kick, rumble, duration, channel)
+        except Exception as e:
+            log.error("[SCHEDULER] Shot failed on channel %s: %s", channel, e)
+        return start, clock.now_ns()
+
+    def _timed_lane_shot(self, pulse, due_ns, kick, rumble, duration):
+        """_timed_shot on a worker lane: the timings are recorded back on the loop's thread
+
+        Mirrored routes run one pulse per channel on different lanes at
+        the same time, and the histograms and trace are single-writer.
+        """
+        start, end = self._timed_shot(pulse.channel, kick, rumble, duration)
+        self.clock.call_soon_threadsafe(self._record_shot, pulse, due_ns, start, end)
+
+    def _record_shot(self, pulse, due_ns, start, end):
+        """Record a Shot's lateness, end-to-end latency and call duration (loop thread)"""
+        trace = pulse.trace
+        recorder = self.recorder
+        recorder.record("late", pulse.tag, trace.mode, start - due_ns)
+        if not trace.issued:
+            trace.issued = True
+            recorder.record("device", pulse.tag, trace.mode, start - trace.recv_ns)
+        recorder.record("call", pulse.tag, trace.mode, end - start)
+
+    def _record_scheduled(self, pulse):
+        trace = pulse.trace
+        self.recorder.record("schedule", pulse.tag, trace.mode, self.clock.now_ns() - trace.recv_ns)
+
+    def _rearm(self, pulse):
+        """Put a repeating pulse back on its next grid deadline"""
+        next_due = pulse.due_ns + pulse.period_ns
+        late_ns = self.clock.now_ns() - next_due
+        if late_ns >= pulse.period_ns:
+            # Too far behind: skip whole slots instead of firing a catch-up salvo
+            skipped = late_ns // pulse.period_ns
+            next_due += skipped * pulse.period_ns
+            if pulse.cadence is not None:
+                pulse.cadence.missed += skipped
+        pulse.due_ns = next_due
+        self._arm(pulse)
+
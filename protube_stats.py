@@ -0,0 +1,142 @@
+"""Local stats endpoint for the ProTube bridge.
+
+Serves the bridge's counters in Prometheus text format over HTTP on the
+loopback interface, so the bridge can be watched under load without
+scraping its console:
+
+    curl http://127.0.0.1:5017/metrics
+
+Pages are rendered on the bridge's event loop by callbacks, so every
+value on a page comes from the same moment. /log shows the most recent
+log lines.
+"""
+import asyncio
+import collections
+import logging
+
+log = logging.getLogger("protube.stats")
+
+STATS_IP = "127.0.0.1"
+STATS_PORT = 5017
+
+RATE_WINDOW_SECONDS = 5   # shots/sec are averaged over this many seconds
+REQUEST_TIMEOUT = 2.0
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+class MetricsPage:
+    """Builds one Prometheus text exposition page"""
+
+    def __init__(self):
+        self._families = {}  # name -> (type, help, [lines])
+
+    def _family(self, name, kind, help_text):
+        family = self._families.get(name)
+        if family is None:
+            family = self._families[name] = (kind, help_text, [])
+        return family[2]
+
+    def counter(self, name, help_text, value, **labels):
+        self._family(name, "counter", help_text).append(f"{name}{_labels(labels)} {value}")
+
+    def gauge(self, name, help_text, value, **labels):
+        self._family(name, "gauge", help_text).append(f"{name}{_labels(labels)} {value}")
+
+    def summary(self, name, help_text, histogram, scale=1e-9, **labels):
+        """A LatencyHistogram as a summary (quantiles, _sum and _count), ns scaled to seconds"""
+        lines = self._family(name, "summary", help_text)
+        for quantile in (0.5, 0.95, 0.99):
+            value = histogram.percentile(quantile * 100) * scale
+            lines.append(f"{name}{_labels(dict(labels, quantile=quantile))} {value:.9f}")
+        lines.append(f"{name}_sum{_labels(labels)} {histogram.total * scale:.9f}")
+        lines.append(f"{name}_count{_labels(labels)} {histogram.count}")
+
+    def render(self):
+        out = []
+        for name, (kind, help_text, lines) in self._families.items():
+            out.append(f"# HELP {name} {help_text}")
+            out.append(f"# TYPE {name} {kind}")
+            out.extend(lines)
+        return "\n".join(out) + "\n"
+
+
+class RateMeter:
+    """Per-key rates from periodic samples of monotonically increasing totals"""
+
+    def __init__(self, window_seconds=RATE_WINDOW_SECONDS):
+        self._samples = collections.deque(maxlen=window_seconds + 1)  # (time, totals)
+
+    def sample(self, now, totals):
+        """Record the current totals (call about once a second)"""
+        self._samples.append((now, dict(totals)))
+
+    def rates(self):
+        """key -> average rate per second over the window"""
+        if len(self._samples) < 2:
+            return {}
+        (t0, first), (t1, last) = self._samples[0], self._samples[-1]
+        elapsed = t1 - t0
+        if elapsed <= 0:
+            return {}
+        return {key: (total - first.get(key, 0)) / elapsed for key, total in last.items()}
+
+
+class StatsServer:
+    """Minimal HTTP/1.0 server answering GET requests from text callbacks"""
+
+    def __init__(self, routes, host=STATS_IP, port=STATS_PORT):
+        self.routes = routes  # path (bytes) -> () -> text; "/" serves the first one
+        self.host = host
+        self.port = port
+        self._server = None
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        log.info("[STATS] Serving metrics on http://%s:%s/metrics", self.host, self.port)
+
+    def close(self):
+        if self._server is not None:
+            self._server.close()
+            self._server = None
+
+    async def _handle(self, reader, writer):
+        try:
+            request = await asyncio.wait_for(reader.readline(), REQUEST_TIMEOUT)
+            # Skip the headers, we don't need any of them
+            while True:
+                line = await asyncio.wait_for(reader.readline(), REQUEST_TIMEOUT)
+                if line in (b"\r\n", b"\n", b""):
+                    break
+
+            parts = request.split()
+            render = None
+            if len(parts) >= 2 and parts[0] == b"GET":
+                path = parts[1].split(b"?")[0]
+                render = self.routes.get(path) if path != b"/" else next(iter(self.routes.values()))
+            if render is not None:
+                status = "200 OK"
+                body = render().encode()
+            else:
+                status = "404 Not Found"
+                body = f"Not found - try {', '.join(p.decode() for p in self.routes)}\n".encode()
+
+            writer.write(f"HTTP/1.0 {status}\r\n"
+                         f"Content-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+                         f"Content-Length: {len(body)}\r\n"
+                         f"Connection: close\r\n\r\n".encode() + body)
+            await writer.drain()
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        except Exception as e:
+            log.error("[STATS] Request failed: %s", e)
+        finally:
+            writer.close()
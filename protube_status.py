@@ -0,0 +1,229 @@
+"""Shared-memory status block published by the bridge and read by the GUI.
+
+A fixed-layout segment replaces the old protube_battery.txt. On Windows
+it is a named mapping (STATUS_TAGNAME); elsewhere a small file in the
+temp directory mapped by both processes (STATUS_FILE). Nothing is parsed and the file is never
+rewritten, so reading it costs a memory copy.
+
+Writes are guarded by a seqlock: the writer makes the sequence number
+odd, writes the body, then makes it even again. A reader copies the body
+between two reads of the sequence number and retries if it was odd or
+changed, so it never sees a half-written block.
+
+Layout (little-endian):
+
+    magic        4s   STATUS_MAGIC
+    layout       u16  STATUS_LAYOUT
+    reserved     u16
+    seq          u32  seqlock counter (odd while a write is in progress)
+    pid          u32  bridge process id
+    state        u8   STATE_* below
+    fire_mode    u8   protube_config fire mode constant
+    triggers     u8   bit per hand that has its trigger held (right=1, left=2)
+    auto_fire    u8   bit per hand that is in a full auto session
+    battery      8b   battery % per channel 0-7, -1 if unknown
+    heartbeat_ns u64  bridge's monotonic clock at the last publish
+    config_ver   u32  version of the live config snapshot
+    shots        u64  Shots issued since start
+    latency_p50  u32  receive->Shot latency (us), 0 if not traced
+    latency_p99  u32
+    latency_max  u32
+    profile      32s  name of the active config profile (UTF-8, empty: none)
+"""
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import time
+
+STATUS_MAGIC = b"PTST"
+STATUS_LAYOUT = 2
+STATUS_TAGNAME = "ProTubeBridgeStatus"  # Windows named shared memory
+# File-backed mapping elsewhere, in the temp directory both processes share
+STATUS_FILE = os.path.join(tempfile.gettempdir(), "protube_status.bin")
+
+STATE_STOPPED = 0
+STATE_STARTING = 1
+STATE_RUNNING = 2
+STATE_STOPPING = 3
+STATE_NAMES = {STATE_STOPPED: "stopped", STATE_STARTING: "starting",
+               STATE_RUNNING: "running", STATE_STOPPING: "stopping"}
+
+BATTERY_CHANNELS = 8
+BATTERY_UNKNOWN = -1
+HAND_BITS = {'right': 1, 'left': 2}
+PROFILE_NAME_BYTES = 32  # profiles with longer names are refused when loaded (protube_profiles)
+
+_HEADER = struct.Struct("<4sHHI")
+_BODY = struct.Struct(f"<IBBBB{BATTERY_CHANNELS}bQIQIII{PROFILE_NAME_BYTES}s")
+_SEQ_OFFSET = 8
+_SEQ = struct.Struct("<I")
+STATUS_SIZE = _HEADER.size + _BODY.size
+
+READ_RETRIES = 100
+
+
+def _use_tagname():
+    return sys.platform == "win32"
+
+
+def _map(path, tagname, create):
+    """Map the status segment, None if it doesn't exist and create is False"""
+    if _use_tagname():
+        # Opening a tagname that doesn't exist yet creates a zeroed segment;
+        # the reader just sees no magic until the bridge publishes
+        return mmap.mmap(-1, STATUS_SIZE, tagname=tagname)
+    flags = os.O_RDWR | (os.O_CREAT if create else 0)
+    try:
+        fd = os.open(path, flags, 0o644)
+    except FileNotFoundError:
+        return None
+    try:
+        if os.fstat(fd).st_size < STATUS_SIZE:
+            if not create:
+                return None
+            os.ftruncate(fd, STATUS_SIZE)
+        return mmap.mmap(fd, STATUS_SIZE)
+    finally:
+        os.close(fd)
+
+
+class BridgeStatus:
+    """One consistent copy of the status block"""
+    __slots__ = ("pid", "state", "fire_mode", "triggers", "auto_fire", "battery",
+                 "heartbeat_ns", "config_version", "shots",
+                 "latency_p50_us", "latency_p99_us", "latency_max_us", "profile")
+
+    def __init__(self, pid, state, fire_mode, triggers, auto_fire, battery, heartbeat_ns,
+                 config_version, shots, latency_p50_us, latency_p99_us, latency_max_us, profile):
+        self.pid = pid
+        self.state = state
+        self.fire_mode = fire_mode
+        self.triggers = triggers
+        self.auto_fire = auto_fire
+        self.battery = battery
+        self.heartbeat_ns = heartbeat_ns
+        self.config_version = config_version
+        self.shots = shots
+        self.latency_p50_us = latency_p50_us
+        self.latency_p99_us = latency_p99_us
+        self.latency_max_us = latency_max_us
+        self.profile = profile.rstrip(b"\0").decode('utf-8', 'replace')
+
+    def battery_level(self, channel):
+        """Battery % of a channel, None if unknown"""
+        level = self.battery[channel]
+        return None if level == BATTERY_UNKNOWN else level
+
+    def heartbeat_age(self, now_ns=None):
+        """Seconds since the bridge last published"""
+        if now_ns is None:
+            now_ns = time.monotonic_ns()
+        return (now_ns - self.heartbeat_ns) / 1e9
+
+
+class StatusWriter:
+    """Bridge side: owns the values and publishes them under the seqlock"""
+
+    def __init__(self, path=STATUS_FILE, tagname=STATUS_TAGNAME):
+        self.path = path
+        self.tagname = tagname
+        self._map = None
+        self._seq = 0
+        self.pid = os.getpid()
+        self.state = STATE_STARTING
+        self.fire_mode = 0
+        self.triggers = 0
+        self.auto_fire = 0
+        self.battery = [BATTERY_UNKNOWN] * BATTERY_CHANNELS
+        self.config_version = 0
+        self.shots = 0
+        self.latency_p50_us = 0
+        self.latency_p99_us = 0
+        self.latency_max_us = 0
+        self.profile = ""
+
+    def open(self):
+        self._map = _map(self.path, self.tagname, create=True)
+        # Continue the sequence of a previous bridge so a reader never sees it repeat
+        magic, _, _, seq = _HEADER.unpack_from(self._map, 0)
+        self._seq = (seq + 1) & ~1 if magic == STATUS_MAGIC else 0
+        _HEADER.pack_into(self._map, 0, STATUS_MAGIC, STATUS_LAYOUT, 0, self._seq)
+
+    def close(self):
+        """Publish the stopped state and unmap"""
+        if self._map is None:
+            return
+        self.state = STATE_STOPPED
+        self.publish()
+        self._map.close()
+        self._map = None
+
+    def set_trigger(self, hand, held):
+        if held:
+            self.triggers |= HAND_BITS[hand]
+        else:
+            self.triggers &= ~HAND_BITS[hand]
+
+    def set_auto_fire(self, hand, active):
+        if active:
+            self.auto_fire |= HAND_BITS[hand]
+        else:
+            self.auto_fire &= ~HAND_BITS[hand]
+
+    def publish(self):
+        """Write every value to the segment (one seqlock write)"""
+        block = self._map
+        if block is None:
+            return
+        seq = self._seq + 1
+        _SEQ.pack_into(block, _SEQ_OFFSET, seq)  # odd: write in progress
+        _BODY.pack_into(block, _HEADER.size, self.pid, self.state, self.fire_mode,
+                        self.triggers, self.auto_fire, *self.battery, time.monotonic_ns(),
+                        self.config_version, self.shots, self.latency_p50_us,
+                        self.latency_p99_us, self.latency_max_us,
+                        self.profile.encode('utf-8'))
+        self._seq = seq + 1
+        _SEQ.pack_into(block, _SEQ_OFFSET, self._seq)
+
+
+class StatusReader:
+    """GUI side: consistent copies of the block, without touching the filesystem per read"""
+
+    def __init__(self, path=STATUS_FILE, tagname=STATUS_TAGNAME):
+        self.path = path
+        self.tagname = tagname
+        self._map = None
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+    def read(self):
+        """The current BridgeStatus, None if no bridge has published one"""
+        if self._map is None:
+            self._map = _map(self.path, self.tagname, create=False)
+            if self._map is None:
+                return None
+
+        block = self._map
+        for _ in range(READ_RETRIES):
+            magic, layout, _, seq = _HEADER.unpack_from(block, 0)
+            if magic != STATUS_MAGIC or layout != STATUS_LAYOUT:
+                return None
+            if seq & 1:
+                continue  # Writer is mid-update
+            values = _BODY.unpack_from(block, _HEADER.size)
+            if _SEQ.unpack_from(block, _SEQ_OFFSET)[0] == seq:
+                break
+        else:
+            return None  # Couldn't get a stable copy; try again next tick
+
+        if seq == 0:
+            return None  # Header written but nothing published yet
+        pid, state, fire_mode, triggers, auto_fire = values[:5]
+        battery = values[5:5 + BATTERY_CHANNELS]
+        return BridgeStatus(pid, state, fire_mode, triggers, auto_fire, battery,
+                            *values[5 + BATTERY_CHANNELS:])
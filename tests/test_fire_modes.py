@@ -0,0 +1,410 @@
+"""Fire-mode conformance tests in virtual time.
+
+Drives the bridge's real receive path (driver datagrams -> DriverProtocol
+and the default coalescer -> handle_shot, handle_trigger_state,
+handle_mode_change -> scheduler) with the scheduler on a VirtualClock and SimulatedBackend recording every Shot on
+the same clock. Pulse counts, spacing, the burst cooldown and stop
+behaviour are checked to the nanosecond, and the soak test plays hours
+of full auto and bursts in a few seconds:
+
+    python -m pytest -q tests
+    PROTUBE_SOAK_HOURS=2 python -m pytest -q tests -k soak
+"""
+import asyncio
+import importlib
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import protube_bridge_with_gui_control as bridge
+from protube_backend import SimulatedBackend
+from protube_clock import VirtualClock
+from protube_coalesce import EventCoalescer
+from protube_config import (SINGLE_SHOT, BURST_FIRE, FULL_AUTO, HAPTIC_EXPERIMENTAL,
+                            DEFAULT_CONFIG, compile_config)
+from protube_pattern import FEEDBACK_SPACING_MS, percent_to_raw
+from protube_profiles import ProfileBank, parse_profile
+from protube_overlap import OVERLAP_DROP, OVERLAP_QUEUE, DeviceOccupancy
+from protube_routing import FEEDBACK_CHANNEL
+from protube_scheduler import HapticScheduler
+from protube_status import StatusWriter
+
+MS = 1_000_000
+RIGHT_CHANNEL = 4  # "shot_left" from the driver is the right controller
+LEFT_CHANNEL = 5
+DRIVER = ("127.0.0.1", 50000)
+
+# Driver messages for the right controller, which the driver calls "left"
+SHOT = b"shot_left"
+PRESS = b"trigger_left:1"
+RELEASE = b"trigger_left:0"
+
+SOAK_HOURS = float(os.environ.get("PROTUBE_SOAK_HOURS", "0.25"))
+
+
+class Harness:
+    """A freshly loaded bridge on a virtual clock"""
+
+    def __init__(self, workdir, mode=SINGLE_SHOT, profiles=None, overlap=None, ready=True, **settings):
+        values = dict(DEFAULT_CONFIG, mode_select="Trigger", feedback=False, latency=0)
+        values.update(settings)
+        self.clock = VirtualClock()
+        self.device = SimulatedBackend(clock=self.clock.now_ns)
+
+        bridge.config = values
+        bridge.active_config = compile_config(values)
+        bridge.profile_bank = ProfileBank(parse_profile(name, data) for name, data in (profiles or {}).items())
+        bridge.profile_bank.compile(values, bridge.active_config)
+        bridge.current_mode = mode
+        bridge.status_block = StatusWriter(os.path.join(workdir, "status.bin"))  # never opened
+        occupancy = DeviceOccupancy(overlap) if overlap else None
+        bridge.scheduler = HapticScheduler(self.device.shot, occupancy=occupancy, clock=self.clock)
+        bridge.scheduler.start()
+
+        # Driver packets go through a DriverProtocol (holding them until replay() unless ready)
+        self.loop = asyncio.new_event_loop()
+        self.protocol = bridge.DriverProtocol(EventCoalescer(bridge.event_kinds), ready=ready)
+        self.protocol.loop = self.loop  # What connection_made() sets
+        bridge.driver_protocol = self.protocol
+
+    @property
+    def cfg(self):
+        return bridge.active_config
+
+    def send(self, *datagrams):
+        """Receive datagrams back to back, then let their batch flush"""
+        for data in datagrams:
+            self.protocol.datagram_received(data, DRIVER)
+        self.settle()
+
+    def settle(self):
+        """Run the loop until the protocol's deferred flush has happened"""
+        while self.protocol.flush_handle is not None:
+            self.loop.run_until_complete(asyncio.sleep(0))
+
+    def run_ms(self, ms):
+        self.clock.advance_ms(ms)
+
+    def times_ms(self, channel=RIGHT_CHANNEL, since_ns=0):
+        """Shot times on a channel, in ms from since_ns"""
+        return [(r.t_ns - since_ns) / MS for r in self.device.shots_on(channel)]
+
+    def count(self, channel=RIGHT_CHANNEL):
+        return len(self.device.shots_on(channel))
+
+
+@pytest.fixture
+def harness(tmp_path):
+    """Harness factory over a bridge with every module global back at its initial value"""
+    importlib.reload(bridge)
+    bridge.DOCUMENTS_PATH = str(tmp_path)
+    bridge.DRIVER_CONFIG_FILE = str(tmp_path / "protube_config.txt")
+    bridge.CONFIG_FILE = str(tmp_path / "protube_gui_config.json")
+    harnesses = []
+
+    def make(*args, **kwargs):
+        harnesses.append(Harness(str(tmp_path), *args, **kwargs))
+        return harnesses[-1]
+    yield make
+    for h in harnesses:
+        h.loop.close()
+
+
+def test_single_shot_is_one_pulse(harness):
+    h = harness(SINGLE_SHOT)
+    h.send(SHOT)
+    h.run_ms(500)
+    shots = h.device.shots_on(RIGHT_CHANNEL)
+    assert len(shots) == 1, f"expected 1 pulse, got {len(shots)}"
+    s = shots[0]
+    assert (s.t_ns, s.kick, s.rumble, s.duration) == (0, percent_to_raw(100), percent_to_raw(47), 100), \
+        f"unexpected pulse {s.t_ns}ns kick {s.kick} rumble {s.rumble} duration {s.duration}"
+    assert h.count(LEFT_CHANNEL) == 0, "pulse leaked onto the left channel"
+
+
+def test_shots_arriving_together_are_merged(harness):
+    h = harness(SINGLE_SHOT)
+    h.send(SHOT, SHOT, SHOT)  # one burst of datagrams: the merge coalescer keeps one
+    h.run_ms(500)
+    assert h.count() == 1, f"{h.count()} pulses for one burst of shot datagrams"
+    assert h.protocol.coalescer.stats.merged == 2, f"coalescer stats {h.protocol.coalescer.stats.summary()}"
+
+def test_single_shot_every_event(harness):
+    h = harness(SINGLE_SHOT)
+    for _ in range(10):
+        h.send(SHOT)
+        h.run_ms(20)
+    assert h.times_ms() == [i * 20.0 for i in range(10)], f"pulses at {h.times_ms()}"
+
+
+def test_latency_delays_every_pulse(harness):
+    h = harness(BURST_FIRE, latency=35)
+    h.send(SHOT)
+    h.run_ms(1000)
+    rate = h.cfg.auto_rate_ms
+    assert h.times_ms() == [35.0 + i * rate for i in range(3)], f"pulses at {h.times_ms()}"
+
+
+def test_burst_count_and_spacing(harness):
+    h = harness(BURST_FIRE, burst_count=5, auto_rate=40, burst_kick=80, burst_duration=30)
+    h.send(SHOT)
+    h.run_ms(1000)
+    shots = h.device.shots_on(RIGHT_CHANNEL)
+    assert [r.t_ns / MS for r in shots] == [0.0, 40.0, 80.0, 120.0, 160.0], f"pulses at {[r.t_ns / MS for r in shots]}"
+    assert all((r.kick, r.duration) == (percent_to_raw(80), 30) for r in shots), "wrong burst settings"
+
+
+def test_burst_cooldown(harness):
+    h = harness(BURST_FIRE, burst_count=2, auto_rate=50)
+    h.send(SHOT)
+    h.run_ms(199)
+    h.send(SHOT)  # 199ms after the first burst: ignored
+    h.run_ms(1)
+    h.send(SHOT)  # exactly the cooldown: accepted
+    h.run_ms(500)
+    assert h.times_ms() == [0.0, 50.0, 200.0, 250.0], f"pulses at {h.times_ms()}"
+
+
+def test_burst_cooldown_is_per_hand(harness):
+    h = harness(BURST_FIRE, burst_count=1)
+    h.send(SHOT, b"shot_right")
+    h.run_ms(100)
+    h.send(SHOT, b"shot_right")
+    h.run_ms(500)
+    assert h.count(RIGHT_CHANNEL) == 1 and h.count(LEFT_CHANNEL) == 1, \
+        f"expected 1 burst per hand, got {h.count(RIGHT_CHANNEL)}/{h.count(LEFT_CHANNEL)}"
+
+
+def test_full_auto_cadence_and_stop(harness):
+    h = harness(FULL_AUTO, auto_rate=60)
+    h.send(PRESS, SHOT)
+    h.run_ms(600)
+    # Rounds at 0, 60, ... 600 inclusive
+    assert h.times_ms() == [i * 60.0 for i in range(11)], f"pulses at {h.times_ms()}"
+    cadence = bridge.auto_fire_cadence['right']
+    assert cadence.max_dev_ns == 0 and cadence.missed == 0, f"cadence drifted: {cadence.summary()}"
+
+    h.run_ms(30)
+    h.send(RELEASE)
+    h.run_ms(1000)
+    assert h.count() == 11, f"{h.count() - 11} pulses after the trigger was released"
+    assert bridge.scheduler.pending() == 0 and h.clock.pending() == 0, "timers left after release"
+
+
+def test_full_auto_needs_trigger(harness):
+    h = harness(FULL_AUTO)
+    h.send(SHOT)
+    h.run_ms(500)
+    assert h.count() == 0, f"{h.count()} pulses without the trigger held"
+
+
+def test_full_auto_ignores_repeat_shots(harness):
+    h = harness(FULL_AUTO, auto_rate=100)
+    h.send(PRESS, SHOT)
+    for _ in range(9):
+        h.run_ms(33)
+        h.send(SHOT)  # the game keeps reporting shots while the session runs
+    h.run_ms(3)
+    assert h.times_ms() == [0.0, 100.0, 200.0, 300.0], f"pulses at {h.times_ms()}"
+    assert bridge.event_counts["auto_fire_sessions"] == 1, \
+        f"{bridge.event_counts['auto_fire_sessions']} sessions counted"
+
+
+def test_full_auto_restarts_on_new_press(harness):
+    h = harness(FULL_AUTO, auto_rate=50)
+    h.send(PRESS, SHOT)
+    h.run_ms(120)
+    h.send(RELEASE)
+    h.run_ms(10)
+    h.send(PRESS, SHOT)
+    h.run_ms(100)
+    assert h.times_ms() == [0.0, 50.0, 100.0, 130.0, 180.0, 230.0], f"pulses at {h.times_ms()}"
+
+
+def test_experimental_passthrough(harness):
+    h = harness(HAPTIC_EXPERIMENTAL, single_kick=60, single_duration=40)
+    for _ in range(5):
+        h.send(SHOT)
+        h.run_ms(5)
+    shots = h.device.shots_on(RIGHT_CHANNEL)
+    assert len(shots) == 5, f"expected 5 pulses, got {len(shots)}"
+    assert all((r.kick, r.duration) == (percent_to_raw(60), 40) for r in shots), "not using Single Shot settings"
+
+
+def test_experimental_plays_custom_single_pattern(harness):
+    h = harness(HAPTIC_EXPERIMENTAL, patterns={"single": [[0, 100, 60, 80], [25, 0, 40, 60]]})
+    h.send(SHOT)
+    h.run_ms(100)
+    pulses = [(r.t_ns / MS, r.kick, r.duration) for r in h.device.shots_on(RIGHT_CHANNEL)]
+    assert pulses == [(0.0, percent_to_raw(100), 80), (25.0, 0, 60)], f"pulses {pulses}"
+
+
+def test_mode_change_feedback(harness):
+    h = harness(SINGLE_SHOT, feedback=True)
+    for pulses, mode in enumerate((b"mode:single", b"mode:burst", b"mode:auto"), 1):
+        start = h.clock.now_ns()
+        h.send(mode)
+        h.run_ms(1000)
+        times = h.times_ms(FEEDBACK_CHANNEL, start)[-pulses:]
+        assert times == [i * float(FEEDBACK_SPACING_MS) for i in range(pulses)], f"{mode.decode()}: feedback at {times}"
+    assert h.count(FEEDBACK_CHANNEL) == 6, f"expected 6 feedback pulses, got {h.count(FEEDBACK_CHANNEL)}"
+    assert all(r.kick == 1 for r in h.device.shots_on(FEEDBACK_CHANNEL)), "feedback isn't the lightest kick"
+
+
+def test_mode_change_cancels_pending(harness):
+    h = harness(BURST_FIRE, burst_count=5, auto_rate=100)
+    h.send(SHOT)
+    h.run_ms(150)  # 2 of 5 rounds played
+    h.send(b"mode:auto")
+    h.run_ms(1000)
+    assert h.count() == 2, f"{h.count() - 2} burst rounds played after the mode change"
+
+    h.send(PRESS, SHOT)
+    h.run_ms(200)
+    h.send(b"mode:single")
+    h.run_ms(1000)
+    assert not bridge.auto_fire_active['right'], "full auto still marked active"
+    assert bridge.scheduler.pending() == 0, "pulses left after the mode change"
+
+
+def test_gui_mode_change_waits_for_device(harness):
+    h = harness(SINGLE_SHOT, ready=False)
+    bridge.ControlProtocol().set_fire_mode("burst")
+    h.send(SHOT)
+    h.run_ms(500)
+    assert bridge.current_mode == SINGLE_SHOT and h.count() == 0, "events handled before the device was ready"
+    assert h.protocol.replay() == (2, 0), "GUI mode change and shot weren't both held"
+    h.settle()
+    h.run_ms(500)
+    assert bridge.current_mode == BURST_FIRE, f"mode {bridge.current_mode} after the replay"
+    assert h.times_ms() == [500.0, 560.0, 620.0], f"replayed shot played at {h.times_ms()}"
+
+
+def test_ignored_hand_is_silent(harness):
+    h = harness(SINGLE_SHOT, ignore_right_hand=True)
+    h.send(SHOT, b"shot_right")
+    h.run_ms(100)
+    assert h.count(RIGHT_CHANNEL) == 0 and h.count(LEFT_CHANNEL) == 1, "ignore_right_hand not applied"
+
+
+def test_routes_mirror_every_pulse(harness):
+    h = harness(FULL_AUTO, auto_rate=50, feedback=True,
+                routes={"right": [RIGHT_CHANNEL, 1], "left": [LEFT_CHANNEL, 2, 3], "feedback": [6]})
+    h.send(PRESS, SHOT, b"trigger_right:1", b"shot_right")
+    h.run_ms(200)
+    h.send(RELEASE, b"trigger_right:0")
+    expected = [i * 50.0 for i in range(5)]
+    for channel in (RIGHT_CHANNEL, 1, LEFT_CHANNEL, 2, 3):
+        assert h.times_ms(channel) == expected, f"channel {channel}: pulses at {h.times_ms(channel)}"
+
+    start = h.clock.now_ns()
+    h.send(b"mode:burst")
+    h.run_ms(1000)
+    assert h.times_ms(6, start) == [0.0, float(FEEDBACK_SPACING_MS)], f"feedback at {h.times_ms(6, start)}"
+    assert h.count(RIGHT_CHANNEL) == 5, "feedback still played on the right hand"
+
+
+def test_cancelled_queued_shots_free_the_device(harness):
+    h = harness(SINGLE_SHOT, overlap=OVERLAP_QUEUE, single_duration=100)
+    for _ in range(3):
+        h.send(SHOT)  # 0ms plays, 20ms and 40ms queue for 100ms and 200ms
+        h.run_ms(20)
+    h.send(b"mode:single")  # drops the two queued Shots
+    h.run_ms(60)
+    h.send(SHOT)  # 120ms: the device finished the first Shot at 100ms
+    h.run_ms(500)
+    assert h.times_ms() == [0.0, 120.0], f"pulses at {h.times_ms()}"
+    state = bridge.scheduler.occupancy.channels[RIGHT_CHANNEL]
+    assert (state.waiting, state.busy_ns, state.free_at) == (0, 200 * MS, 220 * MS), \
+        f"{state.waiting} waiting, busy {state.busy_ns / MS}ms, free at {state.free_at / MS}ms"
+
+
+@pytest.mark.parametrize("overlap", (OVERLAP_DROP, OVERLAP_QUEUE))
+def test_overlap_policy_keeps_fire_mode_rounds(harness, overlap):
+    # Rounds 60ms apart that play for 100ms each: a pattern's own steps never overlap each other
+    h = harness(FULL_AUTO, overlap=overlap, auto_rate=60, auto_duration=100, burst_duration=100)
+    h.send(PRESS, SHOT)
+    h.run_ms(600)
+    assert h.times_ms() == [i * 60.0 for i in range(11)], f"full auto pulses at {h.times_ms()}"
+    cadence = bridge.auto_fire_cadence['right']
+    assert (cadence.rounds, cadence.missed) == (11, 0), f"cadence {cadence.summary()}"
+
+    h.send(RELEASE, b"mode:burst")
+    h.run_ms(500)
+    start = h.clock.now_ns()
+    h.send(SHOT)
+    h.run_ms(500)
+    burst = [t for t in h.times_ms(since_ns=start) if t >= 0]
+    assert burst == [0.0, 60.0, 120.0], f"burst pulses at {burst}"
+
+
+@pytest.mark.parametrize("overlap, right_rounds, rounds, missed, max_dev_ms", (
+    (OVERLAP_DROP, [0.0, 120.0, 180.0], 3, 1, 0.0),          # 60ms round dropped
+    (OVERLAP_QUEUE, [0.0, 85.0, 120.0, 180.0], 4, 0, 25.0),  # 60ms round played at 85ms
+))
+def test_cadence_counts_rounds_that_play(harness, overlap, right_rounds, rounds, missed, max_dev_ms):
+    # Both hands on channel 4: one left round at 45ms plays over the right hand's 60ms round
+    h = harness(FULL_AUTO, overlap=overlap, auto_rate=60, auto_duration=40, routes={"left": [RIGHT_CHANNEL]})
+    h.send(PRESS, SHOT)
+    h.run_ms(45)
+    h.send(b"trigger_right:1", b"shot_right")
+    h.run_ms(5)
+    h.send(b"trigger_right:0")
+    h.run_ms(130)
+    times = h.times_ms()
+    times.remove(45.0)
+    assert times == right_rounds, f"right hand rounds at {times}"
+    cadence = bridge.auto_fire_cadence['right']
+    assert (cadence.rounds, cadence.missed, cadence.max_dev_ms()) == (rounds, missed, max_dev_ms), \
+        f"cadence {cadence.summary()}"
+
+def test_profile_swap_applies_to_next_shot(harness):
+    h = harness(SINGLE_SHOT, profiles={"Light": {"single_kick": 20, "routes": {"right": [4, 6]}}})
+    h.send(SHOT)
+    h.run_ms(200)
+    h.send(b"profile:Light", SHOT)
+    h.run_ms(200)
+    h.send(b"profile:next", SHOT)  # Wraps around to the base config
+    h.run_ms(200)
+    kicks = [(r.t_ns / MS, r.kick) for r in h.device.shots_on(RIGHT_CHANNEL)]
+    assert kicks == [(0.0, percent_to_raw(100)), (200.0, percent_to_raw(20)), (400.0, percent_to_raw(100))], \
+        f"right hand pulses {kicks}"
+    assert h.times_ms(6) == [200.0], f"routed channel 6 pulses at {h.times_ms(6)}"
+    assert bridge.active_profile is None, f"still on profile {bridge.active_profile}"
+    assert bridge.profile_switches == {"gui": 0, "driver": 2, "auto": 0}, f"switches {bridge.profile_switches}"
+
+
+def test_soak(harness):
+    """Alternate full auto sprays and bursts on both hands for SOAK_HOURS of simulated time"""
+    h = harness(FULL_AUTO, auto_rate=60, burst_count=3)
+    rng = random.Random(1)
+    expected = {RIGHT_CHANNEL: 0, LEFT_CHANNEL: 0}
+    wires = {RIGHT_CHANNEL: (b"shot_left", b"trigger_left:1", b"trigger_left:0"),
+             LEFT_CHANNEL: (b"shot_right", b"trigger_right:1", b"trigger_right:0")}
+    end_ns = int(SOAK_HOURS * 3600 * 1000) * MS
+
+    while h.clock.now_ns() < end_ns:
+        channel = rng.choice((RIGHT_CHANNEL, LEFT_CHANNEL))
+        shot, press, release = wires[channel]
+        if rng.random() < 0.5:
+            # Spray: rounds at 0, 60, ... up to and including the release time
+            h.send(b"mode:auto")
+            hold_ms = rng.randrange(60, 3000)
+            h.send(press, shot)
+            h.run_ms(hold_ms)
+            h.send(release)
+            expected[channel] += hold_ms // 60 + 1
+        else:
+            h.send(b"mode:burst")
+            h.send(shot)
+            h.run_ms(rng.randrange(200, 400))  # past the cooldown and the 3 rounds
+            expected[channel] += 3
+        h.run_ms(rng.randrange(1, 500))
+
+    for channel, count in expected.items():
+        assert h.count(channel) == count, f"channel {channel}: {h.count(channel)} pulses, expected {count}"
+    assert bridge.scheduler.pending() == 0, "pulses left at the end"